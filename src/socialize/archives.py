@@ -0,0 +1,101 @@
+"""Streaming ActivityStreams archive reader for the socialize app."""
+#!/usr/bin/python
+#
+# This file is part of django-socialize project.
+#
+# Copyright (C) 2010-2025 William Oliveira de Lagos <william.lagos@icloud.com>
+#
+# Socialize is free software: you can redistribute it and/or modify
+# it under the terms of the Lesser GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Socialize is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Socialize. If not, see <http://www.gnu.org/licenses/>.
+#
+
+import codecs
+import json
+import re
+
+ITEMS_KEY = re.compile(r'"(?:orderedItems|items)"\s*:\s*\[')
+WHITESPACE = re.compile(r'[\s,]*')
+
+
+class ArchiveError(ValueError):
+    """Raised when an archive is not a readable ActivityStreams collection."""
+
+
+class ArchiveReader:
+    """
+    Reads the items of an ActivityStreams collection from a stream.
+
+    Items are decoded one at a time as the stream is consumed, so only the
+    current item and a read buffer are ever held in memory. Decoding walks
+    the buffer by offset, and an item cut by the end of the buffer waits
+    until the pending text has doubled before it is decoded again, which
+    keeps large items linear in their size. When the stream holds no inline
+    item list, such as a paged remote outbox, the whole (small) document is
+    kept in ``document`` after iteration instead.
+    """
+
+    def __init__(self, stream, chunk_size=65536):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.text = codecs.getincrementaldecoder('utf-8')()
+        self.document = None
+        self.buffer = ''
+        self.offset = 0
+        self.eof = False
+
+    def fill(self, size=0):
+        """
+        Reads at least ``size`` more characters, or one chunk, into the buffer.
+
+        Text before the offset is dropped first. Returns False when the
+        stream ended before anything could be read.
+        """
+        chunks, read = [self.buffer[self.offset :]], 0
+        while not self.eof and (not read or read < size):
+            chunk = self.stream.read(self.chunk_size)
+            if not chunk:
+                self.eof = True
+                break
+            if isinstance(chunk, bytes):
+                chunk = self.text.decode(chunk)
+            chunks.append(chunk)
+            read += len(chunk)
+        self.buffer, self.offset = ''.join(chunks), 0
+        return read > 0
+
+    def __iter__(self):
+        match = ITEMS_KEY.search(self.buffer)
+        while not match:
+            if not self.fill():
+                try:
+                    self.document = json.loads(self.buffer)
+                except json.JSONDecodeError as e:
+                    raise ArchiveError('Invalid archive document.') from e
+                self.buffer = ''
+                return
+            match = ITEMS_KEY.search(self.buffer)
+        self.offset = match.end()
+
+        while True:
+            self.offset = WHITESPACE.match(self.buffer, self.offset).end()
+            if self.buffer.startswith(']', self.offset):
+                return
+            try:
+                item, self.offset = self.decoder.raw_decode(self.buffer, self.offset)
+            except json.JSONDecodeError as e:
+                # The item may just be cut by the end of the buffer.
+                if self.fill(len(self.buffer) - self.offset):
+                    continue
+                raise ArchiveError('Truncated archive.') from e
+            yield item
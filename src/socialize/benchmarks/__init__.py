@@ -0,0 +1,23 @@
+"""Benchmarks for the socialize app."""
+#!/usr/bin/python
+#
+# This file is part of django-socialize project.
+#
+# Copyright (C) 2010-2025 William Oliveira de Lagos <william.lagos@icloud.com>
+#
+# Socialize is free software: you can redistribute it and/or modify
+# it under the terms of the Lesser GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Socialize is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Socialize. If not, see <http://www.gnu.org/licenses/>.
+#
+
+from .generator import SocialGraphGenerator as SocialGraphGenerator
+from .scenarios import BenchmarkSuite as BenchmarkSuite
@@ -0,0 +1,110 @@
+"""Synthetic social graphs for benchmarking the socialize app."""
+#!/usr/bin/python
+#
+# This file is part of django-socialize project.
+#
+# Copyright (C) 2010-2025 William Oliveira de Lagos <william.lagos@icloud.com>
+#
+# Socialize is free software: you can redistribute it and/or modify
+# it under the terms of the Lesser GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Socialize is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Socialize. If not, see <http://www.gnu.org/licenses/>.
+#
+
+import random
+
+from django.contrib.auth.models import User
+
+from ..models import Actor, Activity, Object, Vault
+from ..services import ActorService
+
+
+class SocialGraphGenerator:
+    """
+    Generates a synthetic social graph of actors, objects and activities.
+
+    Popularity follows a Zipf-like power law: a few actors publish most of
+    the objects and attract most of the followers and likes, like on a real
+    instance. All actors share one key pair, since generating thousands of
+    RSA keys would dominate the setup time without changing the workload.
+    """
+
+    def __init__(self, actors=100, objects=1000, activities=5000, seed=0, skew=1.2):
+        self.actors = actors
+        self.objects = objects
+        self.activities = activities
+        self.skew = skew
+        self.random = random.Random(seed)
+        self.prefix = f'bench{seed}'
+
+    def generate(self):
+        """Creates the graph, returning a summary of the generated rows."""
+        private_key, public_key = ActorService().generate_keys()
+        users = User.objects.bulk_create(
+            User(username=f'{self.prefix}_{index}') for index in range(self.actors)
+        )
+        # bulk_create only returns primary keys on some backends.
+        users = list(User.objects.filter(username__startswith=f'{self.prefix}_'))
+        actors = Actor.objects.bulk_create(
+            Actor(user=user, public_key=public_key) for user in users
+        )
+        Vault.objects.bulk_create(
+            Vault(actor=actor, private_key=private_key) for actor in actors
+        )
+
+        weights = [1 / (rank + 1) ** self.skew for rank in range(len(actors))]
+        objects = Object.objects.bulk_create(
+            (
+                Object(actor=author, content=f'Synthetic note {index}')
+                for index, author in enumerate(
+                    self.random.choices(actors, weights, k=self.objects)
+                )
+            ),
+            batch_size=500,
+        )
+        Activity.objects.bulk_create(
+            self.iter_activities(actors, objects, weights), batch_size=500
+        )
+
+        return {
+            'prefix': self.prefix,
+            'actors': len(actors),
+            'objects': len(objects),
+            'activities': self.activities,
+            'usernames': [user.username for user in users],
+            'actor_ids': [str(actor.id) for actor in actors],
+            'private_key': private_key,
+        }
+
+    def iter_activities(self, actors, objects, weights):
+        """Yields inbound Follow and Like activities and outbound Create ones."""
+        for index in range(self.activities):
+            kind = self.random.choices(('Follow', 'Like', 'Create'), (2, 5, 3))[0]
+            sender = self.random.choice(actors)
+            if kind == 'Follow':
+                recipient = self.random.choices(actors, weights)[0]
+                target = recipient.get_actor_url()
+            elif kind == 'Like' and objects:
+                liked = self.random.choice(objects)
+                recipient, target = liked.actor, liked.get_object_url()
+            else:
+                kind, recipient = 'Create', sender
+                target = {'type': 'Note', 'content': f'Synthetic post {index}'}
+            yield Activity(
+                actor=recipient,
+                activity_type=kind,
+                object_data={
+                    'id': f'/activities/{self.prefix}/{index}',
+                    'type': kind,
+                    'actor': sender.get_actor_url(),
+                    'object': target,
+                },
+            )
@@ -0,0 +1,205 @@
+"""Timed benchmark scenarios for the socialize app."""
+#!/usr/bin/python
+#
+# This file is part of django-socialize project.
+#
+# Copyright (C) 2010-2025 William Oliveira de Lagos <william.lagos@icloud.com>
+#
+# Socialize is free software: you can redistribute it and/or modify
+# it under the terms of the Lesser GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Socialize is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Socialize. If not, see <http://www.gnu.org/licenses/>.
+#
+
+import json
+import platform
+import time
+
+import django
+
+from cryptography.hazmat.primitives import serialization
+from django.conf import settings
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from ..httpsig import digest, get_key_id, signed_headers
+from ..middlewares import ActivityPubSigningMiddleware
+from ..models import actor_url
+from ..services import ActivityService, ActorService
+from ..views import ActivityView, ActorView
+
+
+def percentile(samples, fraction):
+    """Returns the nearest-rank percentile of the sorted samples."""
+    index = min(len(samples) - 1, max(0, round(fraction * len(samples)) - 1))
+    return samples[index]
+
+
+class Scenario:
+    """Times a request handler and counts the SQL queries it runs."""
+
+    def __init__(self, name, run):
+        self.name = name
+        self.run = run
+
+    def measure(self, iterations):
+        """Runs the scenario, returning its latency percentiles in milliseconds."""
+        timings, queries = [], 0
+        for iteration in range(iterations):
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                self.run(iteration)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries += len(captured)
+
+        timings.sort()
+        return {
+            'iterations': iterations,
+            'mean_ms': sum(timings) / iterations,
+            'p50_ms': percentile(timings, 0.50),
+            'p90_ms': percentile(timings, 0.90),
+            'p99_ms': percentile(timings, 0.99),
+            'max_ms': timings[-1],
+            'queries_per_iteration': queries / iterations,
+        }
+
+
+class BenchmarkSuite:
+    """Builds the benchmark scenarios against a generated social graph."""
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+        self.usernames = dataset['usernames']
+        self.private_key = None
+        self.factory = RequestFactory()
+        self.actor_view = ActorView.as_view()
+        self.activity_view = ActivityView.as_view()
+        self.inbox = ActivityPubSigningMiddleware(
+            lambda request: ActivityService().create_activity(
+                request, request.resolved_username
+            )
+        )
+
+    def username(self, iteration):
+        """Returns the actor targeted by the given iteration."""
+        return self.usernames[iteration % len(self.usernames)]
+
+    def webfinger(self, iteration):
+        """Resolves an actor through WebFinger."""
+        domain = getattr(settings, 'SITE_DOMAIN', 'localhost')
+        request = self.factory.get(
+            '/.well-known/webfinger',
+            {'resource': f'acct:{self.username(iteration)}@{domain}'},
+        )
+        return ActorService().get_webfinger(request)
+
+    def actor(self, iteration):
+        """Fetches an ActivityPub actor document."""
+        username = self.username(iteration)
+        request = self.factory.get(f'/users/{username}/')
+        return self.actor_view(request, route='actor', username=username)
+
+    def outbox(self, iteration):
+        """Fetches the outbox collection and walks its first three pages."""
+        username = self.username(iteration)
+        request = self.factory.get(f'/users/{username}/outbox/')
+        response = self.activity_view(request, route='outbox', username=username)
+        url = json.loads(response.content).get('first')
+        for _ in range(3):
+            if not url:
+                break
+            response = self.activity_view(
+                self.factory.get(url), route='outbox', username=username
+            )
+            url = json.loads(response.content).get('next')
+        return response
+
+    def inbox_post(self, iteration):
+        """Delivers a signed activity through the signing middleware."""
+        username = self.username(iteration)
+        actor_id = self.dataset['actor_ids'][iteration % len(self.usernames)]
+        body = json.dumps(
+            {
+                'id': f'/activities/bench-inbox/{iteration}',
+                'type': 'Like',
+                'actor': actor_url(actor_id),
+                'object': f'/users/{username}',
+            }
+        )
+        path = f'/users/{username}/inbox/'
+        headers = signed_headers(
+            self.load_private_key(),
+            get_key_id(actor_id),
+            'POST',
+            f'http://testserver{path}',
+            digest(body.encode()),
+        )
+        request = self.factory.post(
+            path,
+            data=body,
+            content_type='application/activity+json',
+            headers=headers,
+        )
+        request.resolved_username = username
+        request.user = ActorUser(username)
+        return self.inbox(request)
+
+    def create_actor(self, iteration):
+        """Provisions a new actor, including its key pair."""
+        username = f'{self.dataset["prefix"]}_new_{iteration}'
+        return ActorService().create_actor({'username': username})
+
+    def load_private_key(self):
+        """Returns the key shared by the generated actors."""
+        if self.private_key is None:
+            self.private_key = serialization.load_pem_private_key(
+                self.dataset['private_key'].encode(), password=None
+            )
+        return self.private_key
+
+    def scenarios(self):
+        """Returns every scenario of the suite."""
+        return [
+            Scenario('webfinger', self.webfinger),
+            Scenario('actor', self.actor),
+            Scenario('outbox_paging', self.outbox),
+            Scenario('inbox_signed_post', self.inbox_post),
+            Scenario('actor_creation', self.create_actor),
+        ]
+
+    def run(self, iterations=100, only=None):
+        """Runs the selected scenarios, returning a machine-readable report."""
+        results = {
+            scenario.name: scenario.measure(iterations)
+            for scenario in self.scenarios()
+            if not only or scenario.name in only
+        }
+        return {
+            'environment': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+            },
+            'dataset': {
+                key: value
+                for key, value in self.dataset.items()
+                if key in ('actors', 'objects', 'activities')
+            },
+            'scenarios': results,
+        }
+
+
+class ActorUser:
+    """Minimal stand-in for the authenticated user signing a response."""
+
+    def __init__(self, username):
+        self.username = username
@@ -0,0 +1,180 @@
+"""In-process caches for the socialize app."""
+#!/usr/bin/python
+#
+# This file is part of django-socialize project.
+#
+# Copyright (C) 2010-2025 William Oliveira de Lagos <william.lagos@icloud.com>
+#
+# Socialize is free software: you can redistribute it and/or modify
+# it under the terms of the Lesser GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Socialize is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Socialize. If not, see <http://www.gnu.org/licenses/>.
+#
+
+import asyncio
+import threading
+import time
+
+from collections import OrderedDict, deque
+
+MISSING = object()
+
+
+class LRUCache:
+    """
+    Thread-safe, size-bounded LRU cache whose entries expire after a TTL.
+
+    The cache is local to the process, so it is meant for objects that are
+    expensive to build but cheap to hold, such as parsed cryptographic keys.
+    """
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Returns the cached value for the key, or default when absent or expired."""
+        with self._lock:
+            entry = self._data.get(key, MISSING)
+            if entry is not MISSING:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, ttl=None):
+        """Stores the value, evicting the least recently used entries if full."""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        """Removes the key from the cache if present."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def discard(self, predicate):
+        """Removes every entry whose key and value match the predicate."""
+        with self._lock:
+            for key in [k for k, (_, v) in self._data.items() if predicate(k, v)]:
+                del self._data[key]
+
+    def clear(self):
+        """Removes every entry and resets the counters."""
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """Returns the hit/miss counters and the current size of the cache."""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._data)}
+
+    def __len__(self):
+        return len(self._data)
+
+
+class RecentSet:
+    """
+    Thread-safe ring of the most recently seen keys.
+
+    Membership is exact, unlike a Bloom filter, so a key reported as seen
+    really was added, at the cost of remembering only the last maxsize keys.
+    """
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self._keys = set()
+        self._ring = deque()
+        self._lock = threading.Lock()
+
+    def add(self, key):
+        """Adds the key, returning False if it was already among the recent ones."""
+        with self._lock:
+            if key in self._keys:
+                return False
+            self._keys.add(key)
+            self._ring.append(key)
+            while len(self._ring) > self.maxsize:
+                self._keys.discard(self._ring.popleft())
+            return True
+
+    def clear(self):
+        """Forgets every key."""
+        with self._lock:
+            self._keys.clear()
+            self._ring.clear()
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def __len__(self):
+        return len(self._ring)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key into a single call.
+
+    The first caller of a key runs the function while the others wait for
+    its outcome, so a burst of identical lookups costs one upstream request.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._tasks = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, *args):
+        """Returns fn(*args), sharing the call with concurrent callers of the key."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = {'event': threading.Event()}
+
+        if not leader:
+            call['event'].wait()
+            if 'error' in call:
+                raise call['error']
+            return call['result']
+
+        try:
+            call['result'] = fn(*args)
+            return call['result']
+        except Exception as e:
+            call['error'] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call['event'].set()
+
+    async def ado(self, key, fn, *args):
+        """Awaits fn(*args), sharing the task with concurrent callers of the key."""
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn(*args))
+            self._tasks[key] = task
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        return await asyncio.shield(task)
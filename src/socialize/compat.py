@@ -0,0 +1,48 @@
+"""Feature detection across the Django versions supported by socialize."""
+#!/usr/bin/python
+#
+# This file is part of django-socialize project.
+#
+# Copyright (C) 2010-2025 William Oliveira de Lagos <william.lagos@icloud.com>
+#
+# Socialize is free software: you can redistribute it and/or modify
+# it under the terms of the Lesser GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Socialize is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Socialize. If not, see <http://www.gnu.org/licenses/>.
+#
+
+import django
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user
+
+# The async ORM and async streaming responses, used by the async views and
+# middleware paths, as well as filters on window functions.
+ASYNC_SUPPORTED = django.VERSION >= (4, 2)
+WINDOW_FILTERS = django.VERSION >= (4, 2)
+
+# QuerySet.aiterator(chunk_size=...) and HttpRequest.auser().
+AITERATOR_CHUNK_SIZE = django.VERSION >= (5, 0)
+
+
+def aiterator(queryset, chunk_size=2000):
+    """Returns the async iterator of the queryset, in chunks where supported."""
+    if AITERATOR_CHUNK_SIZE:
+        return queryset.aiterator(chunk_size=chunk_size)
+    return queryset.aiterator()
+
+
+async def aget_user(request):
+    """Returns the user of the request, without request.auser() before Django 5."""
+    auser = getattr(request, 'auser', None)
+    if auser is not None:
+        return await auser()
+    return await sync_to_async(get_user)(request)
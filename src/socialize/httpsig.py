@@ -0,0 +1,218 @@
+"""HTTP Signatures (draft-cavage) for the socialize app."""
+#!/usr/bin/python
+#
+# This file is part of django-socialize project.
+#
+# Copyright (C) 2010-2025 William Oliveira de Lagos <william.lagos@icloud.com>
+#
+# Socialize is free software: you can redistribute it and/or modify
+# it under the terms of the Lesser GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Socialize is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Socialize. If not, see <http://www.gnu.org/licenses/>.
+#
+
+import base64
+import datetime
+import hashlib
+import re
+
+from urllib.parse import urlsplit
+
+from cryptography.exceptions import InvalidSignature
+
+from django.conf import settings
+from django.utils.http import http_date, parse_http_date_safe
+
+from .cache import LRUCache
+from .keys import key_algorithm, sign_bytes, verify_bytes
+from .models import actor_url
+
+DEFAULT_HEADERS = ('(request-target)', 'host', 'date', 'digest')
+RESPONSE_HEADERS = ('date', 'digest')
+PARAMETER = re.compile(r'(\w+)="([^"]*)"')
+# Algorithm names of the Signature header, by key algorithm. "hs2019" lets
+# the verifier derive the algorithm from the key itself.
+ALGORITHM_NAMES = {'rsa': 'rsa-sha256', 'ed25519': 'ed25519'}
+
+verified_signatures = LRUCache(
+    maxsize=getattr(settings, 'SOCIALIZE_SIGNATURE_CACHE_SIZE', 4096),
+    ttl=getattr(settings, 'SOCIALIZE_SIGNATURE_CACHE_TTL', 300),
+)
+
+
+class SignatureError(ValueError):
+    """Raised when a signature header cannot be parsed or checked."""
+
+
+def digest(body):
+    """Returns the SHA-256 Digest header value of the raw body bytes."""
+    return 'SHA-256=' + base64.b64encode(hashlib.sha256(body).digest()).decode()
+
+
+def digest_matches(header, body):
+    """Returns whether a SHA-256 entry of the Digest header matches the body."""
+    expected = digest(body).partition('=')[2]
+    for entry in header.split(','):
+        algorithm, _, value = entry.strip().partition('=')
+        if algorithm.lower() == 'sha-256' and value == expected:
+            return True
+    return False
+
+
+def get_key_id(actor_id):
+    """Returns the id of the key of a local actor, within its actor document."""
+    return f'{actor_url(actor_id)}#main-key'
+
+
+def parse_signature(value):
+    """Parses a Signature header into its keyId, headers and signature bytes."""
+    params = dict(PARAMETER.findall(value or ''))
+    if not params.get('keyId') or not params.get('signature'):
+        raise SignatureError('Signature is missing keyId or signature')
+    try:
+        signature = base64.b64decode(params['signature'], validate=True)
+    except ValueError as e:
+        raise SignatureError('Signature is not valid base64') from e
+    return {
+        'keyId': params['keyId'],
+        'algorithm': params.get('algorithm', 'hs2019').lower(),
+        'headers': params.get('headers', 'date').lower().split(),
+        'signature': signature,
+        'value': params['signature'],
+    }
+
+
+def signing_string(method, path, headers, names):
+    """Builds the string covered by the signature from the named headers."""
+    lines = []
+    for name in names:
+        if name == '(request-target)':
+            lines.append(f'(request-target): {method.lower()} {path}')
+        elif name in headers:
+            lines.append(f'{name}: {headers[name]}')
+        else:
+            raise SignatureError(f'Signed header {name} is missing')
+    return '\n'.join(lines)
+
+
+def sign(private_key, key_id, string, names):
+    """Returns the Signature header value signing the string with the key."""
+    signature = sign_bytes(private_key, string.encode())
+    algorithm = ALGORITHM_NAMES[key_algorithm(private_key)]
+    return (
+        f'keyId="{key_id}",algorithm="{algorithm}",'
+        f'headers="{" ".join(names)}",'
+        f'signature="{base64.b64encode(signature).decode()}"'
+    )
+
+
+def signed_headers(private_key, key_id, method, url, body_digest):
+    """Returns the Host, Date, Digest and Signature headers of a request."""
+    parts = urlsplit(url)
+    headers = {
+        'host': parts.netloc,
+        'date': http_date(),
+        'digest': body_digest,
+    }
+    path = parts.path + (f'?{parts.query}' if parts.query else '')
+    string = signing_string(method, path, headers, DEFAULT_HEADERS)
+    return {
+        'Host': headers['host'],
+        'Date': headers['date'],
+        'Digest': headers['digest'],
+        'Signature': sign(private_key, key_id, string, DEFAULT_HEADERS),
+    }
+
+
+def sign_response(response, private_key, key_id):
+    """Adds the Date, Digest and Signature headers to a response."""
+    response['Date'] = http_date()
+    response['Digest'] = digest(response.content)
+    headers = {'date': response['Date'], 'digest': response['Digest']}
+    string = signing_string('', '', headers, RESPONSE_HEADERS)
+    response['Signature'] = sign(private_key, key_id, string, RESPONSE_HEADERS)
+
+
+def get_request_headers(request):
+    """Returns the lower-cased headers of a Django request."""
+    return {name.lower(): value for name, value in request.headers.items()}
+
+
+def prepare_request(request):
+    """
+    Parses and checks the signature of an incoming request.
+
+    Requests must sign their Date, which must be recent, and requests with
+    a body must sign a SHA-256 Digest matching its raw bytes. Returns the
+    parsed signature and the signing string, or raises SignatureError.
+    """
+    params = parse_signature(request.META.get('HTTP_SIGNATURE'))
+    headers = get_request_headers(request)
+    names = params['headers']
+
+    if 'date' not in names:
+        raise SignatureError('Signature does not cover the date')
+    sent_at = parse_http_date_safe(headers.get('date', ''))
+    max_age = getattr(settings, 'SOCIALIZE_SIGNATURE_MAX_AGE', 43200)
+    now = datetime.datetime.now(datetime.timezone.utc).timestamp()
+    if sent_at is None or abs(now - sent_at) > max_age:
+        raise SignatureError('Signature date is missing or out of range')
+
+    if request.body or 'digest' in names:
+        if 'digest' not in names:
+            raise SignatureError('Signature does not cover the body digest')
+        if not digest_matches(headers.get('digest', ''), request.body):
+            raise SignatureError('Digest does not match the body')
+
+    return params, signing_string(
+        request.method, request.get_full_path(), headers, names
+    )
+
+
+def cache_key(params, string):
+    """Returns the verified-signature cache key of a signature and its string."""
+    return params['value'], hashlib.sha256(string.encode()).hexdigest()
+
+
+def is_verified(params, string):
+    """Returns whether the same signature over the same string was verified."""
+    return verified_signatures.get(cache_key(params, string)) == params['keyId']
+
+
+def check(public_key, params, string):
+    """
+    Returns whether the signature over the string is valid for the key.
+
+    The algorithm is derived from the key, so RSA and Ed25519 actors can be
+    mixed; a signature naming an explicit algorithm other than the key's is
+    rejected.
+    """
+    algorithm = key_algorithm(public_key)
+    if params['algorithm'] not in ('hs2019', ALGORITHM_NAMES[algorithm]):
+        return False
+    try:
+        verify_bytes(public_key, params['signature'], string.encode())
+    except (InvalidSignature, TypeError, ValueError):
+        return False
+    return True
+
+
+def remember(params, string):
+    """Records a verified signature so later requests skip the key operation."""
+    verified_signatures.set(cache_key(params, string), params['keyId'])
+
+
+def verify(public_key, params, string):
+    """Verifies the signature over the string, remembering successes."""
+    if not check(public_key, params, string):
+        return False
+    remember(params, string)
+    return True
@@ -0,0 +1,227 @@
+"""Cryptographic key loading for the socialize app."""
+#!/usr/bin/python
+# pylint: disable=E1101
+#
+# This file is part of django-socialize project.
+#
+# Copyright (C) 2010-2025 William Oliveira de Lagos <william.lagos@icloud.com>
+#
+# Socialize is free software: you can redistribute it and/or modify
+# it under the terms of the Lesser GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Socialize is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Socialize. If not, see <http://www.gnu.org/licenses/>.
+#
+
+import hashlib
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, padding
+from cryptography.hazmat.primitives.hashes import SHA256
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, PermissionDenied
+
+from .cache import LRUCache
+from .models import Actor, Vault, actor_url, local_id
+from .resolvers import resolver
+
+KEY_ALGORITHMS = ('rsa', 'ed25519')
+
+public_keys = LRUCache(
+    maxsize=getattr(settings, 'SOCIALIZE_KEY_CACHE_SIZE', 1024),
+    ttl=getattr(settings, 'SOCIALIZE_KEY_CACHE_TTL', 300),
+)
+parsed_keys = LRUCache(
+    maxsize=getattr(settings, 'SOCIALIZE_KEY_CACHE_SIZE', 1024),
+    ttl=getattr(settings, 'SOCIALIZE_KEY_CACHE_TTL', 300),
+)
+private_keys = LRUCache(
+    maxsize=getattr(settings, 'SOCIALIZE_KEY_CACHE_SIZE', 1024),
+    ttl=getattr(settings, 'SOCIALIZE_PRIVATE_KEY_CACHE_TTL', 60),
+)
+
+
+def get_key_algorithm():
+    """Returns the algorithm of the keys generated for new actors."""
+    algorithm = getattr(settings, 'SOCIALIZE_KEY_ALGORITHM', 'rsa')
+    if algorithm not in KEY_ALGORITHMS:
+        raise ImproperlyConfigured(
+            f'SOCIALIZE_KEY_ALGORITHM must be one of {", ".join(KEY_ALGORITHMS)}.'
+        )
+    return algorithm
+
+
+def key_algorithm(key):
+    """Returns the algorithm of a parsed public or private key."""
+    if isinstance(key, (ed25519.Ed25519PrivateKey, ed25519.Ed25519PublicKey)):
+        return 'ed25519'
+    return 'rsa'
+
+
+def sign_bytes(private_key, data):
+    """Signs the data with an RSA (PKCS1v15/SHA-256) or Ed25519 private key."""
+    if key_algorithm(private_key) == 'ed25519':
+        return private_key.sign(data)
+    return private_key.sign(data, padding.PKCS1v15(), SHA256())
+
+
+def verify_bytes(public_key, signature, data):
+    """Verifies the signature with the algorithm of the key, raising on failure."""
+    if key_algorithm(public_key) == 'ed25519':
+        public_key.verify(signature, data)
+    else:
+        public_key.verify(signature, data, padding.PKCS1v15(), SHA256())
+
+
+def fingerprint(pem):
+    """Returns the SHA-256 fingerprint of a PEM encoded key."""
+    return hashlib.sha256(pem.encode()).hexdigest()
+
+
+def get_local_actor_id(key_id):
+    """Returns the id of the local actor owning the key id, or None if remote."""
+    return local_id(key_id, 'actors')
+
+
+def get_key_owner(key_id):
+    """Returns the IRI of the actor owning the key id, or None if unknown."""
+    actor_id = get_local_actor_id(key_id)
+    if actor_id is not None:
+        return actor_url(actor_id)
+    remote = resolver.resolve(key_id)
+    return remote.iri if remote is not None else None
+
+
+async def aget_key_owner(key_id):
+    """Returns the IRI of the actor owning the key id, resolving remote keys."""
+    actor_id = get_local_actor_id(key_id)
+    if actor_id is not None:
+        return actor_url(actor_id)
+    remote = await resolver.aresolve(key_id)
+    return remote.iri if remote is not None else None
+
+
+def load_key_by_id(key_id):
+    """
+    Returns the parsed public key designated by an HTTP Signature keyId.
+
+    Keys of local actors are read from their rows and cached by the actor id
+    and the fingerprint of their PEM, so a key rotated by any process is
+    served as soon as the row changes; other keys come from the remote actor
+    cache.
+    """
+    actor_id = get_local_actor_id(key_id)
+    if actor_id is None:
+        return load_remote_public_key(key_id)
+
+    pem = Actor.objects.filter(id=actor_id).values_list('public_key', flat=True).first()
+    return parse_local_key(public_keys, actor_id, pem, load_public_pem)
+
+
+async def aload_key_by_id(key_id):
+    """Returns the parsed public key designated by a keyId, using the async ORM."""
+    actor_id = get_local_actor_id(key_id)
+    if actor_id is None:
+        return await aload_remote_public_key(key_id)
+
+    pem = await (
+        Actor.objects.filter(id=actor_id).values_list('public_key', flat=True).afirst()
+    )
+    return parse_local_key(public_keys, actor_id, pem, load_public_pem)
+
+
+def load_public_pem(pem):
+    """Parses a PEM encoded public key."""
+    return serialization.load_pem_public_key(pem.encode())
+
+
+def load_private_pem(pem):
+    """Parses a PEM encoded, unencrypted private key."""
+    return serialization.load_pem_private_key(pem.encode(), password=None)
+
+
+def parse_local_key(cache, actor_id, pem, load):
+    """Returns the parsed key of a local actor, cached by actor and fingerprint."""
+    if not pem:
+        return None
+
+    cache_key = (str(actor_id), fingerprint(pem))
+    key = cache.get(cache_key)
+    if key is None:
+        key = load(pem)
+        cache.set(cache_key, key)
+    return key
+
+
+def load_remote_public_key(iri):
+    """
+    Returns the parsed public key of the remote actor with the given IRI.
+
+    The actor document comes from the remote actor resolver, and parsed keys
+    are cached by the fingerprint of their PEM, so a rotated key is parsed
+    again as soon as the document is refreshed. Returns None when the actor
+    cannot be resolved or publishes no key.
+    """
+    return parse_remote_key(resolver.resolve(iri))
+
+
+async def aload_remote_public_key(iri):
+    """Returns the parsed public key of the remote actor, resolving it with httpx."""
+    return parse_remote_key(await resolver.aresolve(iri))
+
+
+def parse_remote_key(remote):
+    """Returns the parsed key of a RemoteActor row, cached by its fingerprint."""
+    if remote is None or not remote.public_key:
+        return None
+
+    key_fingerprint = fingerprint(remote.public_key)
+    public_key = parsed_keys.get(key_fingerprint)
+    if public_key is None:
+        public_key = serialization.load_pem_public_key(remote.public_key.encode())
+        parsed_keys.set(key_fingerprint, public_key)
+    return public_key
+
+
+def load_signing_key(username):
+    """
+    Returns the (actor_id, private_key) pair stored in the vault of the actor.
+
+    Parsed keys are cached by actor and fingerprint, so signing a response
+    costs one indexed lookup and the asymmetric operation, and a rotated key
+    is used at once. Raises PermissionDenied when the actor has no vault.
+    """
+    vault = (
+        Vault.objects.filter(actor__user__username=username)
+        .values_list('actor_id', 'private_key')
+        .first()
+    )
+    if not vault:
+        raise PermissionDenied('Access denied: Private key not found.')
+    return vault[0], parse_local_key(private_keys, *vault, load_private_pem)
+
+
+async def aload_signing_key(username):
+    """Returns the (actor_id, private_key) pair of an actor, using the async ORM."""
+    vault = await (
+        Vault.objects.filter(actor__user__username=username)
+        .values_list('actor_id', 'private_key')
+        .afirst()
+    )
+    if not vault:
+        raise PermissionDenied('Access denied: Private key not found.')
+    return vault[0], parse_local_key(private_keys, *vault, load_private_pem)
+
+
+def evict_actor(actor_id):
+    """Drops every cached key belonging to the given actor."""
+    public_keys.discard(lambda cache_key, _: cache_key[0] == str(actor_id))
+    private_keys.discard(lambda cache_key, _: cache_key[0] == str(actor_id))
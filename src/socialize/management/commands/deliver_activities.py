@@ -0,0 +1,79 @@
+"""Command to deliver queued activities to remote inboxes."""
+#!/usr/bin/python
+#
+# This file is part of django-socialize project.
+#
+# Copyright (C) 2010-2025 William Oliveira de Lagos <william.lagos@icloud.com>
+#
+# Socialize is free software: you can redistribute it and/or modify
+# it under the terms of the Lesser GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Socialize is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Socialize. If not, see <http://www.gnu.org/licenses/>.
+#
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from socialize.services import DeliveryService
+
+
+class Command(BaseCommand):
+    """
+    Posts queued deliveries to remote inboxes, retrying failed ones.
+
+    Recipients whose actors were not cached when their activity was queued
+    are resolved first, outside of any transaction.
+    """
+
+    help = 'Delivers queued activities to remote inboxes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Number of deliveries claimed per batch.',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Number of remote hosts served concurrently.',
+        )
+        parser.add_argument(
+            '--resolvers',
+            type=int,
+            default=8,
+            help='Number of pending recipient actors resolved concurrently.',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=0,
+            help='Keep running, polling the queue every given number of seconds.',
+        )
+
+    def handle(self, *args, **options):
+        service = DeliveryService()
+        while True:
+            while service.resolve_pending(options['batch_size'], options['resolvers']):
+                pass
+            total = 0
+            while sent := service.deliver_pending(
+                options['batch_size'], options['workers']
+            ):
+                total += sent
+            if total:
+                self.stdout.write(f'Attempted {total} deliveries.')
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
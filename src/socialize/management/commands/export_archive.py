@@ -0,0 +1,51 @@
+"""Command to export an actor archive."""
+#!/usr/bin/python
+#
+# This file is part of django-socialize project.
+#
+# Copyright (C) 2010-2025 William Oliveira de Lagos <william.lagos@icloud.com>
+#
+# Socialize is free software: you can redistribute it and/or modify
+# it under the terms of the Lesser GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Socialize is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Socialize. If not, see <http://www.gnu.org/licenses/>.
+#
+
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from socialize.models import Actor
+from socialize.services import ArchiveService
+
+
+class Command(BaseCommand):
+    """Streams an actor's outbox into a gzip-compressed ActivityStreams archive."""
+
+    help = "Exports an actor's outbox as a gzip-compressed archive."
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument(
+            '--output', help='Archive file to write; defaults to stdout.'
+        )
+
+    def handle(self, *args, **options):
+        actor = Actor.objects.filter(user__username=options['username']).first()
+        if actor is None:
+            raise CommandError(f'Actor "{options["username"]}" does not exist.')
+
+        chunks = ArchiveService().export_chunks(actor)
+        if options['output']:
+            with open(options['output'], 'wb') as f:
+                f.writelines(chunks)
+        else:
+            sys.stdout.buffer.writelines(chunks)
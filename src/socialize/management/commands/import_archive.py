@@ -0,0 +1,59 @@
+"""Command to import an actor archive."""
+#!/usr/bin/python
+#
+# This file is part of django-socialize project.
+#
+# Copyright (C) 2010-2025 William Oliveira de Lagos <william.lagos@icloud.com>
+#
+# Socialize is free software: you can redistribute it and/or modify
+# it under the terms of the Lesser GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Socialize is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Socialize. If not, see <http://www.gnu.org/licenses/>.
+#
+
+from django.core.management.base import BaseCommand, CommandError
+
+from socialize.archives import ArchiveError
+from socialize.models import Actor
+from socialize.services import ArchiveService
+
+
+class Command(BaseCommand):
+    """Backfills an actor's outbox from an archive file or a remote outbox."""
+
+    help = 'Imports an ActivityStreams archive or remote outbox into an actor.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument(
+            'source', help='Archive file, gzip-compressed or not, or outbox URL.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of items inserted per bulk insert.',
+        )
+
+    def handle(self, *args, **options):
+        actor = Actor.objects.filter(user__username=options['username']).first()
+        if actor is None:
+            raise CommandError(f'Actor "{options["username"]}" does not exist.')
+
+        service = ArchiveService()
+        try:
+            with service.open_archive(options['source']) as stream:
+                total = service.import_items(
+                    actor, service.iter_items(stream), options['batch_size']
+                )
+        except (ArchiveError, OSError) as e:
+            raise CommandError(f'Could not import archive: {e}') from e
+        self.stdout.write(f'Imported {total} items.')
@@ -0,0 +1,64 @@
+"""Command to drain the inbox ingestion queue."""
+#!/usr/bin/python
+#
+# This file is part of django-socialize project.
+#
+# Copyright (C) 2010-2025 William Oliveira de Lagos <william.lagos@icloud.com>
+#
+# Socialize is free software: you can redistribute it and/or modify
+# it under the terms of the Lesser GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Socialize is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Socialize. If not, see <http://www.gnu.org/licenses/>.
+#
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from socialize.counters import counters
+from socialize.services import InboxService
+
+
+class Command(BaseCommand):
+    """
+    Stores queued inbox activities in batches and runs their side effects.
+
+    Engagement counters buffered while draining are flushed after each round.
+    """
+
+    help = 'Drains the inbox ingestion queue in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Number of queued activities ingested per transaction.',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=0,
+            help='Keep running, polling the queue every given number of seconds.',
+        )
+
+    def handle(self, *args, **options):
+        service = InboxService()
+        while True:
+            total = 0
+            while taken := service.drain(options['batch_size']):
+                total += taken
+            counters.flush()
+            if total:
+                self.stdout.write(f'Ingested {total} queued activities.')
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
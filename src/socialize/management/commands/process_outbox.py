@@ -0,0 +1,58 @@
+"""Command to drain the outbox fan-out queue."""
+#!/usr/bin/python
+#
+# This file is part of django-socialize project.
+#
+# Copyright (C) 2010-2025 William Oliveira de Lagos <william.lagos@icloud.com>
+#
+# Socialize is free software: you can redistribute it and/or modify
+# it under the terms of the Lesser GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Socialize is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Socialize. If not, see <http://www.gnu.org/licenses/>.
+#
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from socialize.services import OutboxService
+
+
+class Command(BaseCommand):
+    """Fans queued local activities out to the timelines of their followers."""
+
+    help = 'Drains the outbox fan-out queue in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Number of queued activities fanned out per transaction.',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=0,
+            help='Keep running, polling the queue every given number of seconds.',
+        )
+
+    def handle(self, *args, **options):
+        service = OutboxService()
+        while True:
+            total = 0
+            while taken := service.drain(options['batch_size']):
+                total += taken
+            if total:
+                self.stdout.write(f'Fanned out {total} queued activities.')
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,54 @@
+"""Command to purge expired access tokens in chunks."""
+#!/usr/bin/python
+#
+# This file is part of django-socialize project.
+#
+# Copyright (C) 2010-2025 William Oliveira de Lagos <william.lagos@icloud.com>
+#
+# Socialize is free software: you can redistribute it and/or modify
+# it under the terms of the Lesser GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Socialize is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Socialize. If not, see <http://www.gnu.org/licenses/>.
+#
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from socialize.services import AuthenticationService
+
+
+class Command(BaseCommand):
+    """Deletes expired access tokens in short chunked transactions."""
+
+    help = 'Purges expired access tokens in chunks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Number of expired tokens deleted per transaction.',
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0,
+            help='Seconds to wait between chunks, leaving room to other writers.',
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        while purged := AuthenticationService.purge_tokens(options['chunk_size']):
+            total += purged
+            if options['pause']:
+                time.sleep(options['pause'])
+        self.stdout.write(f'Purged {total} expired tokens.')
@@ -0,0 +1,63 @@
+"""Command to refill the pool of pre-generated actor key pairs."""
+#!/usr/bin/python
+#
+# This file is part of django-socialize project.
+#
+# Copyright (C) 2010-2025 William Oliveira de Lagos <william.lagos@icloud.com>
+#
+# Socialize is free software: you can redistribute it and/or modify
+# it under the terms of the Lesser GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Socialize is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Socialize. If not, see <http://www.gnu.org/licenses/>.
+#
+
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from socialize.services import KeyPoolService
+
+
+class Command(BaseCommand):
+    """Generates key pairs ahead of time so signups skip RSA generation."""
+
+    help = 'Refills the pool of pre-generated actor key pairs.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--size',
+            type=int,
+            default=getattr(settings, 'SOCIALIZE_KEY_POOL_SIZE', 100),
+            help='Number of key pairs the pool should hold.',
+        )
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Number of worker processes generating keys.',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=0,
+            help='Keep running, checking the pool every given number of seconds.',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            created = KeyPoolService.refill(options['size'], options['processes'])
+            if created:
+                self.stdout.write(f'Generated {created} key pairs.')
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
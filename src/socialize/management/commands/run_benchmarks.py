@@ -0,0 +1,75 @@
+"""Command to benchmark the socialize endpoints."""
+#!/usr/bin/python
+#
+# This file is part of django-socialize project.
+#
+# Copyright (C) 2010-2025 William Oliveira de Lagos <william.lagos@icloud.com>
+#
+# Socialize is free software: you can redistribute it and/or modify
+# it under the terms of the Lesser GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Socialize is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Socialize. If not, see <http://www.gnu.org/licenses/>.
+#
+
+import json
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from socialize.benchmarks import BenchmarkSuite, SocialGraphGenerator
+
+
+class Command(BaseCommand):
+    """Generates a synthetic social graph and times the hot endpoints on it."""
+
+    help = 'Benchmarks the socialize endpoints on a synthetic social graph.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--actors', type=int, default=100)
+        parser.add_argument('--objects', type=int, default=1000)
+        parser.add_argument('--activities', type=int, default=5000)
+        parser.add_argument('--iterations', type=int, default=100)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--scenario',
+            action='append',
+            dest='scenarios',
+            help='Only run the given scenario; may be repeated.',
+        )
+        parser.add_argument(
+            '--output', help='Write the JSON report to this file instead of stdout.'
+        )
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Keep the generated rows instead of rolling them back.',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            dataset = SocialGraphGenerator(
+                actors=options['actors'],
+                objects=options['objects'],
+                activities=options['activities'],
+                seed=options['seed'],
+            ).generate()
+            report = BenchmarkSuite(dataset).run(
+                options['iterations'], only=options['scenarios']
+            )
+            if not options['keep']:
+                transaction.set_rollback(True)
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                f.write(output)
+        else:
+            self.stdout.write(output)
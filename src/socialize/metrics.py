@@ -0,0 +1,186 @@
+"""Per-request performance instrumentation for the socialize app."""
+#!/usr/bin/python
+#
+# This file is part of django-socialize project.
+#
+# Copyright (C) 2010-2025 William Oliveira de Lagos <william.lagos@icloud.com>
+#
+# Socialize is free software: you can redistribute it and/or modify
+# it under the terms of the Lesser GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Socialize is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Socialize. If not, see <http://www.gnu.org/licenses/>.
+#
+
+import bisect
+import contextvars
+import threading
+import time
+
+from contextlib import contextmanager
+
+# Upper bounds, in seconds, of the latency histogram buckets.
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+current_timings = contextvars.ContextVar('socialize_timings', default=None)
+
+
+class RequestTimings:
+    """Accumulates the time spent in each phase of a single request."""
+
+    def __init__(self):
+        self.phases = {}
+        self.queries = 0
+
+    def add(self, phase, seconds):
+        """Adds the duration of one occurrence of the phase."""
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def server_timing(self):
+        """Returns the phases formatted as a Server-Timing header value."""
+        entries = []
+        for phase, seconds in self.phases.items():
+            entry = f'{phase};dur={seconds * 1000:.2f}'
+            if phase == 'sql':
+                entry += f';desc="{self.queries} queries"'
+            entries.append(entry)
+        return ', '.join(entries)
+
+
+@contextmanager
+def timed(phase):
+    """Records the time spent in the block on the current request, if any."""
+    timings = current_timings.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(phase, time.perf_counter() - started)
+
+
+def record_query(execute, sql, params, many, context):
+    """Database execute wrapper counting and timing the queries of a request."""
+    timings = current_timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.queries += 1
+        timings.add('sql', time.perf_counter() - started)
+
+
+def install_query_recorder(connection):
+    """Adds record_query to the execute wrappers of a database connection, once."""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class Histogram:
+    """Cumulative latency histogram in the Prometheus bucket layout."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        """Adds an observation to the histogram."""
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Aggregates request timings into per-route, per-phase histograms."""
+
+    def __init__(self):
+        self.durations = {}
+        self.queries = {}
+        self.batches = {}
+        self.batch_items = {}
+        self._lock = threading.Lock()
+
+    def observe(self, route, timings):
+        """Folds the timings of a finished request into the histograms."""
+        with self._lock:
+            for phase, seconds in timings.phases.items():
+                histogram = self.durations.setdefault((route, phase), Histogram())
+                histogram.observe(seconds)
+            self.queries[route] = self.queries.get(route, 0) + timings.queries
+
+    def observe_batch(self, name, items, seconds):
+        """Records the duration and size of a batch run by an executor."""
+        with self._lock:
+            self.batches.setdefault(name, Histogram()).observe(seconds)
+            self.batch_items[name] = self.batch_items.get(name, 0) + items
+
+    def clear(self):
+        """Drops every recorded observation."""
+        with self._lock:
+            self.durations.clear()
+            self.queries.clear()
+            self.batches.clear()
+            self.batch_items.clear()
+
+    def render(self):
+        """Returns the metrics in the Prometheus text exposition format."""
+        lines = [
+            '# HELP socialize_request_duration_seconds Time spent per request phase.',
+            '# TYPE socialize_request_duration_seconds histogram',
+        ]
+        with self._lock:
+            for (route, phase), histogram in sorted(self.durations.items()):
+                lines += self.render_histogram(
+                    'socialize_request_duration_seconds',
+                    f'route="{route}",phase="{phase}"',
+                    histogram,
+                )
+            lines += [
+                '# HELP socialize_request_queries_total SQL queries run per route.',
+                '# TYPE socialize_request_queries_total counter',
+            ]
+            for route, count in sorted(self.queries.items()):
+                lines.append(
+                    f'socialize_request_queries_total{{route="{route}"}} {count}'
+                )
+            lines += [
+                '# HELP socialize_batch_duration_seconds Time spent per batch.',
+                '# TYPE socialize_batch_duration_seconds histogram',
+            ]
+            for name, histogram in sorted(self.batches.items()):
+                lines += self.render_histogram(
+                    'socialize_batch_duration_seconds', f'batch="{name}"', histogram
+                )
+            lines += [
+                '# HELP socialize_batch_items_total Items processed by batches.',
+                '# TYPE socialize_batch_items_total counter',
+            ]
+            for name, count in sorted(self.batch_items.items()):
+                lines.append(f'socialize_batch_items_total{{batch="{name}"}} {count}')
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def render_histogram(metric, labels, histogram):
+        """Returns the bucket, sum and count lines of a labelled histogram."""
+        lines, cumulative = [], 0
+        for bound, count in zip(BUCKETS + ('+Inf',), histogram.counts):
+            cumulative += count
+            lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{metric}_sum{{{labels}}} {histogram.sum}')
+        lines.append(f'{metric}_count{{{labels}}} {histogram.count}')
+        return lines
+
+
+registry = MetricsRegistry()
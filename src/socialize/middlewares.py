@@ -20,80 +20,287 @@
 # along with Socialize. If not, see <http://www.gnu.org/licenses/>.
 #
 
-import base64
 import logging
+import time
 
-from cryptography.hazmat.primitives import serialization
-from cryptography.hazmat.primitives.asymmetric import padding
-from cryptography.hazmat.primitives.hashes import SHA256
-from cryptography.exceptions import InvalidSignature
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.core.exceptions import PermissionDenied
+from django.urls import Resolver404, get_resolver
 
-from django.http import JsonResponse
+from . import httpsig
+from .compat import ASYNC_SUPPORTED, aget_user
+from .keys import (
+    aload_key_by_id,
+    aload_signing_key,
+    load_key_by_id,
+    load_signing_key,
+)
+from .tokens import aget_token_user, get_token_user
+from .metrics import (
+    RequestTimings,
+    current_timings,
+    registry,
+    timed,
+)
+from .responses import JsonResponse
+from .verification import verifier
 
-from .models import Actor
-from .services import VaultService
+logger = logging.getLogger(__name__)
+
+
+class BearerTokenMiddleware:
+    """
+    Middleware authenticating API requests with ``Authorization: Bearer`` tokens.
+
+    It must come after Django's AuthenticationMiddleware: requests carrying
+    a valid token are authenticated as the token's user, requests carrying
+    an invalid or expired one are answered with 401, and the others are left
+    to the session authentication.
+    """
+
+    sync_capable = True
+    async_capable = ASYNC_SUPPORTED
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        token = self.get_token(request)
+        if token is not None:
+            user = get_token_user(token)
+            if user is None:
+                return self.unauthorized()
+            self.login(request, user)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        """Authenticates requests served by async views, without thread hops."""
+        token = self.get_token(request)
+        if token is not None:
+            user = await aget_token_user(token)
+            if user is None:
+                return self.unauthorized()
+            self.login(request, user)
+        return await self.get_response(request)
+
+    @staticmethod
+    def get_token(request):
+        """Returns the bearer token of the request, or None if it has none."""
+        scheme, _, token = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+        if scheme.lower() != 'bearer':
+            return None
+        return token.strip()
+
+    @staticmethod
+    def login(request, user):
+        """Authenticates the request as the given user, for this request only."""
+
+        async def auser():
+            return user
+
+        request.user = user
+        request.auser = auser
+        request._dont_enforce_csrf_checks = True  # pylint: disable=protected-access
+
+    @staticmethod
+    def unauthorized():
+        """Returns the response to requests with invalid or expired tokens."""
+        response = JsonResponse({'error': 'Invalid token'}, status=401)
+        response['WWW-Authenticate'] = 'Bearer error="invalid_token"'
+        return response
 
 
 class ActivityPubSigningMiddleware:
-    """Middleware to handle signing and verifying ActivityPub requests."""
+    """
+    Middleware to handle signing and verifying ActivityPub requests.
+
+    Only routes declaring a signing policy in their URL kwargs pay for the
+    cryptography: ``verify_signature`` routes reject mutating requests that
+    are not signed, and ``sign_response`` routes sign their responses with
+    the key of the actor named by the route (or of the logged-in user).
+    """
+
+    sync_capable = True
+    async_capable = ASYNC_SUPPORTED
 
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
-        # Process incoming request
-        if request.method in ['POST', 'PUT', 'PATCH']:
-            if not self.verify_request(request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        policy = self.get_policy(request)
+        if policy.get('verify_signature'):
+            with timed('verify'):
+                verified = self.verify_request(request)
+            if not verified:
                 return JsonResponse({'error': 'Invalid signature'}, status=400)
 
         response = self.get_response(request)
 
-        # Process outgoing response
-        if request.method in ['POST', 'PUT', 'PATCH']:
-            self.sign_response(request, response)
+        if policy.get('sign_response'):
+            with timed('sign'):
+                try:
+                    self.sign_response(request, response, policy.get('username'))
+                except PermissionDenied:
+                    logger.info('No key to sign the response of %s', request.path)
+
+        return response
+
+    async def __acall__(self, request):
+        """Verifies and signs requests served by async views."""
+        policy = self.get_policy(request)
+        if policy.get('verify_signature'):
+            with timed('verify'):
+                verified = await self.averify_request(request)
+            if not verified:
+                return JsonResponse({'error': 'Invalid signature'}, status=400)
+
+        response = await self.get_response(request)
+
+        if policy.get('sign_response'):
+            with timed('sign'):
+                try:
+                    await self.asign_response(request, response, policy.get('username'))
+                except PermissionDenied:
+                    logger.info('No key to sign the response of %s', request.path)
 
         return response
 
-    def sign_response(self, request, response):
-        """Signs an outgoing response using the Actor's private key."""
-        username = request.user.username
-        data = response.content.decode()
-        signature = self.sign_request(username, data)
-        response['Signature'] = signature
+    @staticmethod
+    def get_policy(request):
+        """Returns the URL kwargs holding the signing policy of a mutating request."""
+        if request.method not in ('POST', 'PUT', 'PATCH'):
+            return {}
+        try:
+            match = get_resolver(getattr(request, 'urlconf', None)).resolve(
+                request.path_info
+            )
+        except Resolver404:
+            return {}
+        return match.kwargs
 
-    def sign_request(self, username, data):
-        """Signs an outgoing request using the Actor's private key."""
-        private_key_pem = VaultService.get_private_key(username)
-        private_key = serialization.load_pem_private_key(
-            private_key_pem.encode(), password=None
-        )
-        signature = private_key.sign(data.encode(), padding.PKCS1v15(), SHA256())
+    def sign_response(self, request, response, username=None):
+        """Signs the Date and Digest of a response with the Actor's private key."""
+        actor_id, private_key = load_signing_key(username or request.user.username)
+        httpsig.sign_response(response, private_key, httpsig.get_key_id(actor_id))
 
-        return base64.b64encode(signature).decode()
+    async def asign_response(self, request, response, username=None):
+        """Signs the Date and Digest of a response, loading the key on a miss."""
+        if username is None:
+            username = (await aget_user(request)).username
+        actor_id, private_key = await aload_signing_key(username)
+        httpsig.sign_response(response, private_key, httpsig.get_key_id(actor_id))
 
     def verify_request(self, request):
-        """Verifies an incoming request using the Actor's public key."""
-        username = request.META.get('HTTP_USERNAME')
-        received_signature = request.META.get('HTTP_SIGNATURE')
-        data = request.body.decode()
+        """
+        Verifies the HTTP Signature of an incoming request.
 
-        if not username or not received_signature:
+        The signature covers a few headers, among them a Digest checked
+        against the raw body bytes, so the asymmetric operation costs the
+        same whatever the size of the payload. Keys are looked up by keyId,
+        in the local actors or in the remote actor cache, and signatures
+        already verified over the same headers are accepted from memory.
+        """
+        prepared = self.prepare(request)
+        if prepared is None:
             return False
+        params, string = prepared
+        if httpsig.is_verified(params, string):
+            return self.accept(request, params)
 
-        actor = Actor.objects.get(username=username)
-        if not actor:
+        public_key = load_key_by_id(params['keyId'])
+        if public_key is None or not httpsig.verify(public_key, params, string):
             return False
+        return self.accept(request, params)
 
-        public_key_pem = actor.public_key
-        public_key = serialization.load_pem_public_key(public_key_pem.encode())
+    async def averify_request(self, request):
+        """Verifies the HTTP Signature of a request, loading the key on a miss."""
+        prepared = self.prepare(request)
+        if prepared is None:
+            return False
+        params, string = prepared
+        if httpsig.is_verified(params, string):
+            return self.accept(request, params)
 
-        decoded_signature = base64.b64decode(received_signature)
+        # The key operation runs on the verifier pool, off the event loop.
+        public_key = await aload_key_by_id(params['keyId'])
+        if public_key is None or not await verifier.averify(public_key, params, string):
+            return False
+        return self.accept(request, params)
 
+    @staticmethod
+    def prepare(request):
+        """Returns the parsed signature and signing string, or None if invalid."""
         try:
-            public_key.verify(
-                decoded_signature, data.encode(), padding.PKCS1v15(), SHA256()
-            )
-            return True
-        except (InvalidSignature, ValueError):
-            logging.exception('Error verifying signature.')
-            return False
+            return httpsig.prepare_request(request)
+        except httpsig.SignatureError as e:
+            logger.info('Rejected signature: %s', e)
+            return None
+
+    @staticmethod
+    def accept(request, params):
+        """Records the key that signed the request for the views."""
+        request.signature_key_id = params['keyId']
+        return True
+
+
+class InstrumentationMiddleware:
+    """
+    Middleware recording where the time of each request goes.
+
+    SQL queries, signature verification and signing, and JSON encoding are
+    timed separately, returned in a Server-Timing header and aggregated per
+    route for the metrics endpoint. It should be placed before the signing
+    middleware. Queries are recorded by a wrapper installed on every database
+    connection, which charges them to the request found in a context
+    variable, so the queries the async ORM runs in worker threads count too.
+    The wrapper is installed by a connection_created receiver, see signals.
+    """
+
+    sync_capable = True
+    async_capable = ASYNC_SUPPORTED
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        return self.finish(request, response, timings, started)
+
+    async def __acall__(self, request):
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        return self.finish(request, response, timings, started)
+
+    def finish(self, request, response, timings, started):
+        """Adds the Server-Timing header and aggregates the request timings."""
+        timings.add('total', time.perf_counter() - started)
+        match = getattr(request, 'resolver_match', None)
+        registry.observe(match.url_name if match else 'unmatched', timings)
+        response['Server-Timing'] = timings.server_timing()
+        return response
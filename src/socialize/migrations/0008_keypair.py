@@ -0,0 +1,30 @@
+# Written by hand, checked against makemigrations on Django 5.2.18
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('socialize', '0007_remove_actor_username_actor_score_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KeyPair',
+            fields=[
+                (
+                    'id',
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ('private_key', models.TextField()),
+                ('public_key', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
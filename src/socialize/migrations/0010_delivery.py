@@ -0,0 +1,57 @@
+# Written by hand, checked against makemigrations on Django 5.2.18
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('socialize', '0009_inboxitem'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Delivery',
+            fields=[
+                (
+                    'id',
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                ('inbox', models.URLField(max_length=500)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                (
+                    'next_attempt_at',
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                ('delivered_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True, default='')),
+                (
+                    'activity',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to='socialize.activity',
+                    ),
+                ),
+            ],
+            options={
+                'indexes': [
+                    models.Index(
+                        condition=models.Q(('delivered_at__isnull', True)),
+                        fields=['next_attempt_at'],
+                        name='delivery_pending_idx',
+                    )
+                ],
+                'constraints': [
+                    models.UniqueConstraint(
+                        fields=('activity', 'inbox'), name='unique_delivery_inbox'
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Written by hand, checked against makemigrations on Django 5.2.18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('socialize', '0011_actor_updated_at_object_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='activity',
+            index=models.Index(
+                fields=['actor', '-published_at', '-id'],
+                name='activity_actor_published_idx',
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='activity',
+            index=models.Index(
+                fields=['activity_type', 'published_at'],
+                name='activity_type_published_idx',
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='object',
+            index=models.Index(
+                fields=['actor', '-published_at', '-id'],
+                name='object_actor_published_idx',
+            ),
+        ),
+    ]
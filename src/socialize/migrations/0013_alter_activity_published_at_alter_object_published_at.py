@@ -0,0 +1,23 @@
+# Written by hand, checked against makemigrations on Django 5.2.18
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('socialize', '0012_activity_object_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='activity',
+            name='published_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AlterField(
+            model_name='object',
+            name='published_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Written by hand, checked against makemigrations on Django 5.2.18
+
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('socialize', '0013_alter_activity_published_at_alter_object_published_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                (
+                    'id',
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ('object_data', models.JSONField()),
+                (
+                    'published_at',
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                (
+                    'owner',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to='socialize.actor',
+                    ),
+                ),
+            ],
+            options={
+                'indexes': [
+                    models.Index(
+                        fields=['owner', '-published_at', '-id'],
+                        name='timeline_owner_published_idx',
+                    )
+                ],
+            },
+        ),
+    ]
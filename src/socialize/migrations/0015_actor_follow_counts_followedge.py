@@ -0,0 +1,65 @@
+# Written by hand, checked against makemigrations on Django 5.2.18
+
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('socialize', '0014_timelineentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='actor',
+            name='followers_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='actor',
+            name='following_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='FollowEdge',
+            fields=[
+                (
+                    'id',
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ('follower', models.CharField(max_length=500)),
+                ('followed', models.CharField(max_length=500)),
+                (
+                    'activity_iri',
+                    models.CharField(blank=True, default='', max_length=500),
+                ),
+                (
+                    'created_at',
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+            ],
+            options={
+                'indexes': [
+                    models.Index(
+                        fields=['followed', '-created_at', '-id'],
+                        name='follow_followed_created_idx',
+                    ),
+                    models.Index(
+                        fields=['follower', '-created_at', '-id'],
+                        name='follow_follower_created_idx',
+                    ),
+                ],
+                'constraints': [
+                    models.UniqueConstraint(
+                        fields=('follower', 'followed'), name='unique_follow_edge'
+                    )
+                ],
+            },
+        ),
+    ]
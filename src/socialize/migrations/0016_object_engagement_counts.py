@@ -0,0 +1,27 @@
+# Written by hand, checked against makemigrations on Django 5.2.18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('socialize', '0015_actor_follow_counts_followedge'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='object',
+            name='likes_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='object',
+            name='shares_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='object',
+            name='replies_count',
+            field=models.IntegerField(default=0),
+        ),
+    ]
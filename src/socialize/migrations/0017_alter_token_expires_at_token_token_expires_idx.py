@@ -0,0 +1,22 @@
+# Written by hand, checked against makemigrations on Django 5.2.18
+
+import socialize.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('socialize', '0016_object_engagement_counts'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='token',
+            name='expires_at',
+            field=models.DateTimeField(default=socialize.models.token_expiry),
+        ),
+        migrations.AddIndex(
+            model_name='token',
+            index=models.Index(fields=['expires_at'], name='token_expires_idx'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Written by hand, checked against makemigrations on Django 5.2.18
+
+from django.db import migrations, models
+
+
+def backfill_iris(apps, schema_editor):
+    """Copies the id of stored activities, skipping duplicates of an inbox."""
+    Activity = apps.get_model('socialize', 'Activity')
+    seen = set()
+    batch = []
+    rows = Activity.objects.order_by('published_at', 'id').only(
+        'id', 'actor_id', 'object_data'
+    )
+    for activity in rows.iterator(chunk_size=2000):
+        data = activity.object_data
+        iri = data.get('id') if isinstance(data, dict) else None
+        if not isinstance(iri, str) or len(iri) > 500:
+            continue
+        if (activity.actor_id, iri) in seen:
+            continue
+        seen.add((activity.actor_id, iri))
+        activity.iri = iri
+        batch.append(activity)
+        if len(batch) >= 2000:
+            Activity.objects.bulk_update(batch, ['iri'])
+            batch = []
+    Activity.objects.bulk_update(batch, ['iri'])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('socialize', '0017_alter_token_expires_at_token_token_expires_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activity',
+            name='iri',
+            field=models.CharField(blank=True, max_length=500, null=True),
+        ),
+        migrations.RunPython(backfill_iris, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='activity',
+            constraint=models.UniqueConstraint(
+                fields=('actor', 'iri'), name='unique_activity_iri'
+            ),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Written by hand, checked against makemigrations on Django 5.2.18
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('socialize', '0018_activity_iri'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RemoteActor',
+            fields=[
+                (
+                    'id',
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                ('iri', models.CharField(max_length=500, unique=True)),
+                ('document', models.JSONField(null=True)),
+                ('public_key', models.TextField(blank=True, default='')),
+                ('key_id', models.CharField(blank=True, default='', max_length=500)),
+                ('fetched_at', models.DateTimeField(null=True)),
+                (
+                    'checked_at',
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+            ],
+            options={
+                'indexes': [
+                    models.Index(fields=['key_id'], name='remote_actor_key_idx')
+                ],
+            },
+        ),
+    ]
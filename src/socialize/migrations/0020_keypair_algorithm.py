@@ -0,0 +1,17 @@
+# Written by hand, checked against makemigrations on Django 5.2.18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('socialize', '0019_remoteactor'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='keypair',
+            name='algorithm',
+            field=models.CharField(default='rsa', max_length=16),
+        ),
+    ]
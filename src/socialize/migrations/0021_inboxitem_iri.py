@@ -0,0 +1,17 @@
+# Written by hand, checked against makemigrations on Django 5.2.18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('socialize', '0020_keypair_algorithm'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inboxitem',
+            name='iri',
+            field=models.CharField(blank=True, max_length=500, null=True),
+        ),
+    ]
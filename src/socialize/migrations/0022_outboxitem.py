@@ -0,0 +1,41 @@
+# Written by hand, checked against makemigrations on Django 5.2.18
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('socialize', '0021_inboxitem_iri'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxItem',
+            fields=[
+                (
+                    'id',
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                ('payload', models.JSONField()),
+                (
+                    'published_at',
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                ('queued_at', models.DateTimeField(auto_now_add=True)),
+                (
+                    'actor',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to='socialize.actor',
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Written by hand, checked against makemigrations on Django 5.2.18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('socialize', '0022_outboxitem'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboxitem',
+            name='activity',
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                to='socialize.activity',
+            ),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Written by hand, checked against makemigrations on Django 5.2.18
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('socialize', '0023_outboxitem_activity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingRecipient',
+            fields=[
+                (
+                    'id',
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                ('iri', models.CharField(max_length=500)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                (
+                    'next_attempt_at',
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                (
+                    'activity',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to='socialize.activity',
+                    ),
+                ),
+            ],
+            options={
+                'constraints': [
+                    models.UniqueConstraint(
+                        fields=('activity', 'iri'), name='unique_pending_recipient'
+                    )
+                ],
+            },
+        ),
+    ]
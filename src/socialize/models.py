@@ -21,12 +21,18 @@
 #
 
 import datetime
+import re
 import uuid
 
+from urllib.parse import urlsplit
+
+from django.conf import settings
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils.timezone import now
 
+LOCAL_PATH = re.compile(r'/(actors|objects)/([0-9a-f-]{36})')
+
 
 class Actor(models.Model):
     """Represents an actor in the social network. (e.g. Person, Group)"""
@@ -39,8 +45,11 @@ class Actor(models.Model):
     actor_type = models.CharField(max_length=50, default='Person')
     public_key = models.TextField()
     score = models.IntegerField(default=0)
+    followers_count = models.IntegerField(default=0)
+    following_count = models.IntegerField(default=0)
 
     joined_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     bio = models.TextField(default='', max_length=140)
     title = models.CharField(default='', max_length=50)
     birthdate = models.DateTimeField(default=now)
@@ -51,7 +60,7 @@ class Actor(models.Model):
 
     def get_actor_url(self):
         """Returns the URL of the actor."""
-        return f'/actors/{self.id}'
+        return actor_url(self.id)
 
     def get_display_name(self):
         """Returns the display name of the actor."""
@@ -63,15 +72,10 @@ class Actor(models.Model):
 
     def as_activitypub(self):
         """Returns the actor as an ActivityPub object."""
-        return {
-            '@context': 'https://www.w3.org/ns/activitystreams',
-            'name': self.get_display_name() or self.user.username,
-            'id': self.get_actor_url(),
-            'type': self.actor_type,
-            'summary': self.bio,
-            'inbox': self.inbox,
-            'outbox': self.outbox,
-        }
+        from .serializers import ActorSerializer  # pylint: disable=import-outside-toplevel
+
+        serializer = ActorSerializer()
+        return serializer.serialize(serializer.row(self))
 
 
 class Activity(models.Model):
@@ -82,7 +86,96 @@ class Activity(models.Model):
     activity_type = models.CharField(max_length=50)
     actor = models.ForeignKey(Actor, on_delete=models.CASCADE)
     object_data = models.JSONField()  # Stores activity object data as JSON.
-    published_at = models.DateTimeField(auto_now_add=True)
+    iri = models.CharField(max_length=500, null=True, blank=True)  # The "id".
+    published_at = models.DateTimeField(default=now)
+
+    class Meta:
+        """Meta options for the Activity model."""
+
+        constraints = [
+            # Replayed deliveries: one row per activity IRI and inbox.
+            models.UniqueConstraint(
+                fields=['actor', 'iri'], name='unique_activity_iri'
+            ),
+        ]
+        indexes = [
+            # Outbox pages: filter on actor, keyset on (published_at, id).
+            models.Index(
+                fields=['actor', '-published_at', '-id'],
+                name='activity_actor_published_idx',
+            ),
+            models.Index(
+                fields=['activity_type', 'published_at'],
+                name='activity_type_published_idx',
+            ),
+        ]
+
+
+class Delivery(models.Model):
+    """Represents the delivery of a local activity to a remote inbox."""
+
+    activity = models.ForeignKey(Activity, on_delete=models.CASCADE)
+    inbox = models.URLField(max_length=500)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=now)
+    delivered_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True, default='')
+
+    class Meta:
+        """Meta options for the Delivery model."""
+
+        constraints = [
+            models.UniqueConstraint(
+                fields=['activity', 'inbox'], name='unique_delivery_inbox'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['next_attempt_at'],
+                condition=models.Q(delivered_at__isnull=True),
+                name='delivery_pending_idx',
+            ),
+        ]
+
+
+class PendingRecipient(models.Model):
+    """Represents a remote actor to resolve before an activity is delivered to it."""
+
+    activity = models.ForeignKey(Activity, on_delete=models.CASCADE)
+    iri = models.CharField(max_length=500)  # IRI of the recipient actor.
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=now)
+
+    class Meta:
+        """Meta options for the PendingRecipient model."""
+
+        constraints = [
+            models.UniqueConstraint(
+                fields=['activity', 'iri'], name='unique_pending_recipient'
+            ),
+        ]
+
+
+class InboxItem(models.Model):
+    """Represents an inbound activity queued for ingestion into an inbox."""
+
+    username = models.CharField(max_length=150)
+    payload = models.JSONField()
+    iri = models.CharField(max_length=500, null=True, blank=True)  # Trusted "id".
+    received_at = models.DateTimeField(auto_now_add=True)
+
+
+class OutboxItem(models.Model):
+    """Represents a local activity queued for fan-out to the author's followers."""
+
+    actor = models.ForeignKey(Actor, on_delete=models.CASCADE)
+    payload = models.JSONField()
+    published_at = models.DateTimeField(default=now)
+    queued_at = models.DateTimeField(auto_now_add=True)
+    # Stored activity delivered to remote followers, if any.
+    activity = models.ForeignKey(
+        Activity, on_delete=models.CASCADE, null=True, blank=True
+    )
 
 
 class Object(models.Model):
@@ -92,22 +185,100 @@ class Object(models.Model):
     object_type = models.CharField(max_length=50, default='Note')
     content = models.TextField()
     actor = models.ForeignKey(Actor, on_delete=models.CASCADE)
-    published_at = models.DateTimeField(auto_now_add=True)
+    published_at = models.DateTimeField(default=now)
+    updated_at = models.DateTimeField(auto_now=True)
+    likes_count = models.IntegerField(default=0)
+    shares_count = models.IntegerField(default=0)
+    replies_count = models.IntegerField(default=0)
+
+    class Meta:
+        """Meta options for the Object model."""
+
+        indexes = [
+            models.Index(
+                fields=['actor', '-published_at', '-id'],
+                name='object_actor_published_idx',
+            ),
+        ]
 
     def get_object_url(self):
         """Returns the URL of the object."""
-        return f'/objects/{self.id}'
+        return object_url(self.id)
 
     def as_activitypub(self):
         """Returns the object as an ActivityPub object."""
+        from .serializers import ObjectSerializer  # pylint: disable=import-outside-toplevel
+
+        serializer = ObjectSerializer()
+        return serializer.serialize(serializer.row(self))
+
+
+class FollowEdge(models.Model):
+    """Represents a follow relationship between two actors, local or remote."""
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    follower = models.CharField(max_length=500)  # IRI of the following actor.
+    followed = models.CharField(max_length=500)  # IRI of the followed actor.
+    activity_iri = models.CharField(max_length=500, blank=True, default='')
+    created_at = models.DateTimeField(default=now)
+
+    class Meta:
+        """Meta options for the FollowEdge model."""
+
+        constraints = [
+            models.UniqueConstraint(
+                fields=['follower', 'followed'], name='unique_follow_edge'
+            ),
+        ]
+        indexes = [
+            # Followers collections: filter on followed, keyset on created_at.
+            models.Index(
+                fields=['followed', '-created_at', '-id'],
+                name='follow_followed_created_idx',
+            ),
+            # Following collections: filter on follower, keyset on created_at.
+            models.Index(
+                fields=['follower', '-created_at', '-id'],
+                name='follow_follower_created_idx',
+            ),
+        ]
+
+
+class RemoteActor(models.Model):
+    """Represents the cached document of an actor living on another server."""
+
+    iri = models.CharField(max_length=500, unique=True)
+    document = models.JSONField(null=True)  # None until fetched successfully.
+    public_key = models.TextField(blank=True, default='')
+    key_id = models.CharField(max_length=500, blank=True, default='')
+    fetched_at = models.DateTimeField(null=True)  # Last successful fetch.
+    checked_at = models.DateTimeField(default=now)  # Last fetch attempt.
+
+    class Meta:
+        """Meta options for the RemoteActor model."""
+
+        indexes = [
+            models.Index(fields=['key_id'], name='remote_actor_key_idx'),
+        ]
+
+
+class TimelineEntry(models.Model):
+    """Represents an activity materialized into the home timeline of an actor."""
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(Actor, on_delete=models.CASCADE)
+    object_data = models.JSONField()  # Copy of the activity, read without joins.
+    published_at = models.DateTimeField(default=now)
+
+    class Meta:
+        """Meta options for the TimelineEntry model."""
 
-        return {
-            '@context': 'https://www.w3.org/ns/activitystreams',
-            'type': self.object_type,
-            'content': self.content,
-            'actor': self.actor.get_actor_url(),
-            'id': self.get_object_url(),
-        }
+        indexes = [
+            models.Index(
+                fields=['owner', '-published_at', '-id'],
+                name='timeline_owner_published_idx',
+            ),
+        ]
 
 
 class Vault(models.Model):
@@ -124,12 +295,35 @@ class Vault(models.Model):
         verbose_name_plural = 'Vaults'
 
 
+class KeyPair(models.Model):
+    """Represents a pre-generated key pair waiting to be assigned to an actor."""
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    private_key = models.TextField()
+    public_key = models.TextField()
+    algorithm = models.CharField(max_length=16, default='rsa')  # rsa or ed25519
+    created_at = models.DateTimeField(auto_now_add=True)
+
+
+def token_expiry():
+    """Returns the expiry time of a token issued now."""
+    return now() + datetime.timedelta(hours=1)
+
+
 class Token(models.Model):
     """Represents an OAuth standard token in the social network. (e.g. Access, Refresh)"""
 
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     access_token = models.CharField(max_length=255, unique=True, default=uuid.uuid4)
-    expires_at = models.DateTimeField(default=now() + datetime.timedelta(hours=1))
+    expires_at = models.DateTimeField(default=token_expiry)
+
+    class Meta:
+        """Meta options for the Token model."""
+
+        indexes = [
+            # Expiry purges: range scans on expires_at, oldest first.
+            models.Index(fields=['expires_at'], name='token_expires_idx'),
+        ]
 
     def is_valid(self):
         """Returns whether the token is still valid."""
@@ -138,11 +332,41 @@ class Token(models.Model):
     def refresh(self):
         """Refreshes the token and returns the new access token."""
         self.access_token = uuid.uuid4()
-        self.expires_at = now() + datetime.timedelta(hours=1)
+        self.expires_at = token_expiry()
         self.save()
         return self.access_token
 
 
+def local_url(path):
+    """Returns the absolute URL of a local path, relative when no SITE_DOMAIN."""
+    domain = getattr(settings, 'SITE_DOMAIN', None)
+    return f'https://{domain}{path}' if domain else path
+
+
+def local_id(iri, collection):
+    """
+    Returns the id in the IRI of a local actor or object, or None if remote.
+
+    Both the relative and the absolute forms of local IRIs are recognized,
+    the latter only on SITE_DOMAIN.
+    """
+    parts = urlsplit(str(iri or ''))
+    if parts.netloc and parts.netloc != getattr(settings, 'SITE_DOMAIN', None):
+        return None
+    match = LOCAL_PATH.fullmatch(parts.path)
+    return match.group(2) if match and match.group(1) == collection else None
+
+
+def actor_url(pk):
+    """Returns the URL of the actor with the given id."""
+    return local_url(f'/actors/{pk}')
+
+
+def object_url(pk):
+    """Returns the URL of the object with the given id."""
+    return local_url(f'/objects/{pk}')
+
+
 def user(name):
     """Returns the user with the given username."""
     return User.objects.filter(username=name)[0]
@@ -0,0 +1,203 @@
+"""Keyset pagination for ActivityStreams collections."""
+#!/usr/bin/python
+# pylint: disable=E1101
+#
+# This file is part of django-socialize project.
+#
+# Copyright (C) 2010-2025 William Oliveira de Lagos <william.lagos@icloud.com>
+#
+# Socialize is free software: you can redistribute it and/or modify
+# it under the terms of the Lesser GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Socialize is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Socialize. If not, see <http://www.gnu.org/licenses/>.
+#
+
+import base64
+import binascii
+import datetime
+import uuid
+
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+
+from .compat import aiterator
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+
+def encode_cursor(published_at, pk):
+    """Encodes a (timestamp, id) pair into an opaque URL-safe cursor."""
+    raw = f'{published_at.isoformat()}|{pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decodes an opaque cursor back into its (timestamp, id) pair."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        published_at, pk = raw.split('|', 1)
+        return datetime.datetime.fromisoformat(published_at), uuid.UUID(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise InvalidCursor(f'Invalid cursor: {cursor}') from e
+
+
+def get_page_size(request):
+    """Returns the page size requested by the client, bounded by the settings."""
+    default = getattr(settings, 'SOCIALIZE_PAGE_SIZE', DEFAULT_PAGE_SIZE)
+    maximum = getattr(settings, 'SOCIALIZE_MAX_PAGE_SIZE', MAX_PAGE_SIZE)
+    try:
+        size = int(request.GET.get('limit', default))
+    except ValueError:
+        size = default
+    return max(1, min(size, maximum))
+
+
+def cached_count(key, queryset):
+    """
+    Returns the row count of the queryset, cached for a short period.
+
+    The count is only an approximation of the collection size between
+    refreshes, which is what ActivityStreams allows for totalItems.
+    """
+    timeout = getattr(settings, 'SOCIALIZE_COUNT_CACHE_TIMEOUT', 60)
+    if not timeout:
+        return queryset.count()
+    return cache.get_or_set(f'socialize:count:{key}', queryset.count, timeout)
+
+
+async def acached_count(key, queryset):
+    """Returns the row count of the queryset, cached for a short period."""
+    timeout = getattr(settings, 'SOCIALIZE_COUNT_CACHE_TIMEOUT', 60)
+    if not timeout:
+        return await queryset.acount()
+    count = await cache.aget(f'socialize:count:{key}')
+    if count is None:
+        count = await queryset.acount()
+        await cache.aset(f'socialize:count:{key}', count, timeout)
+    return count
+
+
+class CursorPaginator:
+    """
+    Paginates a queryset into ActivityStreams OrderedCollectionPages.
+
+    Items are ordered newest first on (field, id), and the cursors point at
+    the boundary rows so each page is a single indexed range scan no matter
+    how deep into the collection the client has walked.
+    """
+
+    def __init__(self, queryset, serialize, field='published_at'):
+        self.queryset = queryset
+        self.serialize = serialize
+        self.field = field
+
+    def collection(self, collection_id, total_items, first=True):
+        """Returns the OrderedCollection root, pointing at its first page."""
+        collection = {
+            '@context': 'https://www.w3.org/ns/activitystreams',
+            'id': collection_id,
+            'type': 'OrderedCollection',
+            'totalItems': total_items,
+        }
+        if first:
+            collection['first'] = self.page_url(collection_id)
+        return collection
+
+    def page(self, request, collection_id):
+        """Returns the OrderedCollectionPage selected by the request cursors."""
+        queryset, size = self.page_query(request)
+        return self.build_page(request, collection_id, list(queryset), size)
+
+    async def apage(self, request, collection_id):
+        """Returns the OrderedCollectionPage selected by the request cursors."""
+        queryset, size = self.page_query(request)
+        rows = [row async for row in queryset]
+        return self.build_page(request, collection_id, rows, size)
+
+    def items(self, chunk_size=2000):
+        """Yields every serialized item, newest first, fetching rows in chunks."""
+        for row in self.ordered(self.queryset).iterator(chunk_size=chunk_size):
+            yield self.serialize(row)
+
+    async def aitems(self, chunk_size=2000):
+        """Yields every serialized item, newest first, using the async ORM."""
+        async for row in aiterator(self.ordered(self.queryset), chunk_size):
+            yield self.serialize(row)
+
+    def page_query(self, request):
+        """Returns the sliced queryset and the page size selected by the request."""
+        size = get_page_size(request)
+        max_id = request.GET.get('max_id')
+        min_id = request.GET.get('min_id')
+
+        if min_id:
+            value, pk = decode_cursor(min_id)
+            condition = Q(**{f'{self.field}__gt': value}) | Q(
+                **{self.field: value, 'id__gt': pk}
+            )
+            queryset = self.queryset.filter(condition).order_by(self.field, 'id')
+        else:
+            queryset = self.ordered(self.queryset)
+            if max_id:
+                queryset = queryset.filter(self.older_q(decode_cursor(max_id)))
+        return queryset[: size + 1], size
+
+    def build_page(self, request, collection_id, rows, size):
+        """Builds the page from up to size + 1 rows fetched by page_query."""
+        has_more = len(rows) > size
+        rows = rows[:size]
+        if request.GET.get('min_id'):
+            rows.reverse()
+            has_newer, has_older = has_more, True
+        else:
+            has_newer, has_older = bool(request.GET.get('max_id')), has_more
+
+        page = {
+            '@context': 'https://www.w3.org/ns/activitystreams',
+            'id': request.get_full_path(),
+            'type': 'OrderedCollectionPage',
+            'partOf': collection_id,
+            'orderedItems': [self.serialize(row) for row in rows],
+        }
+        if rows and has_older:
+            page['next'] = self.page_url(collection_id, max_id=self.cursor(rows[-1]))
+        if rows and has_newer:
+            page['prev'] = self.page_url(collection_id, min_id=self.cursor(rows[0]))
+        return page
+
+    def ordered(self, queryset):
+        """Orders the queryset newest first on the keyset columns."""
+        return queryset.order_by(f'-{self.field}', '-id')
+
+    def older_q(self, key):
+        """Returns the filter selecting rows strictly after the key, newest first."""
+        value, pk = key
+        return Q(**{f'{self.field}__lt': value}) | Q(
+            **{self.field: value, 'id__lt': pk}
+        )
+
+    def cursor(self, row):
+        """Returns the cursor pointing at the given row."""
+        return encode_cursor(getattr(row, self.field), row.id)
+
+    @staticmethod
+    def page_url(collection_id, **params):
+        """Returns the URL of a collection page with the given cursor."""
+        return f'{collection_id}?{urlencode({"page": "true", **params})}'
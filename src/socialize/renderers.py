@@ -0,0 +1,81 @@
+"""JSON renderers for the socialize app."""
+#!/usr/bin/python
+#
+# This file is part of django-socialize project.
+#
+# Copyright (C) 2010-2025 William Oliveira de Lagos <william.lagos@icloud.com>
+#
+# Socialize is free software: you can redistribute it and/or modify
+# it under the terms of the Lesser GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Socialize is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Socialize. If not, see <http://www.gnu.org/licenses/>.
+#
+
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.module_loading import import_string
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+_renderer = None
+
+
+class StdlibJSONRenderer:
+    """Renders JSON with the standard library encoder."""
+
+    def dumps(self, data):
+        """Returns the data encoded as JSON bytes."""
+        return json.dumps(data, cls=DjangoJSONEncoder).encode()
+
+
+class OrjsonRenderer(StdlibJSONRenderer):
+    """
+    Renders JSON with orjson, falling back to the stdlib for what it rejects.
+
+    Datetimes are handed to the Django encoder rather than encoded natively,
+    so the wire format is the same whether orjson is installed or not.
+    """
+
+    default = DjangoJSONEncoder().default
+    option = (
+        (orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME) if orjson else 0
+    )
+
+    def dumps(self, data):
+        """Returns the data encoded as JSON bytes."""
+        try:
+            return orjson.dumps(data, default=self.default, option=self.option)
+        except TypeError:
+            return super().dumps(data)
+
+
+def get_renderer():
+    """
+    Returns the JSON renderer of the process.
+
+    SOCIALIZE_JSON_RENDERER may name a renderer class by its dotted path;
+    otherwise orjson is used when installed, and the stdlib encoder if not.
+    """
+    global _renderer  # pylint: disable=global-statement
+    if _renderer is None:
+        path = getattr(settings, 'SOCIALIZE_JSON_RENDERER', None)
+        if path:
+            _renderer = import_string(path)()
+        elif orjson is not None:
+            _renderer = OrjsonRenderer()
+        else:
+            _renderer = StdlibJSONRenderer()
+    return _renderer
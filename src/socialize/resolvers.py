@@ -0,0 +1,277 @@
+"""Resolution of remote actor documents for the socialize app."""
+#!/usr/bin/python
+# pylint: disable=E1101
+#
+# This file is part of django-socialize project.
+#
+# Copyright (C) 2010-2025 William Oliveira de Lagos <william.lagos@icloud.com>
+#
+# Socialize is free software: you can redistribute it and/or modify
+# it under the terms of the Lesser GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Socialize is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Socialize. If not, see <http://www.gnu.org/licenses/>.
+#
+
+import datetime
+import ipaddress
+import logging
+import socket
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urldefrag, urlsplit
+
+import requests
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils.timezone import now
+
+from .cache import LRUCache, SingleFlight
+from .models import RemoteActor
+from .sessions import AsyncClientPool, SessionPool
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
+
+def get_public_key(document):
+    """Returns the (key id, PEM) pair of the first key of an actor document."""
+    key = document.get('publicKey')
+    if isinstance(key, list):
+        key = key[0] if key else None
+    if not isinstance(key, dict) or not isinstance(key.get('publicKeyPem'), str):
+        return '', ''
+    return str(key.get('id') or ''), key['publicKeyPem']
+
+
+def is_public_host(host):
+    """Returns whether every address the host resolves to is publicly routable."""
+    try:
+        infos = socket.getaddrinfo(host, None)
+    except (socket.gaierror, UnicodeError):
+        return False
+    for info in infos:
+        address = ipaddress.ip_address(info[4][0].split('%')[0])
+        if not address.is_global or address.is_multicast:
+            return False
+    return bool(infos)
+
+
+class RemoteActorResolver:
+    """
+    Resolves remote actor documents through a database-backed cache.
+
+    Documents are served from memory or from their RemoteActor row while
+    fresh (SOCIALIZE_REMOTE_ACTOR_TTL). Past that, they are still served for
+    SOCIALIZE_REMOTE_ACTOR_STALE_TTL more seconds while a background thread
+    refetches them. Failed fetches are remembered, so unreachable servers
+    are only retried every SOCIALIZE_REMOTE_ACTOR_RETRY seconds, and
+    concurrent fetches of the same actor share a single request.
+
+    Key ids come from unauthenticated requests, so only https IRIs on
+    publicly routable hosts are fetched, without following redirects, and
+    actors that could never be fetched are only remembered in a bounded
+    in-memory cache rather than in the table. SOCIALIZE_REMOTE_ACTOR_INSECURE
+    lifts the https and address checks, for tests and development.
+    """
+
+    def __init__(self, executor=None):
+        self.ttl = getattr(settings, 'SOCIALIZE_REMOTE_ACTOR_TTL', 3600)
+        self.stale_ttl = getattr(settings, 'SOCIALIZE_REMOTE_ACTOR_STALE_TTL', 86400)
+        self.retry = getattr(settings, 'SOCIALIZE_REMOTE_ACTOR_RETRY', 600)
+        self.timeout = getattr(settings, 'SOCIALIZE_REMOTE_ACTOR_TIMEOUT', 10)
+        self.insecure = getattr(settings, 'SOCIALIZE_REMOTE_ACTOR_INSECURE', False)
+        self.schemes = ('https', 'http') if self.insecure else ('https',)
+        self.memory = LRUCache(
+            maxsize=getattr(settings, 'SOCIALIZE_REMOTE_ACTOR_CACHE_SIZE', 4096),
+            ttl=getattr(settings, 'SOCIALIZE_REMOTE_ACTOR_CACHE_TTL', 60),
+        )
+        self.failures = LRUCache(
+            maxsize=getattr(settings, 'SOCIALIZE_REMOTE_ACTOR_CACHE_SIZE', 4096),
+            ttl=self.retry,
+        )
+        self.headers = {'Accept': 'application/activity+json'}
+        self.sessions = SessionPool(headers=self.headers)
+        self.clients = AsyncClientPool(timeout=self.timeout)
+        self.inflight = SingleFlight()
+        self.executor = executor or ThreadPoolExecutor(
+            max_workers=2, thread_name_prefix='socialize-resolver'
+        )
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def resolve(self, iri):
+        """
+        Returns the RemoteActor row of the actor with the given IRI, or None.
+
+        Key ids such as ``https://example.com/users/alice#main-key`` resolve
+        to the actor document they belong to.
+        """
+        iri = urldefrag(iri).url
+        if urlsplit(iri).scheme not in self.schemes:
+            return None
+        remote = self.memory.get(iri)
+        if remote is None:
+            remote = RemoteActor.objects.filter(iri=iri).first()
+        remote, fetch = self.check(iri, remote)
+        return self.fetch(iri) if fetch else remote
+
+    async def aresolve(self, iri):
+        """
+        Returns the RemoteActor row of the actor, fetching it with httpx.
+
+        Without httpx installed, the synchronous resolution runs in a worker
+        thread instead.
+        """
+        if httpx is None:
+            return await sync_to_async(self.resolve)(iri)
+        iri = urldefrag(iri).url
+        if urlsplit(iri).scheme not in self.schemes:
+            return None
+        remote = self.memory.get(iri)
+        if remote is None:
+            remote = await RemoteActor.objects.filter(iri=iri).afirst()
+        remote, fetch = self.check(iri, remote)
+        return await self.afetch(iri) if fetch else remote
+
+    def check(self, iri, remote):
+        """
+        Returns the row to serve for the actor, and whether to fetch it first.
+
+        Stale rows are served while a background refetch is scheduled.
+        """
+        if remote is None:
+            return None, not self.failures.get(iri)
+
+        current = now()
+        retry_due = current - remote.checked_at >= datetime.timedelta(
+            seconds=self.retry
+        )
+        if remote.fetched_at is None:
+            # Negative row left by a version storing failures in the table.
+            return None, retry_due
+
+        age = (current - remote.fetched_at).total_seconds()
+        if age < self.ttl:
+            self.memory.set(iri, remote, ttl=min(self.memory.ttl, self.ttl - age))
+            return remote, False
+        if age < self.ttl + self.stale_ttl:
+            if retry_due:
+                self.refresh(iri)
+            return remote, False
+        return None, retry_due
+
+    def refresh(self, iri):
+        """Schedules a background refetch of the actor, unless one is pending."""
+        with self._lock:
+            if iri in self._refreshing:
+                return
+            self._refreshing.add(iri)
+        self.executor.submit(self.background_fetch, iri)
+
+    def background_fetch(self, iri):
+        """Refetches the actor from a worker thread."""
+        try:
+            self.fetch(iri)
+        except Exception:  # pylint: disable=broad-except
+            logger.exception('Refreshing remote actor %s failed', iri)
+        finally:
+            with self._lock:
+                self._refreshing.discard(iri)
+            close_old_connections()
+
+    def fetch(self, iri):
+        """Fetches the actor, sharing the request with concurrent callers."""
+        return self.inflight.do(iri, self.fetch_document, iri)
+
+    async def afetch(self, iri):
+        """Fetches the actor with httpx, sharing the request with concurrent callers."""
+        return await self.inflight.ado(iri, self.afetch_document, iri)
+
+    def allowed(self, iri):
+        """Returns whether the IRI may be fetched, i.e. is not an internal address."""
+        host = urlsplit(iri).hostname
+        return bool(host) and (self.insecure or is_public_host(host))
+
+    def fetch_document(self, iri):
+        """Downloads and stores the actor document, returning its row or None."""
+        document = None
+        if not self.allowed(iri):
+            logger.info('Refusing to fetch remote actor %s', iri)
+        else:
+            try:
+                response = self.sessions.get(iri).get(
+                    iri, timeout=self.timeout, allow_redirects=False
+                )
+                if response.status_code == 200:
+                    document = response.json()
+            except (requests.RequestException, ValueError) as e:
+                logger.info('Fetching remote actor %s failed: %s', iri, e)
+        return self.store(iri, document)
+
+    async def afetch_document(self, iri):
+        """Downloads the actor document with httpx and stores it, returning its row."""
+        document = None
+        if not await sync_to_async(self.allowed, thread_sensitive=False)(iri):
+            logger.info('Refusing to fetch remote actor %s', iri)
+        else:
+            try:
+                response = await self.clients.get().get(
+                    iri, headers=self.headers, follow_redirects=False
+                )
+                if response.status_code == 200:
+                    document = response.json()
+            except (httpx.HTTPError, ValueError) as e:
+                logger.info('Fetching remote actor %s failed: %s', iri, e)
+        return await sync_to_async(self.store)(iri, document)
+
+    def store(self, iri, document):
+        """Stores the outcome of fetching the actor, returning its servable row."""
+        current = now()
+        if not isinstance(document, dict) or document.get('id') != iri:
+            # Only actors fetched before keep a row, so failures cannot grow it.
+            if not RemoteActor.objects.filter(iri=iri).update(checked_at=current):
+                self.failures.set(iri, True)
+            self.memory.pop(iri)
+            return self.stale_or_none(iri, current)
+
+        key_id, public_key = get_public_key(document)
+        remote, _ = RemoteActor.objects.update_or_create(
+            iri=iri,
+            defaults={
+                'document': document,
+                'public_key': public_key,
+                'key_id': key_id,
+                'fetched_at': current,
+                'checked_at': current,
+            },
+        )
+        self.memory.set(iri, remote, ttl=min(self.memory.ttl, self.ttl))
+        self.failures.pop(iri)
+        return remote
+
+    def stale_or_none(self, iri, current):
+        """Returns the last good row of the actor if still servable, or None."""
+        remote = RemoteActor.objects.filter(iri=iri).first()
+        if remote is None or remote.fetched_at is None:
+            return None
+        if (current - remote.fetched_at).total_seconds() < self.ttl + self.stale_ttl:
+            return remote
+        return None
+
+
+resolver = RemoteActorResolver()
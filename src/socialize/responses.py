@@ -0,0 +1,124 @@
+"""HTTP responses for the socialize app."""
+#!/usr/bin/python
+#
+# This file is part of django-socialize project.
+#
+# Copyright (C) 2010-2025 William Oliveira de Lagos <william.lagos@icloud.com>
+#
+# Socialize is free software: you can redistribute it and/or modify
+# it under the terms of the Lesser GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Socialize is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Socialize. If not, see <http://www.gnu.org/licenses/>.
+#
+
+import zlib
+
+from django import http
+
+from .metrics import timed
+from .renderers import get_renderer
+
+
+class JsonResponse(http.JsonResponse):
+    """
+    JsonResponse encoding its data with the configured JSON renderer.
+
+    The encoding time is recorded on the current request when instrumented.
+    """
+
+    def __init__(self, data, safe=True, **kwargs):
+        if safe and not isinstance(data, dict):
+            raise TypeError(
+                'In order to allow non-dict objects to be serialized set the '
+                'safe parameter to False.'
+            )
+        kwargs.setdefault('content_type', 'application/json')
+        with timed('serialize'):
+            content = get_renderer().dumps(data)
+        http.HttpResponse.__init__(self, content=content, **kwargs)
+
+
+class StreamingJsonResponse(http.StreamingHttpResponse):
+    """
+    Streams a JSON document whose list member is produced incrementally.
+
+    The document members are encoded up front and the items are encoded one
+    at a time as they are consumed, in buffers of about buffer_size bytes, so
+    memory stays flat whatever the length of the list.
+    """
+
+    def __init__(self, data, key, items, buffer_size=65536, **kwargs):
+        kwargs.setdefault('content_type', 'application/json')
+        if hasattr(items, '__aiter__'):
+            content = self.aiter_content(data, key, items, buffer_size)
+        else:
+            content = self.iter_content(data, key, items, buffer_size)
+        super().__init__(content, **kwargs)
+
+    @staticmethod
+    def open_document(data, key):
+        """Returns the encoded document up to the opening of its list member."""
+        renderer = get_renderer()
+        buffer = bytearray(renderer.dumps(data)[:-1])
+        if data:
+            buffer += b','
+        buffer += renderer.dumps(key) + b':['
+        return renderer, buffer
+
+    @classmethod
+    def iter_content(cls, data, key, items, buffer_size):
+        """Yields the encoded document in chunks."""
+        renderer, buffer = cls.open_document(data, key)
+        for index, item in enumerate(items):
+            if index:
+                buffer += b','
+            buffer += renderer.dumps(item)
+            if len(buffer) >= buffer_size:
+                yield bytes(buffer)
+                buffer.clear()
+        buffer += b']}'
+        yield bytes(buffer)
+
+    @classmethod
+    async def aiter_content(cls, data, key, items, buffer_size):
+        """Yields the encoded document in chunks, consuming an async iterator."""
+        renderer, buffer = cls.open_document(data, key)
+        first = True
+        async for item in items:
+            if not first:
+                buffer += b','
+            first = False
+            buffer += renderer.dumps(item)
+            if len(buffer) >= buffer_size:
+                yield bytes(buffer)
+                buffer.clear()
+        buffer += b']}'
+        yield bytes(buffer)
+
+
+def gzip_chunks(chunks, level=6):
+    """Compresses a stream of byte chunks into a stream of gzip member chunks."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+async def agzip_chunks(chunks, level=6):
+    """Compresses an async stream of byte chunks into gzip member chunks."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
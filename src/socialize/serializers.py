@@ -0,0 +1,115 @@
+"""Projection-based ActivityPub serializers for the socialize app."""
+#!/usr/bin/python
+#
+# This file is part of django-socialize project.
+#
+# Copyright (C) 2010-2025 William Oliveira de Lagos <william.lagos@icloud.com>
+#
+# Socialize is free software: you can redistribute it and/or modify
+# it under the terms of the Lesser GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Socialize is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Socialize. If not, see <http://www.gnu.org/licenses/>.
+#
+
+import abc
+from operator import attrgetter
+
+from .models import actor_url, object_url
+
+
+class ProjectionSerializer(abc.ABC):
+    """
+    Serializes querysets into ActivityPub documents from values() rows.
+
+    Only the projected columns are fetched, in a single query whatever the
+    number of rows, and no model instance is ever built, so collections of
+    thousands of items cost one query and one dict per item.
+    """
+
+    fields = ()
+
+    @abc.abstractmethod
+    def serialize(self, row):
+        """Returns the ActivityPub document of a projected row."""
+
+    def project(self, queryset):
+        """Returns the queryset restricted to the projected columns."""
+        return queryset.values(*self.fields)
+
+    def row(self, instance):
+        """Returns the projected row of an instance already loaded."""
+        return {
+            field: attrgetter(field.replace('__', '.'))(instance)
+            for field in self.fields
+        }
+
+    def first(self, queryset):
+        """Returns the document of the first row of the queryset, or None."""
+        row = self.project(queryset).first()
+        return None if row is None else self.serialize(row)
+
+    async def afirst(self, queryset):
+        """Returns the document of the first row of the queryset, asynchronously."""
+        row = await self.project(queryset).afirst()
+        return None if row is None else self.serialize(row)
+
+    def iterator(self, queryset, chunk_size=2000):
+        """Yields the documents of the queryset, fetching rows in chunks."""
+        for row in self.project(queryset).iterator(chunk_size=chunk_size):
+            yield self.serialize(row)
+
+
+class ActorSerializer(ProjectionSerializer):
+    """Serializes actors, joining only the name columns of their users."""
+
+    fields = (
+        'id',
+        'actor_type',
+        'bio',
+        'inbox',
+        'outbox',
+        'public_key',
+        'user__username',
+        'user__first_name',
+        'user__last_name',
+    )
+
+    def serialize(self, row):
+        name = f'{row["user__first_name"]} {row["user__last_name"]}'.strip()
+        return {
+            '@context': 'https://www.w3.org/ns/activitystreams',
+            'name': name or row['user__username'],
+            'id': actor_url(row['id']),
+            'type': row['actor_type'],
+            'summary': row['bio'],
+            'inbox': row['inbox'],
+            'outbox': row['outbox'],
+            'publicKey': {
+                'id': f'{actor_url(row["id"])}#main-key',
+                'owner': actor_url(row['id']),
+                'publicKeyPem': row['public_key'],
+            },
+        }
+
+
+class ObjectSerializer(ProjectionSerializer):
+    """Serializes objects, referencing their actors by id alone."""
+
+    fields = ('id', 'object_type', 'content', 'actor_id')
+
+    def serialize(self, row):
+        return {
+            '@context': 'https://www.w3.org/ns/activitystreams',
+            'type': row['object_type'],
+            'content': row['content'],
+            'actor': actor_url(row['actor_id']),
+            'id': object_url(row['id']),
+        }
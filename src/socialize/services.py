@@ -20,64 +20,243 @@
 # along with Socialize. If not, see <http://www.gnu.org/licenses/>.
 #
 
+import asyncio
+import datetime
+import gzip
+import hashlib
+import itertools
 import json
+import uuid
 import requests
 
-from cryptography.hazmat.primitives.asymmetric import rsa
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from types import MappingProxyType
+from urllib.parse import urlsplit
+
+from asgiref.sync import async_to_sync, sync_to_async
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
 from cryptography.hazmat.primitives import serialization
 
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
 from django.core.exceptions import PermissionDenied
+from django.db import transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate, login
 from django.shortcuts import get_object_or_404
-from django.http import JsonResponse
+from django.http import Http404, StreamingHttpResponse
 from django.conf import settings
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date
+from django.utils.timezone import now
+
+from .archives import ArchiveReader
+from .cache import LRUCache, MISSING, RecentSet, SingleFlight
+from .compat import WINDOW_FILTERS, aget_user, aiterator
+from .counters import counters
+from . import httpsig
+from .keys import (
+    aget_key_owner,
+    get_key_algorithm,
+    get_key_owner,
+    load_signing_key,
+)
+from .models import (
+    Actor,
+    Activity,
+    Object,
+    Vault,
+    Token,
+    KeyPair,
+    InboxItem,
+    OutboxItem,
+    PendingRecipient,
+    Delivery,
+    RemoteActor,
+    FollowEdge,
+    TimelineEntry,
+    actor_url,
+    local_id,
+)
+from .pagination import (
+    CursorPaginator,
+    InvalidCursor,
+    acached_count,
+    cached_count,
+)
+from .resolvers import resolver
+from .responses import (
+    JsonResponse,
+    StreamingJsonResponse,
+    agzip_chunks,
+    gzip_chunks,
+)
+from .serializers import ActorSerializer, ObjectSerializer
+from .sessions import AsyncClientPool, SessionPool
+from .tokens import hash_token
+
+
+ENGAGEMENT_COUNTERS = {'Like': 'likes_count', 'Announce': 'shares_count'}
+
+
+def get_validators(pk, updated_at, variant=''):
+    """Returns the ETag and Last-Modified timestamp validating a document."""
+    version = f'{variant}:{pk}:{updated_at.isoformat()}'
+    etag = f'"{hashlib.sha1(version.encode()).hexdigest()}"'
+    return etag, int(updated_at.timestamp())
+
+
+def wrap_create(document, published_at):
+    """Wraps an object document into the Create activity announcing it."""
+    document = {k: v for k, v in document.items() if k != '@context'}
+    return {
+        'id': f'{document["id"]}/activity',
+        'type': 'Create',
+        'actor': document['actor'],
+        'published': published_at.isoformat(),
+        'object': document,
+    }
+
+
+def check_owner(user, username, resource):
+    """Raises PermissionDenied unless the user is the authenticated owner."""
+    if not user.is_authenticated or user.username != username:
+        raise PermissionDenied(f'Access denied: Not the {resource} owner.')
+
 
-from .models import Actor, Activity, Object, Vault, Token
+def set_validators(response, etag, last_modified):
+    """Sets the ETag and Last-Modified headers on the response."""
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return response
 
 
 class ActorService:
     """Handles ActivityPub Actor endpoints."""
 
-    def get_actor(self, _, username, as_activitypub=True):
-        """Returns the ActivityPub representation of an Actor for the given username."""
-        actor = get_object_or_404(Actor, user__username=username)
-        if as_activitypub:
-            return JsonResponse(actor.as_activitypub())
-        return JsonResponse(
-            {
-                'id': actor.id,
-                'username': actor.user.username,
-                'display_name': actor.get_display_name(),
-                'actor_type': actor.actor_type,
-                'bio': actor.bio,
-                'title': actor.title,
-                'birthdate': actor.birthdate,
-                'inbox': actor.inbox,
-                'outbox': actor.outbox,
-                'permissions': actor.get_user_permissions(),
-                'score': actor.score,
-                'created_at': actor.created_at,
-                'updated_at': actor.updated_at,
-            }
+    def get_actor(self, request, username, as_activitypub=True):
+        """
+        Returns the ActivityPub representation of an Actor for the given username.
+
+        Only the validators of the actor are loaded until the conditional
+        headers of the request have been checked, so a 304 never loads the
+        related User nor renders the document.
+        """
+        actors = Actor.objects.filter(user__username=username)
+        return self.actor_response(request, actors, as_activitypub)
+
+    def get_actor_by_id(self, request, actor_id):
+        """
+        Returns the ActivityPub document of an Actor at its id.
+
+        This is the IRI published as the actor id and owner of its key, which
+        remote servers dereference to verify the signatures of the actor.
+        """
+        return self.actor_response(request, Actor.objects.filter(id=actor_id), True)
+
+    def actor_response(self, request, actors, as_activitypub):
+        """Renders the document of the actor selected by the queryset."""
+        row = actors.values_list('id', 'updated_at').first()
+        if row is None:
+            raise Http404('No Actor matches the given query.')
+
+        etag, last_modified = get_validators(*row, variant=as_activitypub)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            if as_activitypub:
+                data = ActorSerializer().first(Actor.objects.filter(id=row[0]))
+            else:
+                actor = Actor.objects.select_related('user').get(id=row[0])
+                data = self.serialize_actor(actor, False)
+            response = JsonResponse(data)
+        return set_validators(response, etag, last_modified)
+
+    async def aget_actor(self, request, username, as_activitypub=True):
+        """Returns the ActivityPub representation of an Actor, without thread hops."""
+        actors = Actor.objects.filter(user__username=username)
+        return await self.aactor_response(request, actors, as_activitypub)
+
+    async def aget_actor_by_id(self, request, actor_id):
+        """Returns the ActivityPub document of an Actor at its id, asynchronously."""
+        actors = Actor.objects.filter(id=actor_id)
+        return await self.aactor_response(request, actors, True)
+
+    async def aactor_response(self, request, actors, as_activitypub):
+        """Renders the document of the actor selected by the queryset."""
+        row = await actors.values_list('id', 'updated_at').afirst()
+        if row is None:
+            raise Http404('No Actor matches the given query.')
+
+        etag, last_modified = get_validators(*row, variant=as_activitypub)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
         )
+        if response is None:
+            if as_activitypub:
+                data = await ActorSerializer().afirst(Actor.objects.filter(id=row[0]))
+            else:
+                actor = await Actor.objects.select_related('user').aget(id=row[0])
+                # User permissions are only available through the sync ORM.
+                data = await sync_to_async(self.serialize_actor)(actor, False)
+            response = JsonResponse(data)
+        return set_validators(response, etag, last_modified)
+
+    def serialize_actor(self, actor, as_activitypub=True):
+        """Returns the document describing the Actor."""
+        if as_activitypub:
+            serializer = ActorSerializer()
+            return serializer.serialize(serializer.row(actor))
+        return {
+            'id': actor.id,
+            'username': actor.user.username,
+            'display_name': actor.get_display_name(),
+            'actor_type': actor.actor_type,
+            'bio': actor.bio,
+            'title': actor.title,
+            'birthdate': actor.birthdate,
+            'inbox': actor.inbox,
+            'outbox': actor.outbox,
+            'permissions': sorted(actor.get_user_permissions()),
+            'score': actor.score,
+            'created_at': actor.joined_at,
+            'updated_at': actor.updated_at,
+        }
 
     def create_actor(self, data):
         """Creates a new Actor from the given data."""
-        private_key, public_key = self.generate_keys()
+        private_key, public_key = KeyPoolService.acquire() or self.generate_keys()
         user, _ = User.objects.get_or_create(username=data.get('username'))
         actor = Actor.objects.create(user=user, public_key=public_key)
         Vault.objects.create(actor=actor, private_key=private_key)
 
         return actor
 
-    def generate_keys(self):
-        """Generates a new private/public key pair."""
-        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    def generate_keys(self, algorithm=None):
+        """
+        Generates a new private/public key pair.
+
+        The algorithm defaults to SOCIALIZE_KEY_ALGORITHM: 2048-bit RSA, or
+        Ed25519, whose keys are generated and used far faster.
+        """
+        algorithm = algorithm or get_key_algorithm()
+        if algorithm == 'ed25519':
+            private_key = ed25519.Ed25519PrivateKey.generate()
+            private_format = serialization.PrivateFormat.PKCS8
+        else:
+            private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+            private_format = serialization.PrivateFormat.TraditionalOpenSSL
 
         private_pem = private_key.private_bytes(
             encoding=serialization.Encoding.PEM,
-            format=serialization.PrivateFormat.TraditionalOpenSSL,
+            format=private_format,
             encryption_algorithm=serialization.NoEncryption(),
         )
 
@@ -90,92 +269,1438 @@ class ActorService:
 
     def get_webfinger(self, request):
         """Returns the WebFinger data request for the user discovery."""
-        resource = request.GET.get('resource')
+        resource = request.GET.get('resource', '')
+        if resource.startswith('acct:'):
+            username = resource.split('acct:')[1].split('@')[0]
+            row = (
+                Actor.objects.filter(user__username=username)
+                .values_list('id', 'updated_at')
+                .first()
+            )
+            return self.webfinger_response(request, username, row)
+
+        return JsonResponse({'error': 'Invalid WebFinger request'}, status=400)
+
+    async def aget_webfinger(self, request):
+        """Returns the WebFinger data request, without thread hops."""
+        resource = request.GET.get('resource', '')
         if resource.startswith('acct:'):
             username = resource.split('acct:')[1].split('@')[0]
-            actor = get_object_or_404(Actor, user__username=username)
+            row = await (
+                Actor.objects.filter(user__username=username)
+                .values_list('id', 'updated_at')
+                .afirst()
+            )
+            return self.webfinger_response(request, username, row)
+
+        return JsonResponse({'error': 'Invalid WebFinger request'}, status=400)
+
+    def webfinger_response(self, request, username, row):
+        """Renders the WebFinger document from the actor validators alone."""
+        if row is None:
+            raise Http404('No Actor matches the given query.')
 
-            return JsonResponse(
+        etag, last_modified = get_validators(*row, variant='webfinger')
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = JsonResponse(
                 {
-                    'subject': f'acct:{actor.user.username}@{settings.SITE_DOMAIN}',
+                    'subject': f'acct:{username}@{settings.SITE_DOMAIN}',
                     'links': [
                         {
                             'rel': 'self',
                             'type': 'application/activity+json',
-                            'href': actor.get_actor_url(),
+                            'href': Actor(id=row[0]).get_actor_url(),
                         }
                     ],
                 }
             )
-
-        return JsonResponse({'error': 'Invalid WebFinger request'}, status=400)
+        return set_validators(response, etag, last_modified)
 
 
 class ActivityService:
     """Handles ActivityPub Activity endpoints for inbox and outbox."""
 
     def create_activity(self, request, username):
-        """Handles ActivityPub inbox messages."""
+        """
+        Handles ActivityPub inbox messages.
+
+        The message is only appended to the inbox queue here; storing it and
+        running its side effects is left to the process_inbox worker.
+        Replays of an activity recently received by the same inbox are
+        acknowledged without being queued again. Deliveries are refused
+        unless the key that signed them belongs to the activity's actor, so
+        a server cannot act on behalf of actors it does not host.
+        """
         try:
             data = json.loads(request.body)
-            actor = get_object_or_404(Actor, user__username=username)
-            Activity.objects.create(
-                actor=actor,
-                object_data=data,
-                activity_type=data.get('type'),
-            )
+        except json.JSONDecodeError:
+            return JsonResponse({'error': 'Invalid JSON data'}, status=400)
+
+        if not isinstance(data, dict):
+            return JsonResponse({'error': 'Invalid activity'}, status=400)
+
+        key_id = getattr(request, 'signature_key_id', None)
+        if key_id is None or get_key_owner(key_id) != get_object_iri(data.get('actor')):
+            return self.forbidden()
+
+        iri = InboxService.get_iri(data, key_id)
+        if InboxService.seen(username, iri):
             return JsonResponse({'status': 'accepted'}, status=202)
+
+        InboxService.enqueue(username, data, key_id)
+        InboxService.remember(username, iri)
+        return JsonResponse({'status': 'accepted'}, status=202)
+
+    async def acreate_activity(self, request, username):
+        """Handles ActivityPub inbox messages, without thread hops."""
+        try:
+            data = json.loads(request.body)
         except json.JSONDecodeError:
             return JsonResponse({'error': 'Invalid JSON data'}, status=400)
 
-    def get_activity(self, _, username):
-        """Returns the ActivityPub representation of an Actor's outbox."""
-        actor = get_object_or_404(Actor, user__username=username)
-        activities = Activity.objects.filter(actor=actor).order_by('-published_at')
+        if not isinstance(data, dict):
+            return JsonResponse({'error': 'Invalid activity'}, status=400)
+
+        key_id = getattr(request, 'signature_key_id', None)
+        if key_id is None or await aget_key_owner(key_id) != get_object_iri(
+            data.get('actor')
+        ):
+            return self.forbidden()
+
+        iri = InboxService.get_iri(data, key_id)
+        if InboxService.seen(username, iri):
+            return JsonResponse({'status': 'accepted'}, status=202)
 
+        await InboxItem.objects.acreate(username=username, payload=data, iri=iri)
+        InboxService.remember(username, iri)
+        return JsonResponse({'status': 'accepted'}, status=202)
+
+    @staticmethod
+    def forbidden():
+        """Returns the response to deliveries not signed by their actor."""
         return JsonResponse(
-            {
-                '@context': 'https://www.w3.org/ns/activitystreams',
-                'id': actor.outbox,
-                'type': 'OrderedCollection',
-                'totalItems': activities.count(),
-                'orderedItems': [activity.object_data for activity in activities],
-            }
+            {'error': 'Activity actor does not own the signing key'}, status=403
+        )
+
+    def get_activity(self, request, username):
+        """
+        Returns the ActivityPub representation of an Actor's outbox.
+
+        The collection itself only carries the (cached) item count and a link
+        to its first page; pages are requested with ``?page=true`` and walked
+        through the opaque ``max_id``/``min_id`` cursors of next/prev links.
+        With ``?stream=true`` the whole collection is streamed instead,
+        encoding items as they are read from the database; since that scans
+        the whole outbox, only its authenticated owner may ask for it.
+        """
+        if 'stream' in request.GET:
+            check_owner(request.user, username, 'outbox')
+        actor = get_object_or_404(Actor, user__username=username)
+        activities = Activity.objects.filter(actor=actor)
+        paginator = CursorPaginator(activities, lambda activity: activity.object_data)
+        collection_id = actor.outbox or request.path
+
+        if 'stream' in request.GET:
+            total_items = cached_count(f'outbox:{actor.id}', activities)
+            return StreamingJsonResponse(
+                paginator.collection(collection_id, total_items, first=False),
+                'orderedItems',
+                paginator.items(),
+            )
+
+        if 'page' not in request.GET:
+            total_items = cached_count(f'outbox:{actor.id}', activities)
+            return JsonResponse(paginator.collection(collection_id, total_items))
+
+        try:
+            return JsonResponse(paginator.page(request, collection_id))
+        except InvalidCursor:
+            return JsonResponse({'error': 'Invalid cursor'}, status=400)
+
+    async def aget_activity(self, request, username):
+        """Returns a page of an Actor's outbox, without thread hops."""
+        if 'stream' in request.GET:
+            check_owner(await aget_user(request), username, 'outbox')
+        try:
+            actor = await Actor.objects.aget(user__username=username)
+        except Actor.DoesNotExist as e:
+            raise Http404('No Actor matches the given query.') from e
+        activities = Activity.objects.filter(actor=actor)
+        paginator = CursorPaginator(activities, lambda activity: activity.object_data)
+        collection_id = actor.outbox or request.path
+
+        if 'stream' in request.GET:
+            total_items = await acached_count(f'outbox:{actor.id}', activities)
+            return StreamingJsonResponse(
+                paginator.collection(collection_id, total_items, first=False),
+                'orderedItems',
+                paginator.aitems(),
+            )
+
+        if 'page' not in request.GET:
+            total_items = await acached_count(f'outbox:{actor.id}', activities)
+            return JsonResponse(paginator.collection(collection_id, total_items))
+
+        try:
+            return JsonResponse(await paginator.apage(request, collection_id))
+        except InvalidCursor:
+            return JsonResponse({'error': 'Invalid cursor'}, status=400)
+
+
+class InboxService:
+    """
+    Handles the queue of inbound activities and their side effects.
+
+    Handlers are registered at import time as (activity_type, handler) pairs;
+    each service builds its own read-only dispatch table from them, or from
+    the pairs it is given.
+    """
+
+    registered = ()
+    recent = RecentSet(getattr(settings, 'SOCIALIZE_INBOX_RECENT_IDS', 10000))
+
+    def __init__(self, handlers=None):
+        table = {}
+        for activity_type, handler in self.registered if handlers is None else handlers:
+            table[activity_type] = table.get(activity_type, ()) + (handler,)
+        self.handlers = MappingProxyType(table)
+
+    @classmethod
+    def register(cls, activity_type):
+        """Registers a function handling batches of activities of the given type."""
+
+        def decorator(handler):
+            cls.registered += ((activity_type, handler),)
+            return handler
+
+        return decorator
+
+    @staticmethod
+    def get_iri(data, key_id=None):
+        """
+        Returns the id IRI of an activity, or None if it has no usable one.
+
+        With the keyId that signed the activity, the IRI is only usable when
+        it lives on the host of the key, so a signer cannot claim the IRIs of
+        another server and get its genuine deliveries dropped as replays.
+        """
+        iri = data.get('id')
+        if not isinstance(iri, str) or not 0 < len(iri) <= 500:
+            return None
+        if key_id is not None and urlsplit(iri).netloc != urlsplit(key_id).netloc:
+            return None
+        return iri
+
+    @classmethod
+    def seen(cls, username, iri):
+        """
+        Returns whether the activity IRI was recently queued for the inbox.
+
+        This in-memory prefilter catches most replayed deliveries before any
+        database write; the unique (actor, iri) constraint on activities
+        catches the others when the queue is drained.
+        """
+        return iri is not None and (username, iri) in cls.recent
+
+    @classmethod
+    def remember(cls, username, iri):
+        """Records an activity IRI in the prefilter, once it has been queued."""
+        if iri is not None:
+            cls.recent.add((username, iri))
+
+    @classmethod
+    def enqueue(cls, username, data, key_id=None):
+        """
+        Appends an inbound activity to the queue of the given inbox.
+
+        The IRI used to deduplicate the activity is checked against the
+        keyId that signed its delivery, if any.
+        """
+        return InboxItem.objects.create(
+            username=username, payload=data, iri=cls.get_iri(data, key_id)
+        )
+
+    def drain(self, batch_size=100):
+        """
+        Ingests up to batch_size queued activities, returning how many were taken.
+
+        Queued rows are locked, stored as activities with a single bulk insert
+        and removed from the queue in one transaction, then each registered
+        handler is called once with the activities of its type that were
+        actually inserted. Messages to unknown inboxes, and activities already
+        stored in their inbox, are dropped.
+        """
+        with transaction.atomic():
+            items = list(
+                InboxItem.objects.select_for_update(skip_locked=True).order_by('id')[
+                    :batch_size
+                ]
+            )
+            if not items:
+                return 0
+
+            actors = dict(
+                Actor.objects.filter(
+                    user__username__in={item.username for item in items}
+                ).values_list('user__username', 'id')
+            )
+            activities = []
+            seen = self.stored_iris(actors, items)
+            for item in items:
+                if item.username not in actors:
+                    continue
+                key = (actors[item.username], item.iri)
+                if key[1] is not None:
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                activities.append(
+                    Activity(
+                        actor_id=key[0],
+                        object_data=item.payload,
+                        activity_type=item.payload.get('type'),
+                        iri=key[1],
+                    )
+                )
+            Activity.objects.bulk_create(activities, ignore_conflicts=True)
+            InboxItem.objects.filter(id__in=[item.id for item in items]).delete()
+            # Rows conflicting with those of a concurrent worker were skipped;
+            # their side effects belong to the worker that stored them.
+            inserted = set(
+                Activity.objects.filter(
+                    id__in=[activity.id for activity in activities]
+                ).values_list('id', flat=True)
+            )
+
+            by_type = {}
+            for activity in activities:
+                if activity.id in inserted:
+                    by_type.setdefault(activity.activity_type, []).append(activity)
+            for activity_type, batch in by_type.items():
+                for handler in self.handlers.get(activity_type, ()):
+                    handler(batch)
+
+        return len(items)
+
+    def stored_iris(self, actors, items):
+        """Returns the (actor_id, iri) pairs of the batch already stored."""
+        iris = {item.iri for item in items} - {None}
+        if not iris:
+            return set()
+        return set(
+            Activity.objects.filter(
+                actor_id__in=actors.values(), iri__in=iris
+            ).values_list('actor_id', 'iri')
+        )
+
+
+def get_object_iri(value):
+    """Returns the IRI of an ActivityStreams object given inline or by reference."""
+    if isinstance(value, dict):
+        return value.get('id')
+    return value
+
+
+def get_targets(activities):
+    """
+    Returns the (inbox actor id, object IRI, sender) triples of a batch.
+
+    Activities without an object IRI or a sender IRI target nothing.
+    """
+    targets = set()
+    for activity in activities:
+        target = get_object_iri(activity.object_data.get('object'))
+        sender = activity.object_data.get('actor')
+        if isinstance(target, str) and isinstance(sender, str):
+            targets.add((activity.actor_id, target, sender))
+    return targets
+
+
+def match_targets(queryset, owner, field, targets):
+    """
+    Returns the ids of the rows matching any of the targets, in one query.
+
+    Rows are selected on the owners, object IRIs and senders of the whole
+    batch, and those not matching one of its triples are dropped here.
+    """
+    if not targets:
+        return []
+    rows = queryset.filter(
+        **{
+            f'{owner}__in': {owner_id for owner_id, _, _ in targets},
+            f'{field}__in': {iri for _, iri, _ in targets},
+            'object_data__actor__in': {sender for _, _, sender in targets},
+        }
+    ).values_list('id', owner, field, 'object_data__actor')
+    return [row[0] for row in rows if row[1:] in targets]
+
+
+@InboxService.register('Follow')
+def collapse_follows(activities):
+    """Keeps only the latest Follow sent by each remote actor to an inbox."""
+    latest = {}
+    for activity in activities:
+        follower = activity.object_data.get('actor')
+        if follower and isinstance(follower, str):
+            latest[(activity.actor_id, follower)] = activity.id
+    if not latest:
+        return
+    rows = Activity.objects.filter(
+        activity_type='Follow',
+        actor_id__in={actor_id for actor_id, _ in latest},
+        object_data__actor__in={follower for _, follower in latest},
+    ).values_list('id', 'actor_id', 'object_data__actor')
+    Activity.objects.filter(
+        id__in=[
+            row[0] for row in rows if row[1:] in latest and latest[row[1:]] != row[0]
+        ]
+    ).delete()
+
+
+def count_engagement(activity, delta):
+    """
+    Buffers the counter changes of the local object an activity engages with.
+
+    Likes and Announces count on the object they target, and Creates count
+    as replies of the object their own object is in reply to.
+    """
+    data = activity.object_data
+    target = data.get('object')
+    if activity.activity_type == 'Create' and isinstance(target, dict):
+        field, target = 'replies_count', target.get('inReplyTo')
+    else:
+        field = ENGAGEMENT_COUNTERS.get(activity.activity_type)
+    object_id = local_id(get_object_iri(target), 'objects')
+    if field and object_id:
+        counters.add_on_commit(Object, object_id, field, delta)
+    if activity.activity_type == 'Like':
+        counters.add_on_commit(Actor, activity.actor_id, 'score', delta)
+
+
+@InboxService.register('Like')
+@InboxService.register('Announce')
+@InboxService.register('Create')
+def count_engagements(activities):
+    """Adds received likes, boosts and replies to the engagement counters."""
+    for activity in activities:
+        count_engagement(activity, 1)
+
+
+@InboxService.register('Undo')
+def undo_activities(activities):
+    """Removes the activities reverted by Undo from the inbox, with their counts."""
+    reverted = match_targets(
+        Activity.objects.all(), 'actor_id', 'iri', get_targets(activities)
+    )
+    for row in Activity.objects.filter(id__in=reverted):
+        # Deleting by id keeps concurrent workers from counting twice.
+        if Activity.objects.filter(id=row.id).delete()[0]:
+            count_engagement(row, -1)
+
+
+@InboxService.register('Delete')
+def delete_objects(activities):
+    """Removes the activities carrying objects deleted by their authors."""
+    deleted = match_targets(
+        Activity.objects.exclude(id__in=[activity.id for activity in activities]),
+        'actor_id',
+        'object_data__object__id',
+        get_targets(activities),
+    )
+    Activity.objects.filter(id__in=deleted).delete()
+
+
+class FollowService:
+    """
+    Handles the follow graph between local and remote actors.
+
+    Each relationship is a FollowEdge row between two actor IRIs, indexed in
+    both directions, while local actors keep denormalized followers and
+    following counts so collections never need to count their edges.
+    """
+
+    def follow(self, follower, followed, activity_iri=''):
+        """Stores the edge between two actor IRIs, returning whether it is new."""
+        _, created = FollowEdge.objects.get_or_create(
+            follower=follower,
+            followed=followed,
+            defaults={'activity_iri': activity_iri},
+        )
+        if created:
+            self.adjust_counts(follower, followed, 1)
+        return created
+
+    def follow_many(self, edges):
+        """
+        Stores (follower, followed, activity_iri) edges, returning the new pairs.
+
+        The edges already stored are looked up for the whole batch in one
+        query, so only the missing ones go through follow.
+        """
+        edges = [edge for edge in edges if edge[0] and edge[1]]
+        if not edges:
+            return set()
+        known = set(
+            FollowEdge.objects.filter(
+                follower__in={follower for follower, _, _ in edges},
+                followed__in={followed for _, followed, _ in edges},
+            ).values_list('follower', 'followed')
+        )
+        created = set()
+        for follower, followed, activity_iri in edges:
+            if (follower, followed) not in known:
+                known.add((follower, followed))
+                if self.follow(follower, followed, activity_iri):
+                    created.add((follower, followed))
+        return created
+
+    def unfollow(self, edges):
+        """Deletes the given edges, returning how many were removed."""
+        removed = 0
+        for edge in list(edges):
+            # Deleting by id keeps concurrent workers from counting twice.
+            if FollowEdge.objects.filter(id=edge.id).delete()[0]:
+                self.adjust_counts(edge.follower, edge.followed, -1)
+                removed += 1
+        return removed
+
+    @staticmethod
+    def accept(follow):
+        """Stores the Accept answering a received Follow activity."""
+        local = actor_url(follow.actor_id)
+        document = {
+            '@context': 'https://www.w3.org/ns/activitystreams',
+            'id': f'{local}#accepts/{follow.id}',
+            'type': 'Accept',
+            'actor': local,
+            'object': follow.object_data,
+        }
+        return Activity.objects.create(
+            actor_id=follow.actor_id,
+            activity_type='Accept',
+            object_data=document,
+            iri=document['id'],
+        )
+
+    @staticmethod
+    def adjust_counts(follower, followed, delta):
+        """Updates the counts of the local actors at both ends of an edge."""
+        for iri, field in (
+            (follower, 'following_count'),
+            (followed, 'followers_count'),
+        ):
+            actor_id = local_id(iri, 'actors')
+            if actor_id:
+                Actor.objects.filter(id=actor_id).update(**{field: F(field) + delta})
+
+    @staticmethod
+    def followers(actor_ids):
+        """Returns the IRIs of the followers of each of the given local actors."""
+        urls = {actor_url(actor_id): actor_id for actor_id in actor_ids}
+        edges = FollowEdge.objects.filter(followed__in=urls)
+        followers = {}
+        for follower, followed in edges.values_list('follower', 'followed'):
+            followers.setdefault(urls[followed], []).append(follower)
+        return followers
+
+    @staticmethod
+    def get_paginator(actor, route):
+        """Returns the paginator and size of the followers or following collection."""
+        if route == 'followers':
+            edges = FollowEdge.objects.filter(followed=actor_url(actor.id))
+            paginator = CursorPaginator(edges, lambda edge: edge.follower, 'created_at')
+            return paginator, actor.followers_count
+        edges = FollowEdge.objects.filter(follower=actor_url(actor.id))
+        paginator = CursorPaginator(edges, lambda edge: edge.followed, 'created_at')
+        return paginator, actor.following_count
+
+    def get_collection(self, request, username, route):
+        """
+        Returns the followers or following collection of an Actor.
+
+        The collection size comes from the denormalized counts, and pages are
+        walked through the ``max_id``/``min_id`` cursors like outboxes.
+        """
+        actor = get_object_or_404(Actor, user__username=username)
+        paginator, total_items = self.get_paginator(actor, route)
+        if 'page' not in request.GET:
+            return JsonResponse(paginator.collection(request.path, total_items))
+
+        try:
+            return JsonResponse(paginator.page(request, request.path))
+        except InvalidCursor:
+            return JsonResponse({'error': 'Invalid cursor'}, status=400)
+
+    async def aget_collection(self, request, username, route):
+        """Returns the followers or following collection, without thread hops."""
+        try:
+            actor = await Actor.objects.aget(user__username=username)
+        except Actor.DoesNotExist as e:
+            raise Http404('No Actor matches the given query.') from e
+        paginator, total_items = self.get_paginator(actor, route)
+        if 'page' not in request.GET:
+            return JsonResponse(paginator.collection(request.path, total_items))
+
+        try:
+            return JsonResponse(await paginator.apage(request, request.path))
+        except InvalidCursor:
+            return JsonResponse({'error': 'Invalid cursor'}, status=400)
+
+
+@InboxService.register('Follow')
+def follow_edges(activities):
+    """
+    Adds the remote actors following an inbox to its followers.
+
+    Each new edge is answered with an Accept queued for delivery to the
+    follower, without which remote servers never consider the follow done.
+    """
+    service = FollowService()
+    follows = {}
+    for activity in activities:
+        follower = get_object_iri(activity.object_data.get('actor'))
+        if isinstance(follower, str):
+            follows.setdefault((follower, actor_url(activity.actor_id)), activity)
+    created = service.follow_many(
+        (follower, followed, activity.object_data.get('id') or '')
+        for (follower, followed), activity in follows.items()
+    )
+    accepts = [
+        (follower, service.accept(activity))
+        for (follower, followed), activity in follows.items()
+        if (follower, followed) in created
+    ]
+    if accepts:
+        delivery_service = DeliveryService()
+        documents = delivery_service.get_recipients({iri for iri, _ in accepts})
+        for follower, accept in accepts:
+            delivery_service.address(accept, [follower], documents)
+
+
+@InboxService.register('Accept')
+def accept_follows(activities):
+    """
+    Adds the actors accepting a Follow of the inbox owner to its following.
+
+    Only Accepts embedding the original Follow are taken into account, since
+    outgoing Follows are not kept anywhere they could be looked up by IRI.
+    """
+    edges = []
+    for activity in activities:
+        follow = activity.object_data.get('object')
+        followed = get_object_iri(activity.object_data.get('actor'))
+        if (
+            isinstance(followed, str)
+            and isinstance(follow, dict)
+            and follow.get('type') == 'Follow'
+            and get_object_iri(follow.get('actor')) == actor_url(activity.actor_id)
+        ):
+            edges.append(
+                (actor_url(activity.actor_id), followed, follow.get('id') or '')
+            )
+    FollowService().follow_many(edges)
+
+
+@InboxService.register('Undo')
+def undo_follows(activities):
+    """Removes the followers whose Follow was reverted by Undo."""
+    undone = {}
+    for activity in activities:
+        follower = get_object_iri(activity.object_data.get('actor'))
+        follow = activity.object_data.get('object')
+        if isinstance(follow, dict) and follow.get('type') == 'Follow':
+            iri = None  # An embedded Follow reverts the edge whatever its IRI.
+        elif isinstance(follow, str) and follow:
+            iri = follow
+        else:
+            continue
+        if isinstance(follower, str):
+            pair = (follower, actor_url(activity.actor_id))
+            undone.setdefault(pair, set()).add(iri)
+    if not undone:
+        return
+    edges = FollowEdge.objects.filter(
+        follower__in={follower for follower, _ in undone},
+        followed__in={followed for _, followed in undone},
+    )
+    FollowService().unfollow(
+        edge
+        for edge in edges
+        if (edge.follower, edge.followed) in undone
+        and undone[(edge.follower, edge.followed)] & {None, edge.activity_iri}
+    )
+
+
+class TimelineService:
+    """
+    Handles the materialized home timelines of local actors.
+
+    Timelines are written when activities arrive (fan-out on write): each
+    entry holds a copy of the activity, so reading a home timeline is a
+    single range scan over the (owner, published_at, id) index, without
+    joins. Timelines are capped to SOCIALIZE_TIMELINE_LENGTH entries, the
+    oldest being trimmed as new ones are pushed.
+    """
+
+    @staticmethod
+    def get_length():
+        """Returns the maximum number of entries kept in each timeline."""
+        return getattr(settings, 'SOCIALIZE_TIMELINE_LENGTH', 800)
+
+    def push(self, entries):
+        """
+        Stores (owner_id, document, published_at) entries and trims timelines.
+
+        The timelines of all the owners are trimmed together in one statement.
+        """
+        entries = [
+            TimelineEntry(owner_id=owner_id, object_data=document, published_at=at)
+            for owner_id, document, at in entries
+        ]
+        TimelineEntry.objects.bulk_create(entries, batch_size=500)
+        self.trim({entry.owner_id for entry in entries})
+
+    def trim(self, owner_ids):
+        """Deletes the entries beyond the timeline length of each owner."""
+        if owner_ids:
+            self.overflow(owner_ids, self.get_length()).delete()
+
+    @staticmethod
+    def overflow(owner_ids, length):
+        """Returns the entries ranked past the given length in their timeline."""
+        if not WINDOW_FILTERS:
+            # Window functions cannot be filtered on before Django 4.2.
+            return TimelineEntry.objects.filter(
+                id__in=[
+                    pk
+                    for owner_id in owner_ids
+                    for pk in TimelineEntry.objects.filter(owner_id=owner_id)
+                    .order_by('-published_at', '-id')
+                    .values_list('id', flat=True)[length:]
+                ]
+            )
+        ranked = (
+            TimelineEntry.objects.filter(owner_id__in=owner_ids)
+            .annotate(
+                rank=Window(
+                    RowNumber(),
+                    partition_by=F('owner_id'),
+                    order_by=[F('published_at').desc(), F('id').desc()],
+                )
+            )
+            .filter(rank__gt=length)
+        )
+        return TimelineEntry.objects.filter(id__in=ranked.values('id'))
+
+    def get_timeline(self, request, username):
+        """
+        Returns the home timeline of the authenticated actor.
+
+        The collection is paginated like outboxes, walking the ``max_id`` and
+        ``min_id`` cursors of the next/prev links. Only the owner of the
+        timeline can read it.
+        """
+        check_owner(request.user, username, 'timeline')
+
+        actor = get_object_or_404(Actor, user__username=username)
+        return self.timeline_response(request, actor)
+
+    async def aget_timeline(self, request, username):
+        """Returns the home timeline of the authenticated actor, without thread hops."""
+        check_owner(await aget_user(request), username, 'timeline')
+
+        try:
+            actor = await Actor.objects.aget(user__username=username)
+        except Actor.DoesNotExist as e:
+            raise Http404('No Actor matches the given query.') from e
+        return await self.atimeline_response(request, actor)
+
+    def timeline_response(self, request, actor):
+        """Renders the timeline collection or the page selected by its cursors."""
+        entries = TimelineEntry.objects.filter(owner=actor)
+        paginator = CursorPaginator(entries, lambda entry: entry.object_data)
+        if 'page' not in request.GET:
+            total_items = cached_count(f'timeline:{actor.id}', entries)
+            return JsonResponse(paginator.collection(request.path, total_items))
+
+        try:
+            return JsonResponse(paginator.page(request, request.path))
+        except InvalidCursor:
+            return JsonResponse({'error': 'Invalid cursor'}, status=400)
+
+    async def atimeline_response(self, request, actor):
+        """Renders the timeline collection or page, using the async ORM."""
+        entries = TimelineEntry.objects.filter(owner=actor)
+        paginator = CursorPaginator(entries, lambda entry: entry.object_data)
+        if 'page' not in request.GET:
+            total_items = await acached_count(f'timeline:{actor.id}', entries)
+            return JsonResponse(paginator.collection(request.path, total_items))
+
+        try:
+            return JsonResponse(await paginator.apage(request, request.path))
+        except InvalidCursor:
+            return JsonResponse({'error': 'Invalid cursor'}, status=400)
+
+
+@InboxService.register('Create')
+@InboxService.register('Announce')
+def push_timelines(activities):
+    """Materializes received posts and boosts into the recipients' timelines."""
+    TimelineService().push(
+        (activity.actor_id, activity.object_data, activity.published_at)
+        for activity in activities
+    )
+
+
+@InboxService.register('Undo')
+def undo_timelines(activities):
+    """Removes the entries reverted by Undo from the recipients' timelines."""
+    undone = match_targets(
+        TimelineEntry.objects.all(),
+        'owner_id',
+        'object_data__id',
+        get_targets(activities),
+    )
+    TimelineEntry.objects.filter(id__in=undone).delete()
+
+
+@InboxService.register('Delete')
+def delete_timelines(activities):
+    """Removes deleted objects from the recipients' timelines."""
+    deleted = match_targets(
+        TimelineEntry.objects.all(),
+        'owner_id',
+        'object_data__object__id',
+        get_targets(activities),
+    )
+    TimelineEntry.objects.filter(id__in=deleted).delete()
+
+
+class OutboxService:
+    """
+    Handles the queue of activities created locally and their fan-out.
+
+    Creating an object stores it with its Create activity, pushes it to its
+    author's timeline and queues the activity; workers then copy queued
+    activities into the timelines of the authors' local followers and queue
+    their deliveries to remote followers in batches, so the cost of a post
+    does not grow with its audience inside the request.
+    """
+
+    @staticmethod
+    def enqueue(activity):
+        """Appends a stored local activity to the fan-out queue."""
+        return OutboxItem.objects.create(
+            actor_id=activity.actor_id,
+            payload=activity.object_data,
+            published_at=activity.published_at,
+            activity=activity,
+        )
+
+    def drain(self, batch_size=100):
+        """
+        Fans out up to batch_size queued activities, returning how many were taken.
+
+        Queued rows are locked and the followers of all their authors are
+        read in one query. The entries of every local follower are pushed and
+        trimmed together, and the activities are queued for delivery to the
+        remote followers whose actors are cached, before the rows leave the
+        queue. Other followers are queued for resolution, so no remote server
+        is contacted while the rows are locked.
+        """
+        with transaction.atomic():
+            items = list(
+                OutboxItem.objects.select_for_update(skip_locked=True, of=('self',))
+                .select_related('activity')
+                .order_by('id')[:batch_size]
+            )
+            if not items:
+                return 0
+
+            followers = FollowService.followers({item.actor_id for item in items})
+            local, remote = {}, {}
+            for actor_id, iris in followers.items():
+                for iri in iris:
+                    follower_id = local_id(iri, 'actors')
+                    if follower_id:
+                        local.setdefault(actor_id, []).append(follower_id)
+                    else:
+                        remote.setdefault(actor_id, []).append(iri)
+
+            TimelineService().push(
+                (owner_id, item.payload, item.published_at)
+                for item in items
+                for owner_id in local.get(item.actor_id, ())
+            )
+            delivery_service = DeliveryService()
+            documents = delivery_service.get_recipients(
+                {iri for iris in remote.values() for iri in iris}
+            )
+            for item in items:
+                if item.activity is not None and item.actor_id in remote:
+                    delivery_service.address(
+                        item.activity, remote[item.actor_id], documents
+                    )
+            OutboxItem.objects.filter(id__in=[item.id for item in items]).delete()
+
+        return len(items)
+
+
+class DeliveryService:
+    """Handles the delivery of local activities to remote inboxes."""
+
+    sessions = SessionPool(headers={'Content-Type': 'application/activity+json'})
+
+    @staticmethod
+    def get_target_inbox(recipient):
+        """Returns the inbox to deliver to, preferring the shared inbox of its host."""
+        if isinstance(recipient, dict):
+            endpoints = recipient.get('endpoints') or {}
+            return endpoints.get('sharedInbox') or recipient.get('inbox')
+        return recipient
+
+    @staticmethod
+    def get_recipients(iris):
+        """Returns the cached actor documents of the given remote actors, by IRI."""
+        return dict(
+            RemoteActor.objects.filter(
+                iri__in=iris, document__isnull=False
+            ).values_list('iri', 'document')
         )
 
+    def address(self, activity, iris, documents=None):
+        """
+        Queues the activity for delivery to the given remote actors.
+
+        Actors whose documents are cached get their deliveries right away;
+        the others are queued as pending recipients, resolved later by
+        resolve_pending. Returns the number of pending recipients.
+        """
+        if documents is None:
+            documents = self.get_recipients(iris)
+        self.fan_out(activity, (documents[iri] for iri in iris if iri in documents))
+        pending = [
+            PendingRecipient(activity=activity, iri=iri)
+            for iri in sorted(set(iris) - set(documents))
+        ]
+        PendingRecipient.objects.bulk_create(
+            pending, batch_size=500, ignore_conflicts=True
+        )
+        return len(pending)
+
+    def resolve_pending(self, batch_size=100, concurrency=8):
+        """
+        Resolves a batch of due pending recipients, returning how many were taken.
+
+        Rows are leased in a short transaction, their actors are resolved
+        outside of it, at most concurrency at a time, and the deliveries of
+        the resolved ones are queued in a second transaction. Recipients that
+        cannot be resolved are retried later with exponential backoff.
+        """
+        pending = self.claim_pending(batch_size)
+        if not pending:
+            return 0
+
+        iris = {recipient.iri for recipient in pending}
+        remotes = async_to_sync(self.aresolve_all)(iris, concurrency)
+        resolved = [r for r in pending if remotes.get(r.iri) is not None]
+        failed = [r for r in pending if remotes.get(r.iri) is None]
+
+        with transaction.atomic():
+            by_activity = {}
+            for recipient in resolved:
+                by_activity.setdefault(recipient.activity_id, (recipient.activity, []))[
+                    1
+                ].append(remotes[recipient.iri].document)
+            for activity, documents in by_activity.values():
+                self.fan_out(activity, documents)
+            PendingRecipient.objects.filter(id__in=[r.id for r in resolved]).delete()
+
+            backoff = getattr(settings, 'SOCIALIZE_DELIVERY_BACKOFF', 30)
+            for recipient in failed:
+                delay = backoff * 2**recipient.attempts
+                recipient.attempts += 1
+                recipient.next_attempt_at = now() + datetime.timedelta(seconds=delay)
+            PendingRecipient.objects.bulk_update(
+                failed, ['attempts', 'next_attempt_at']
+            )
+        return len(pending)
+
+    @staticmethod
+    def claim_pending(batch_size):
+        """Locks a batch of due pending recipients and leases them to this worker."""
+        max_attempts = getattr(settings, 'SOCIALIZE_DELIVERY_MAX_ATTEMPTS', 8)
+        lease = getattr(settings, 'SOCIALIZE_DELIVERY_LEASE', 300)
+        with transaction.atomic():
+            pending = list(
+                PendingRecipient.objects.select_for_update(
+                    skip_locked=True, of=('self',)
+                )
+                .filter(attempts__lt=max_attempts, next_attempt_at__lte=now())
+                .select_related('activity')
+                .order_by('next_attempt_at')[:batch_size]
+            )
+            PendingRecipient.objects.filter(id__in=[r.id for r in pending]).update(
+                next_attempt_at=now() + datetime.timedelta(seconds=lease)
+            )
+        return pending
+
+    @staticmethod
+    async def aresolve_all(iris, concurrency):
+        """Resolves the remote actors, at most concurrency at a time, by IRI."""
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def resolve(iri):
+            async with semaphore:
+                return iri, await resolver.aresolve(iri)
+
+        return dict(await asyncio.gather(*(resolve(iri) for iri in iris)))
+
+    def fan_out(self, activity, recipients):
+        """
+        Queues the activity for delivery to the given recipients.
+
+        Recipients are actor documents or inbox URLs. Recipients sharing a
+        sharedInbox endpoint collapse into a single delivery, and the rows are
+        inserted in bulk, so the caller never talks to remote servers itself.
+        Returns the number of distinct inboxes targeted.
+        """
+        inboxes = {self.get_target_inbox(recipient) for recipient in recipients}
+        inboxes.discard(None)
+        Delivery.objects.bulk_create(
+            (Delivery(activity=activity, inbox=inbox) for inbox in sorted(inboxes)),
+            batch_size=500,
+            ignore_conflicts=True,
+        )
+        return len(inboxes)
+
+    def deliver_pending(self, batch_size=100, workers=4):
+        """
+        Delivers a batch of due deliveries, returning how many were attempted.
+
+        Each activity is serialized and digested once for all of its inboxes,
+        and each delivery signs only its headers. Deliveries are grouped by
+        remote host, and every host is served over its own pooled keep-alive
+        session from a worker thread. Failures are retried later with
+        exponential backoff.
+        """
+        deliveries = self.claim(batch_size)
+        if not deliveries:
+            return 0
+
+        payloads = {}
+        for delivery in deliveries:
+            activity = delivery.activity
+            if activity.id not in payloads:
+                payloads[activity.id] = self.get_payload(activity)
+
+        by_host = {}
+        for delivery in deliveries:
+            by_host.setdefault(urlsplit(delivery.inbox).netloc, []).append(delivery)
+
+        errors = {}
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for result in executor.map(
+                lambda group: self.post_group(group, payloads), by_host.values()
+            ):
+                errors.update(result)
+
+        self.record(deliveries, errors)
+        return len(deliveries)
+
+    @staticmethod
+    def claim(batch_size):
+        """Locks a batch of due deliveries and leases them to this worker."""
+        max_attempts = getattr(settings, 'SOCIALIZE_DELIVERY_MAX_ATTEMPTS', 8)
+        lease = getattr(settings, 'SOCIALIZE_DELIVERY_LEASE', 300)
+        with transaction.atomic():
+            deliveries = list(
+                Delivery.objects.select_for_update(skip_locked=True, of=('self',))
+                .filter(
+                    delivered_at__isnull=True,
+                    attempts__lt=max_attempts,
+                    next_attempt_at__lte=now(),
+                )
+                .select_related('activity__actor__user')
+                .order_by('next_attempt_at')[:batch_size]
+            )
+            Delivery.objects.filter(id__in=[d.id for d in deliveries]).update(
+                next_attempt_at=now() + datetime.timedelta(seconds=lease)
+            )
+        return deliveries
+
+    @staticmethod
+    def get_payload(activity):
+        """Returns the body of the activity, its digest and the signing key."""
+        body = json.dumps(activity.object_data).encode()
+        try:
+            actor_id, private_key = load_signing_key(activity.actor.user.username)
+        except PermissionDenied:
+            return None
+        return body, httpsig.digest(body), httpsig.get_key_id(actor_id), private_key
+
+    def post_group(self, deliveries, payloads):
+        """Posts the deliveries of a single host, returning the error of each one."""
+        timeout = getattr(settings, 'SOCIALIZE_DELIVERY_TIMEOUT', 10)
+        session = self.sessions.get(deliveries[0].inbox)
+        errors = {}
+        for delivery in deliveries:
+            payload = payloads[delivery.activity_id]
+            if payload is None:
+                errors[delivery.id] = 'Private key not found'
+                continue
+            body, body_digest, key_id, private_key = payload
+            headers = httpsig.signed_headers(
+                private_key, key_id, 'POST', delivery.inbox, body_digest
+            )
+            try:
+                response = session.post(
+                    delivery.inbox, data=body, headers=headers, timeout=timeout
+                )
+                if response.status_code >= 300:
+                    errors[delivery.id] = f'HTTP {response.status_code}'
+            except requests.RequestException as e:
+                errors[delivery.id] = str(e)
+        return errors
+
+    @staticmethod
+    def record(deliveries, errors):
+        """Marks the successful deliveries and reschedules the failed ones."""
+        backoff = getattr(settings, 'SOCIALIZE_DELIVERY_BACKOFF', 30)
+        delivered = [d.id for d in deliveries if d.id not in errors]
+        Delivery.objects.filter(id__in=delivered).update(delivered_at=now())
+
+        failed = [d for d in deliveries if d.id in errors]
+        for delivery in failed:
+            delay = backoff * 2**delivery.attempts
+            delivery.attempts += 1
+            delivery.next_attempt_at = now() + datetime.timedelta(seconds=delay)
+            delivery.last_error = errors[delivery.id]
+        Delivery.objects.bulk_update(
+            failed, ['attempts', 'next_attempt_at', 'last_error']
+        )
+
+
+class ArchiveService:
+    """Handles the export and import of actor archives."""
+
+    def export_chunks(self, actor, compress=True):
+        """
+        Yields the actor's outbox as an ActivityStreams archive, in chunks.
+
+        The archive is an OrderedCollection holding the actor's activities
+        followed by its objects wrapped in Create activities. Rows are read
+        with chunked iterators and encoded as they go, and the output is
+        gzip-compressed on the fly unless compress is False.
+        """
+        items = itertools.chain(
+            self.get_paginator(actor).items(), self.iter_creates(actor)
+        )
+        chunks = StreamingJsonResponse.iter_content(
+            self.get_document(actor), 'orderedItems', items, buffer_size=65536
+        )
+        return gzip_chunks(chunks) if compress else chunks
+
+    def aexport_chunks(self, actor, compress=True):
+        """Yields the actor's archive in chunks, reading rows with the async ORM."""
+        chunks = StreamingJsonResponse.aiter_content(
+            self.get_document(actor),
+            'orderedItems',
+            self.aiter_items(actor),
+            buffer_size=65536,
+        )
+        return agzip_chunks(chunks) if compress else chunks
+
+    @staticmethod
+    def get_document(actor):
+        """Returns the members of the archive collection but its items."""
+        return {
+            '@context': 'https://www.w3.org/ns/activitystreams',
+            'id': actor.outbox or actor_url(actor.id),
+            'type': 'OrderedCollection',
+        }
+
+    @staticmethod
+    def get_paginator(actor):
+        """
+        Returns the paginator over the activities of the actor's outbox.
+
+        The actor's own Creates are left out, since they are exported from
+        the objects they announce.
+        """
+        activities = Activity.objects.filter(actor=actor).exclude(
+            activity_type='Create', object_data__actor=actor_url(actor.id)
+        )
+        return CursorPaginator(activities, lambda activity: activity.object_data)
+
+    @staticmethod
+    def get_creates(actor):
+        """Returns the serializer and the projected rows of the actor's objects."""
+        serializer = ObjectSerializer()
+        rows = (
+            Object.objects.filter(actor=actor)
+            .order_by('-published_at', '-id')
+            .values(*serializer.fields, 'published_at')
+        )
+        return serializer, rows
+
+    def iter_creates(self, actor, chunk_size=2000):
+        """Yields the actor's objects wrapped in Create activities."""
+        serializer, rows = self.get_creates(actor)
+        for row in rows.iterator(chunk_size=chunk_size):
+            yield wrap_create(serializer.serialize(row), row['published_at'])
+
+    async def aiter_items(self, actor, chunk_size=2000):
+        """Yields the archive items of the actor, using the async ORM."""
+        async for item in self.get_paginator(actor).aitems(chunk_size):
+            yield item
+        serializer, rows = self.get_creates(actor)
+        async for row in aiterator(rows, chunk_size):
+            yield wrap_create(serializer.serialize(row), row['published_at'])
+
+    def export_activity(self, request, username):
+        """
+        Returns the actor's archive as a streamed gzip download.
+
+        The archive holds everything stored under the actor, including the
+        activities received from other servers, so only its authenticated
+        owner may download it.
+        """
+        check_owner(request.user, username, 'archive')
+        actor = get_object_or_404(Actor, user__username=username)
+        return self.archive_response(self.export_chunks(actor), username)
+
+    async def aexport_activity(self, request, username):
+        """Returns the actor's archive as a gzip download streamed under ASGI."""
+        check_owner(await aget_user(request), username, 'archive')
+        actor = await Actor.objects.filter(user__username=username).afirst()
+        if actor is None:
+            raise Http404('No Actor matches the given query.')
+        return self.archive_response(self.aexport_chunks(actor), username)
+
+    @staticmethod
+    def archive_response(chunks, username):
+        """Returns the streamed download of the archive chunks."""
+        response = StreamingHttpResponse(chunks, content_type='application/gzip')
+        response['Content-Disposition'] = f'attachment; filename="{username}.json.gz"'
+        return response
+
+    def open_archive(self, source):
+        """Opens an archive file, gzip-compressed or not, or a remote outbox."""
+        if source.startswith(('http://', 'https://')):
+            response = requests.get(
+                source,
+                headers={'Accept': 'application/activity+json'},
+                stream=True,
+                timeout=30,
+            )
+            response.raise_for_status()
+            response.raw.decode_content = True
+            return response.raw
+        with open(source, 'rb') as f:
+            compressed = f.read(2) == b'\x1f\x8b'
+        return gzip.open(source, 'rb') if compressed else open(source, 'rb')
+
+    def iter_items(self, stream):
+        """Yields the items of an archive, following pages of remote outboxes."""
+        reader = ArchiveReader(stream)
+        yield from reader
+        page = reader.document and reader.document.get('first')
+        while page:
+            if isinstance(page, str):
+                page = requests.get(
+                    page, headers={'Accept': 'application/activity+json'}, timeout=30
+                ).json()
+            yield from page.get('orderedItems') or page.get('items') or []
+            page = page.get('next')
+
+    def import_items(self, actor, items, batch_size=1000):
+        """
+        Loads archive items into the actor's outbox, returning how many were read.
+
+        Items are buffered into batches inserted with bulk_create, so memory
+        is bounded by the batch size whatever the size of the archive. Create
+        activities carrying inline objects also restore those objects,
+        keeping their ids when they were exported by this server and
+        deriving stable ids from the IRIs of the others.
+        """
+        total, batch = 0, []
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            batch.append(item)
+            if len(batch) >= batch_size:
+                total += self.load_batch(actor, batch)
+                batch = []
+        if batch:
+            total += self.load_batch(actor, batch)
+        return total
+
+    def load_batch(self, actor, items):
+        """Inserts a batch of archive items as activities and objects."""
+        activities, objects = [], []
+        for item in items:
+            published = parse_datetime(str(item.get('published', ''))) or now()
+            activities.append(
+                Activity(
+                    actor=actor,
+                    activity_type=item.get('type'),
+                    object_data=item,
+                    iri=InboxService.get_iri(item),
+                    published_at=published,
+                )
+            )
+            obj = item.get('object')
+            if item.get('type') == 'Create' and isinstance(obj, dict):
+                objects.append(
+                    Object(
+                        id=self.get_object_id(obj.get('id')),
+                        actor=actor,
+                        object_type=obj.get('type') or 'Note',
+                        content=obj.get('content') or '',
+                        published_at=published,
+                    )
+                )
+        with transaction.atomic():
+            Activity.objects.bulk_create(activities, ignore_conflicts=True)
+            Object.objects.bulk_create(objects, ignore_conflicts=True)
+        return len(items)
+
+    @staticmethod
+    def get_object_id(iri):
+        """
+        Returns the id an imported object is stored under.
+
+        Objects exported by this server keep their id; others get one derived
+        from their IRI, so importing the same archive twice stores them once.
+        """
+        if not isinstance(iri, str) or not iri:
+            return uuid.uuid4()
+        return local_id(iri, 'objects') or uuid.uuid5(uuid.NAMESPACE_URL, iri)
+
 
 class ObjectService:
     """Handles ActivityPub Object endpoints."""
 
-    def get_object(self, _, object_id, as_activitypub=True):
-        """Returns the ActivityPub representation of an Object for the given ID."""
-        obj = get_object_or_404(Object, id=object_id)
-        if as_activitypub:
-            return JsonResponse(obj.as_activitypub())
-        return JsonResponse(
-            {
-                'id': obj.id,
-                'actor': obj.actor.user.username,
-                'object_type': obj.object_type,
-                'content': obj.content,
-                'created_at': obj.created_at,
-                'updated_at': obj.updated_at,
-            }
+    def get_object(self, request, object_id, as_activitypub=True):
+        """
+        Returns the ActivityPub representation of an Object for the given ID.
+
+        Conditional requests are answered from the object validators alone.
+        """
+        row = Object.objects.filter(id=object_id).values_list('id', 'updated_at')
+        row = row.first()
+        if row is None:
+            raise Http404('No Object matches the given query.')
+
+        etag, last_modified = get_validators(*row, variant=as_activitypub)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
         )
+        if response is None:
+            if as_activitypub:
+                data = ObjectSerializer().first(Object.objects.filter(id=object_id))
+            else:
+                obj = Object.objects.select_related('actor__user').get(id=object_id)
+                data = self.serialize_object(obj, False)
+            response = JsonResponse(data)
+        return set_validators(response, etag, last_modified)
+
+    async def aget_object(self, request, object_id, as_activitypub=True):
+        """Returns the ActivityPub representation of an Object, without thread hops."""
+        row = Object.objects.filter(id=object_id).values_list('id', 'updated_at')
+        row = await row.afirst()
+        if row is None:
+            raise Http404('No Object matches the given query.')
+
+        etag, last_modified = get_validators(*row, variant=as_activitypub)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            objects = Object.objects.filter(id=object_id)
+            if as_activitypub:
+                data = await ObjectSerializer().afirst(objects)
+            else:
+                obj = await objects.select_related('actor__user').aget()
+                data = self.serialize_object(obj, False)
+            response = JsonResponse(data)
+        return set_validators(response, etag, last_modified)
+
+    def serialize_object(self, obj, as_activitypub=True):
+        """Returns the document describing the Object."""
+        if as_activitypub:
+            serializer = ObjectSerializer()
+            return serializer.serialize(serializer.row(obj))
+        return {
+            'id': obj.id,
+            'actor': obj.actor.user.username,
+            'object_type': obj.object_type,
+            'content': obj.content,
+            'likes': obj.likes_count,
+            'shares': obj.shares_count,
+            'replies': obj.replies_count,
+            'created_at': obj.published_at,
+            'updated_at': obj.updated_at,
+        }
 
     def create_object(self, request, username):
-        """Creates a new Object from the given data."""
+        """
+        Creates a new Object from the given data.
+
+        The object is stored with its Create activity, and only the author's
+        timeline is written here; the activity is queued for the outbox
+        workers to fan out to local and remote followers.
+        """
         try:
             data = json.loads(request.body)
-            actor = get_object_or_404(Actor, user__username=username)
+        except json.JSONDecodeError:
+            return JsonResponse({'error': 'Invalid JSON data'}, status=400)
+        actor = get_object_or_404(Actor, user__username=username)
+        return JsonResponse(self.store_object(actor, data))
+
+    async def acreate_object(self, request, username):
+        """Creates a new Object from the given data, storing it in one thread hop."""
+        try:
+            data = json.loads(request.body)
+        except json.JSONDecodeError:
+            return JsonResponse({'error': 'Invalid JSON data'}, status=400)
+        try:
+            actor = await Actor.objects.aget(user__username=username)
+        except Actor.DoesNotExist as e:
+            raise Http404('No Actor matches the given query.') from e
+        return JsonResponse(await sync_to_async(self.store_object)(actor, data))
+
+    def store_object(self, actor, data):
+        """
+        Stores an Object with its Create activity, returning its document.
+
+        The object, the activity, the author's timeline entry and the outbox
+        item are written in one transaction, so a failure leaves none of them
+        behind and the counters buffered on commit are only flushed once the
+        whole creation succeeded.
+        """
+        with transaction.atomic():
             obj = Object.objects.create(
                 actor=actor,
                 object_type=data.get('type'),
                 content=data.get('content'),
             )
-            return JsonResponse(obj.as_activitypub())
-        except json.JSONDecodeError:
-            return JsonResponse({'error': 'Invalid JSON data'}, status=400)
+            document = self.serialize_object(obj)
+            create = wrap_create(document, obj.published_at)
+            activity = Activity.objects.create(
+                actor=actor,
+                activity_type='Create',
+                object_data=create,
+                iri=create['id'],
+                published_at=obj.published_at,
+            )
+            TimelineService().push([(actor.id, create, obj.published_at)])
+            OutboxService.enqueue(activity)
+        return document
 
 
 class VaultService:
@@ -224,12 +1749,74 @@ class VaultService:
         return JsonResponse({'message': 'Vault already has the private key'})
 
 
+class KeyPoolService:
+    """Handles the pool of key pairs generated ahead of actor provisioning."""
+
+    @staticmethod
+    def acquire():
+        """
+        Takes a key pair out of the pool, returning its private/public PEMs.
+
+        The row is locked and deleted in the same transaction, so concurrent
+        signups never share a key pair. Only pairs of the configured algorithm
+        are handed out. Returns None when the pool is empty.
+        """
+        with transaction.atomic():
+            key_pair = (
+                KeyPair.objects.select_for_update(skip_locked=True)
+                .filter(algorithm=get_key_algorithm())
+                .first()
+            )
+            if key_pair is None:
+                return None
+            if not KeyPair.objects.filter(pk=key_pair.pk).delete()[0]:
+                return None
+        return key_pair.private_key, key_pair.public_key
+
+    @staticmethod
+    def refill(size, processes=1):
+        """Generates key pairs until the pool holds size pairs of the algorithm."""
+        algorithm = get_key_algorithm()
+        missing = max(0, size - KeyPair.objects.filter(algorithm=algorithm).count())
+        if not missing:
+            return 0
+
+        generate = ActorService().generate_keys
+        if processes > 1:
+            with ProcessPoolExecutor(max_workers=processes) as executor:
+                futures = [executor.submit(generate, algorithm) for _ in range(missing)]
+                keys = [future.result() for future in futures]
+        else:
+            keys = [generate(algorithm) for _ in range(missing)]
+
+        KeyPair.objects.bulk_create(
+            KeyPair(private_key=private_key, public_key=public_key, algorithm=algorithm)
+            for private_key, public_key in keys
+        )
+        return missing
+
+
 class AuthenticationService:
     """
     Handles authentication for the socialize app
     using OAuth providers like Google and Facebook
     """
 
+    provider_urls = {
+        'google': 'https://www.googleapis.com/oauth2/v1/tokeninfo?access_token={token}',
+        'facebook': 'https://graph.facebook.com/me?access_token={token}&fields=email',
+    }
+
+    sessions = SessionPool(
+        pool_maxsize=getattr(settings, 'SOCIALIZE_OAUTH_POOL_SIZE', 10)
+    )
+    verifications = LRUCache(
+        maxsize=getattr(settings, 'SOCIALIZE_OAUTH_CACHE_SIZE', 4096),
+        ttl=getattr(settings, 'SOCIALIZE_OAUTH_CACHE_TTL', 300),
+    )
+    inflight = SingleFlight()
+    clients = AsyncClientPool(timeout=10)
+
     def authenticate(self, request, user_data, access_token):
         """Authenticate the user using the OAuth provider."""
 
@@ -244,18 +1831,95 @@ class AuthenticationService:
         token, _ = Token.objects.get_or_create(access_token=access_token, user=user)
         return JsonResponse({'access_token': token.access_token, 'expires_in': 3600})
 
+    @staticmethod
+    def purge_tokens(chunk_size=1000):
+        """
+        Deletes up to chunk_size expired tokens, returning how many were removed.
+
+        Expired rows are found through the expires_at index, oldest first, and
+        deleted by primary key, so each call is a short transaction holding
+        only the locks of its own chunk.
+        """
+        expired = Token.objects.filter(expires_at__lte=now()).order_by('expires_at')
+        ids = list(expired.values_list('id', flat=True)[:chunk_size])
+        if not ids:
+            return 0
+        return Token.objects.filter(id__in=ids).delete()[0]
+
     def verify_access_token(self, provider, token):
-        """Check if key is in AccessToken key and not expired."""
-        provider_urls = {
-            'google': 'https://www.googleapis.com/oauth2/v1/tokeninfo?access_token={token}',
-            'facebook': 'https://graph.facebook.com/me?access_token={token}&fields=email',
-        }
+        """
+        Check if key is in AccessToken key and not expired.
 
-        if provider not in provider_urls:
+        Provider answers are cached under the hash of the token, successful
+        ones no longer than the expiry reported by the provider, failed ones
+        for SOCIALIZE_OAUTH_NEGATIVE_TTL seconds. Concurrent verifications
+        of the same token share a single request over the provider's pooled
+        session.
+        """
+        if provider not in self.provider_urls:
             return None
 
-        response = requests.get(provider_urls[provider].format(token=token), timeout=10)
-        if response.status_code != 200:
+        key = (provider, hash_token(token))
+        result = self.verifications.get(key, MISSING)
+        if result is MISSING:
+            result = self.inflight.do(key, self.fetch_verification, provider, token)
+        return result
+
+    def fetch_verification(self, provider, token):
+        """Queries the provider for the token, caching its answer."""
+        url = self.provider_urls[provider].format(token=token)
+        try:
+            response = self.sessions.get(url).get(url, timeout=10)
+        except requests.RequestException:
+            return None  # Transient failures are not cached.
+
+        data = response.json() if response.status_code == 200 else None
+        return self.store_verification((provider, hash_token(token)), data)
+
+    def store_verification(self, key, data):
+        """Caches a provider answer, bounded by the token expiry, and returns it."""
+        if data is None:
+            ttl = getattr(settings, 'SOCIALIZE_OAUTH_NEGATIVE_TTL', 30)
+        else:
+            try:
+                expires_in = int(data.get('expires_in', self.verifications.ttl))
+            except (TypeError, ValueError):
+                expires_in = self.verifications.ttl
+            ttl = min(self.verifications.ttl, expires_in)
+        if ttl > 0:
+            self.verifications.set(key, data, ttl=ttl)
+        return data
+
+    async def averify_access_token(self, provider, token):
+        """
+        Check if key is in AccessToken key and not expired, without thread hops.
+
+        The provider is queried with httpx when it is installed, otherwise the
+        synchronous verification runs in a worker thread. Both share the
+        cache of verify_access_token.
+        """
+        if httpx is None:
+            return await sync_to_async(self.verify_access_token)(provider, token)
+
+        if provider not in self.provider_urls:
+            return None
+
+        key = (provider, hash_token(token))
+        result = self.verifications.get(key, MISSING)
+        if result is MISSING:
+            result = await self.inflight.ado(
+                key, self.afetch_verification, provider, token
+            )
+        return result
+
+    async def afetch_verification(self, provider, token):
+        """Queries the provider with the pooled httpx client, caching its answer."""
+        try:
+            response = await self.clients.get().get(
+                self.provider_urls[provider].format(token=token)
+            )
+        except httpx.HTTPError:
             return None
 
-        return response.json()
+        data = response.json() if response.status_code == 200 else None
+        return self.store_verification((provider, hash_token(token)), data)
@@ -0,0 +1,95 @@
+"""Pooled HTTP sessions for the socialize app."""
+#!/usr/bin/python
+#
+# This file is part of django-socialize project.
+#
+# Copyright (C) 2010-2025 William Oliveira de Lagos <william.lagos@icloud.com>
+#
+# Socialize is free software: you can redistribute it and/or modify
+# it under the terms of the Lesser GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Socialize is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Socialize. If not, see <http://www.gnu.org/licenses/>.
+#
+
+import asyncio
+import threading
+import weakref
+
+from urllib.parse import urlsplit
+
+import requests
+
+from requests.adapters import HTTPAdapter
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
+
+class SessionPool:
+    """
+    Keeps one keep-alive requests.Session per remote host.
+
+    Sessions are created lazily and reused across calls, so repeated requests
+    to the same server share pooled TCP/TLS connections instead of opening a
+    new one each time.
+    """
+
+    def __init__(self, pool_maxsize=10, headers=None):
+        self.pool_maxsize = pool_maxsize
+        self.headers = headers or {}
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def get(self, url):
+        """Returns the session serving the host of the given URL."""
+        host = urlsplit(url).netloc
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_maxsize=self.pool_maxsize)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                session.headers.update(self.headers)
+                self._sessions[host] = session
+            return session
+
+    def close(self):
+        """Closes every pooled session."""
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+class AsyncClientPool:
+    """
+    Keeps one keep-alive httpx.AsyncClient per running event loop.
+
+    An httpx client is bound to the loop it first ran on, so each loop gets
+    its own client, reused by every call made on it and released with the
+    loop, instead of opening new connections for each request.
+    """
+
+    def __init__(self, **options):
+        self.options = options
+        self._clients = weakref.WeakKeyDictionary()
+
+    def get(self):
+        """Returns the client of the running event loop."""
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(**self.options)
+            self._clients[loop] = client
+        return client
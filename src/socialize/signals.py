@@ -0,0 +1,69 @@
+"""Signal receivers for the socialize app."""
+#!/usr/bin/python
+#
+# This file is part of django-socialize project.
+#
+# Copyright (C) 2010-2025 William Oliveira de Lagos <william.lagos@icloud.com>
+#
+# Socialize is free software: you can redistribute it and/or modify
+# it under the terms of the Lesser GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Socialize is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Socialize. If not, see <http://www.gnu.org/licenses/>.
+#
+
+from django.contrib.auth.models import User
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.timezone import now
+
+from . import keys, tokens
+from .metrics import install_query_recorder
+from .models import Actor, Token, Vault
+
+
+@receiver([post_save, post_delete], sender=Actor)
+def evict_actor_keys(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Drops the cached keys of an actor whenever its row changes."""
+    keys.evict_actor(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Vault)
+def evict_vault_keys(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Drops the cached private key of an actor whenever its vault changes."""
+    keys.evict_actor(instance.actor_id)
+
+
+@receiver([post_save, post_delete], sender=Token)
+def evict_token(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Drops the cached lookups of a token, and of its user, when it changes."""
+    tokens.tokens.pop(tokens.hash_token(str(instance.access_token)))
+    tokens.evict_user(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+def evict_user_tokens(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Drops the cached tokens of a user, who may have been deactivated."""
+    tokens.evict_user(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def touch_actor(sender, instance, update_fields=None, **kwargs):  # pylint: disable=unused-argument
+    """Invalidates the cached documents of an actor when its user changes."""
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    Actor.objects.filter(user_id=instance.pk).update(updated_at=now())
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):  # pylint: disable=unused-argument
+    """Records the queries of every new connection, in any thread, per request."""
+    install_query_recorder(connection)
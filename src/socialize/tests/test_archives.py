@@ -0,0 +1,45 @@
+"""Test ArchiveReader class."""
+
+from socialize.archives import ArchiveError, ArchiveReader
+from django.test import SimpleTestCase
+from io import BytesIO
+from unittest import mock
+import json
+import django
+
+django.setup()
+
+
+class ArchiveReaderTest(SimpleTestCase):
+    """Test ArchiveReader class."""
+
+    def test_items(self):
+        """Test items are decoded across tiny read chunks."""
+        items = [{'type': 'Note', 'content': f'Olá {n} ✓'} for n in range(50)]
+        archive = json.dumps(
+            {'type': 'OrderedCollection', 'orderedItems': items}, ensure_ascii=False
+        )
+        reader = ArchiveReader(BytesIO(archive.encode()), chunk_size=7)
+        self.assertEqual(list(reader), items)
+        self.assertIsNone(reader.document)
+
+    def test_large_item(self):
+        """Test an item spanning many chunks is decoded a logarithmic number of times."""
+        items = [{'type': 'Note', 'content': 'x' * 100000}, {'type': 'Note'}]
+        archive = json.dumps({'orderedItems': items}).encode()
+        reader = ArchiveReader(BytesIO(archive), chunk_size=64)
+        reader.decoder = mock.Mock(wraps=reader.decoder)
+        self.assertEqual(list(reader), items)
+        self.assertLess(reader.decoder.raw_decode.call_count, 20)
+
+    def test_paged_document(self):
+        """Test documents without inline items are kept for page walking."""
+        reader = ArchiveReader(BytesIO(b'{"type": "OrderedCollection", "first": "/p"}'))
+        self.assertEqual(list(reader), [])
+        self.assertEqual(reader.document['first'], '/p')
+
+    def test_truncated(self):
+        """Test truncated archives are reported."""
+        reader = ArchiveReader(BytesIO(b'{"orderedItems": [{"type": "No'))
+        with self.assertRaises(ArchiveError):
+            list(reader)
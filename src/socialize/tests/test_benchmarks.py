@@ -0,0 +1,56 @@
+"""Test the benchmark generator and scenarios."""
+
+from socialize.benchmarks import BenchmarkSuite, SocialGraphGenerator
+from socialize.models import Actor, Activity, Object
+from django.core.management import call_command
+from django.test import TestCase
+from io import StringIO
+import json
+import django
+
+django.setup()
+
+
+class BenchmarkTest(TestCase):
+    """Test SocialGraphGenerator and BenchmarkSuite classes."""
+
+    def test_generate(self):
+        """Test generate creates the requested graph."""
+        dataset = SocialGraphGenerator(actors=5, objects=10, activities=30).generate()
+        self.assertEqual(Actor.objects.count(), 5)
+        self.assertEqual(Object.objects.count(), 10)
+        self.assertEqual(Activity.objects.count(), 30)
+        self.assertEqual(len(dataset['usernames']), 5)
+
+    def test_run(self):
+        """Test run reports percentiles and query counts for every scenario."""
+        dataset = SocialGraphGenerator(actors=3, objects=5, activities=20).generate()
+        report = BenchmarkSuite(dataset).run(iterations=2)
+        self.assertEqual(
+            set(report['scenarios']),
+            {
+                'webfinger',
+                'actor',
+                'outbox_paging',
+                'inbox_signed_post',
+                'actor_creation',
+            },
+        )
+        for result in report['scenarios'].values():
+            self.assertLessEqual(result['p50_ms'], result['max_ms'])
+            self.assertGreater(result['queries_per_iteration'], 0)
+
+    def test_command(self):
+        """Test run_benchmarks prints a JSON report and rolls back its data."""
+        stdout = StringIO()
+        call_command(
+            'run_benchmarks',
+            actors=2,
+            objects=2,
+            activities=4,
+            iterations=1,
+            scenarios=['actor'],
+            stdout=stdout,
+        )
+        self.assertIn('actor', json.loads(stdout.getvalue())['scenarios'])
+        self.assertFalse(Actor.objects.exists())
@@ -0,0 +1,49 @@
+"""Test CounterBuffer class."""
+
+from socialize.counters import CounterBuffer
+from socialize.models import Actor, Object
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+import django
+
+django.setup()
+
+
+class CounterBufferTest(TestCase):
+    """Test CounterBuffer class."""
+
+    def setUp(self):
+        self.actor = Actor.objects.create(
+            user=User.objects.create_user(username='testuser', password='password')
+        )
+        self.obj = Object.objects.create(actor=self.actor, content='Hello')
+
+    def test_flush_coalesces(self):
+        """Test increments to the same row are written in a single update."""
+        buffer = CounterBuffer(max_size=100, interval=60)
+        for _ in range(50):
+            buffer.add(Object, self.obj.id, 'likes_count')
+        buffer.add(Object, self.obj.id, 'shares_count', 2)
+        buffer.add(Actor, self.actor.id, 'score', 3)
+        self.assertEqual(len(buffer.pending()), 3)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(buffer.flush(), 2)
+        updates = [q for q in queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 2)
+        self.obj.refresh_from_db()
+        self.actor.refresh_from_db()
+        self.assertEqual((self.obj.likes_count, self.obj.shares_count), (50, 2))
+        self.assertEqual(self.actor.score, 3)
+        self.assertEqual(buffer.pending(), {})
+
+    def test_flush_when_full(self):
+        """Test the buffer flushes itself once it holds max_size rows."""
+        buffer = CounterBuffer(max_size=2, interval=60)
+        buffer.add(Object, self.obj.id, 'likes_count')
+        buffer.add(Actor, self.actor.id, 'score')
+        self.assertEqual(buffer.pending(), {})
+        self.obj.refresh_from_db()
+        self.assertEqual(self.obj.likes_count, 1)
@@ -0,0 +1,43 @@
+"""Test HTTP Signature helpers."""
+
+from socialize import httpsig
+from django.test import SimpleTestCase, RequestFactory
+import django
+
+django.setup()
+
+
+class HttpSignatureTest(SimpleTestCase):
+    """Test the httpsig module."""
+
+    def test_digest_matches(self):
+        """Test Digest headers are matched on their SHA-256 entry."""
+        value = httpsig.digest(b'payload').partition('=')[2]
+        self.assertTrue(httpsig.digest_matches(f'sha-256={value}', b'payload'))
+        self.assertTrue(httpsig.digest_matches(f'MD5=xyz, SHA-256={value}', b'payload'))
+        self.assertFalse(httpsig.digest_matches(f'SHA-256={value}', b'other'))
+
+    def test_prepare_request_stale_date(self):
+        """Test signatures with an old Date are rejected."""
+        request = RequestFactory().get(
+            '/',
+            headers={
+                'Date': 'Sun, 06 Nov 1994 08:49:37 GMT',
+                'Signature': 'keyId="/actors/x#main-key",headers="date",'
+                'signature="c2ln"',
+            },
+        )
+        with self.assertRaises(httpsig.SignatureError):
+            httpsig.prepare_request(request)
+
+    def test_parse_signature(self):
+        """Test Signature headers are parsed into their parameters."""
+        params = httpsig.parse_signature(
+            'keyId="https://a.example/u#k",algorithm="rsa-sha256",'
+            'headers="(request-target) Host date",signature="c2ln"'
+        )
+        self.assertEqual(params['keyId'], 'https://a.example/u#k')
+        self.assertEqual(params['headers'], ['(request-target)', 'host', 'date'])
+        self.assertEqual(params['signature'], b'sig')
+        with self.assertRaises(httpsig.SignatureError):
+            httpsig.parse_signature('keyId="k"')
@@ -0,0 +1,61 @@
+"""Test that the hot queries are served by their composite indexes."""
+
+from socialize.models import Actor, Activity, Object
+from socialize.pagination import CursorPaginator
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, RequestFactory
+import django
+
+django.setup()
+
+
+class QueryPlanTest(TestCase):
+    """Test the query plans of the outbox and activity type queries."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.factory = RequestFactory()
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.actor = Actor.objects.create(user=self.user)
+        for index in range(3):
+            Activity.objects.create(
+                actor=self.actor, object_data={'n': index}, activity_type='Create'
+            )
+        if connection.vendor == 'postgresql':
+            # Tiny test tables would otherwise always be scanned sequentially.
+            with connection.cursor() as cursor:
+                cursor.execute('SET enable_seqscan = off')
+        elif connection.vendor != 'sqlite':
+            self.skipTest('Query plans are only asserted on SQLite and PostgreSQL.')
+
+    def assertUsesIndex(self, queryset, index_name):  # pylint: disable=invalid-name
+        """Asserts the plan of the queryset reads the given index."""
+        plan = queryset.explain()
+        self.assertIn(index_name, plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_outbox_page(self):
+        """Test outbox pages are range scans on (actor, published_at, id)."""
+        activities = Activity.objects.filter(actor=self.actor)
+        paginator = CursorPaginator(activities, lambda activity: activity.object_data)
+        first = next(iter(activities.order_by('-published_at', '-id')))
+        request = self.factory.get(
+            '/outbox/', {'page': 'true', 'max_id': paginator.cursor(first)}
+        )
+        queryset, _ = paginator.page_query(request)
+        self.assertUsesIndex(queryset, 'activity_actor_published_idx')
+
+    def test_activity_type(self):
+        """Test activity type filtering reads the (type, published_at) index."""
+        queryset = Activity.objects.filter(activity_type='Follow').order_by(
+            'published_at'
+        )
+        self.assertUsesIndex(queryset, 'activity_type_published_idx')
+
+    def test_actor_objects(self):
+        """Test listing an actor's objects reads the (actor, published_at) index."""
+        queryset = Object.objects.filter(actor=self.actor).order_by(
+            '-published_at', '-id'
+        )
+        self.assertUsesIndex(queryset, 'object_actor_published_idx')
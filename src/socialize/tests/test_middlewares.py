@@ -0,0 +1,312 @@
+"""Test middleware classes."""
+
+from socialize.middlewares import (
+    ActivityPubSigningMiddleware,
+    BearerTokenMiddleware,
+    InstrumentationMiddleware,
+)
+from socialize.metrics import registry
+from socialize.views import MetricsView
+from socialize.services import ActivityService, ActorService
+from socialize.models import Actor, InboxItem, Token, Vault
+from socialize import httpsig, keys, tokens
+from cryptography.hazmat.primitives import serialization
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.management import call_command
+from django.http import JsonResponse
+from django.test import TestCase, RequestFactory
+from django.urls import resolve
+from django.utils.timezone import now
+from unittest.mock import patch
+import datetime
+import io
+import json
+import django
+
+django.setup()
+
+
+class ActivityPubSigningMiddlewareTest(TestCase):
+    """Test ActivityPubSigningMiddleware class."""
+
+    def setUp(self):
+        """Set up test data."""
+        keys.public_keys.clear()
+        keys.private_keys.clear()
+        httpsig.verified_signatures.clear()
+        self.factory = RequestFactory()
+        self.middleware = ActivityPubSigningMiddleware(
+            lambda request: JsonResponse({'status': 'ok'})
+        )
+        self.private_pem, self.public_pem = ActorService().generate_keys()
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.actor = Actor.objects.create(user=self.user, public_key=self.public_pem)
+
+    def signed_request(self, body, private_pem=None, key_id=None):
+        """Builds an inbox POST whose headers are signed with the given key."""
+        private_key = serialization.load_pem_private_key(
+            (private_pem or self.private_pem).encode(), password=None
+        )
+        headers = httpsig.signed_headers(
+            private_key,
+            key_id or httpsig.get_key_id(self.actor.id),
+            'POST',
+            'http://testserver/users/testuser/inbox/',
+            httpsig.digest(body.encode()),
+        )
+        return self.factory.post(
+            '/users/testuser/inbox/',
+            data=body,
+            content_type='application/json',
+            headers=headers,
+        )
+
+    def test_verify_request(self):
+        """Test verify_request accepts a valid signature."""
+        body = json.dumps({'type': 'Follow'})
+        request = self.signed_request(body)
+        self.assertTrue(self.middleware.verify_request(request))
+        self.assertEqual(request.signature_key_id, httpsig.get_key_id(self.actor.id))
+
+    async def test_averify_request(self):
+        """Test averify_request accepts a valid signature."""
+        body = json.dumps({'type': 'Follow'})
+        self.assertTrue(
+            await self.middleware.averify_request(self.signed_request(body))
+        )
+
+    def test_verify_request_invalid_signature(self):
+        """Test verify_request rejects a signature from another key."""
+        other_private_pem, _ = ActorService().generate_keys()
+        request = self.signed_request('{}', private_pem=other_private_pem)
+        self.assertFalse(self.middleware.verify_request(request))
+
+    def test_verify_request_tampered_body(self):
+        """Test verify_request rejects bodies not matching the signed digest."""
+        request = self.signed_request('{"type": "Follow"}')
+        request._body = b'{"type": "Block"}'  # pylint: disable=protected-access
+        self.assertFalse(self.middleware.verify_request(request))
+
+    def test_verify_request_unknown_actor(self):
+        """Test verify_request rejects signatures from unknown actors."""
+        request = self.signed_request(
+            '{}', key_id=httpsig.get_key_id('00000000-0000-0000-0000-000000000000')
+        )
+        self.assertFalse(self.middleware.verify_request(request))
+
+    def test_verify_request_ed25519(self):
+        """Test Ed25519 actors are verified alongside RSA ones."""
+        private_pem, public_pem = ActorService().generate_keys('ed25519')
+        self.actor.public_key = public_pem
+        self.actor.save()
+        request = self.signed_request('{}', private_pem=private_pem)
+        self.assertIn('algorithm="ed25519"', request.headers['Signature'])
+        self.assertTrue(self.middleware.verify_request(request))
+
+        httpsig.verified_signatures.clear()
+        request.META['HTTP_SIGNATURE'] = request.headers['Signature'].replace(
+            'ed25519', 'rsa-sha256'
+        )
+        self.assertFalse(self.middleware.verify_request(request))
+
+    def test_verified_signature_cache(self):
+        """Test retried deliveries are accepted from the verified signatures."""
+        body = json.dumps({'type': 'Like'})
+        request = self.signed_request(body)
+        self.assertTrue(self.middleware.verify_request(request))
+        with patch('socialize.keys.load_key_by_id') as load_key_by_id:
+            self.assertTrue(self.middleware.verify_request(request))
+            load_key_by_id.assert_not_called()
+
+    def test_public_key_cache(self):
+        """Test parsed public keys are cached and evicted when the actor changes."""
+        body = json.dumps({'type': 'Like'})
+        self.middleware.verify_request(self.signed_request(body))
+        httpsig.verified_signatures.clear()
+        with self.assertNumQueries(1):
+            self.assertTrue(self.middleware.verify_request(self.signed_request(body)))
+        self.assertEqual(keys.public_keys.stats()['hits'], 1)
+
+        private_pem, public_pem = ActorService().generate_keys()
+        self.actor.public_key = public_pem
+        self.actor.save()
+        self.assertEqual(len(keys.public_keys), 0)
+        request = self.signed_request(body, private_pem=private_pem)
+        self.assertTrue(self.middleware.verify_request(request))
+
+    def test_public_key_rotation(self):
+        """Test keys rotated without signals, by another process, are used at once."""
+        body = json.dumps({'type': 'Like'})
+        self.assertTrue(self.middleware.verify_request(self.signed_request(body)))
+        private_pem, public_pem = ActorService().generate_keys()
+        Actor.objects.filter(id=self.actor.id).update(public_key=public_pem)
+        self.assertEqual(len(keys.public_keys), 1)
+        request = self.signed_request(body, private_pem=private_pem)
+        self.assertTrue(self.middleware.verify_request(request))
+        self.assertFalse(self.middleware.verify_request(self.signed_request('{}')))
+
+    def test_sign_response(self):
+        """Test sign_response signs the digest and caches the vault key."""
+        vault = Vault.objects.create(actor=self.actor, private_key=self.private_pem)
+        request = self.factory.post('/users/testuser/inbox/')
+        request.user = self.user
+        response = JsonResponse({'status': 'ok'})
+        self.middleware.sign_response(request, response)
+        self.assertEqual(response['Digest'], httpsig.digest(response.content))
+        params = httpsig.parse_signature(response['Signature'])
+        string = f'date: {response["Date"]}\ndigest: {response["Digest"]}'
+        public_key = serialization.load_pem_public_key(self.public_pem.encode())
+        self.assertTrue(httpsig.verify(public_key, params, string))
+        with self.assertNumQueries(1):
+            self.middleware.sign_response(request, JsonResponse({}))
+        self.assertEqual(keys.private_keys.stats()['hits'], 1)
+
+        private_pem, _ = ActorService().generate_keys()
+        vault.private_key = private_pem
+        vault.save()
+        self.assertEqual(len(keys.private_keys), 0)
+
+    def test_policy_unsigned_inbox(self):
+        """Test unsigned deliveries to routes requiring signatures are rejected."""
+        request = self.factory.post(
+            '/users/testuser/inbox/', data='{}', content_type='application/json'
+        )
+        self.assertEqual(self.middleware(request).status_code, 400)
+
+    def test_policy_signed_inbox(self):
+        """Test signed inbox deliveries get responses signed by the inbox owner."""
+        Vault.objects.create(actor=self.actor, private_key=self.private_pem)
+        request = self.signed_request(json.dumps({'type': 'Follow'}))
+        request.user = AnonymousUser()
+        response = self.middleware(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Signature', response)
+
+    def test_signer_is_not_actor(self):
+        """Test a Delete signed by one actor on behalf of another is refused."""
+        victim = Actor.objects.create(user=User.objects.create_user(username='b'))
+        middleware = ActivityPubSigningMiddleware(
+            lambda request: ActivityService().create_activity(request, 'testuser')
+        )
+        for actor, status in ((victim, 403), (self.actor, 202)):
+            body = json.dumps(
+                {
+                    'type': 'Delete',
+                    'actor': actor.get_actor_url(),
+                    'object': 'https://localhost/objects/1',
+                }
+            )
+            request = self.signed_request(body)
+            request.user = AnonymousUser()
+            self.assertEqual(middleware(request).status_code, status)
+        self.assertEqual(InboxItem.objects.count(), 1)
+
+    def test_policy_skips_other_routes(self):
+        """Test writes to routes without a policy skip the cryptography."""
+        request = self.factory.post(
+            '/objects/', data='{}', content_type='application/json'
+        )
+        with patch.object(self.middleware, 'verify_request') as verify:
+            response = self.middleware(request)
+        verify.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Signature', response)
+
+
+class InstrumentationMiddlewareTest(TestCase):
+    """Test InstrumentationMiddleware class."""
+
+    def setUp(self):
+        """Set up test data."""
+        registry.clear()
+        self.factory = RequestFactory()
+        self.user = User.objects.create_user(username='testuser', password='password')
+        Actor.objects.create(user=self.user)
+
+    def test_server_timing(self):
+        """Test requests report their phases and feed the route histograms."""
+        request = self.factory.get('/users/testuser/')
+        request.resolver_match = resolve('/users/testuser/')
+        middleware = InstrumentationMiddleware(
+            lambda request: ActorService().get_actor(request, 'testuser')
+        )
+        response = middleware(request)
+        self.assertIn('sql;dur=', response['Server-Timing'])
+        self.assertIn('desc="2 queries"', response['Server-Timing'])
+        self.assertIn('serialize;dur=', response['Server-Timing'])
+
+        metrics = MetricsView.as_view()(self.factory.get('/metrics/'))
+        self.assertIn(
+            'socialize_request_queries_total{route="actor"} 2',
+            metrics.content.decode(),
+        )
+
+    async def test_async_server_timing(self):
+        """Test queries run by the async ORM are charged to the request too."""
+        request = self.factory.get('/users/testuser/')
+        request.resolver_match = resolve('/users/testuser/')
+
+        async def get_response(request):
+            return await ActorService().aget_actor(request, 'testuser')
+
+        response = await InstrumentationMiddleware(get_response)(request)
+        self.assertIn('desc="2 queries"', response['Server-Timing'])
+
+
+class BearerTokenMiddlewareTest(TestCase):
+    """Test BearerTokenMiddleware class."""
+
+    def setUp(self):
+        """Set up test data."""
+        tokens.tokens.clear()
+        self.factory = RequestFactory()
+        self.middleware = BearerTokenMiddleware(
+            lambda request: JsonResponse({'user': request.user.username})
+        )
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.token = Token.objects.create(user=self.user, access_token='secret')
+
+    def get(self, token):
+        """Runs the middleware on a request carrying the given bearer token."""
+        request = self.factory.get('/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        request.user = AnonymousUser()
+        return self.middleware(request)
+
+    def test_valid_token(self):
+        """Test valid tokens authenticate the request, then hit the cache."""
+        response = self.get('secret')
+        self.assertEqual(json.loads(response.content), {'user': 'testuser'})
+        self.assertNotIn('secret', str(list(tokens.tokens._data)))
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get('secret').status_code, 200)
+
+    def test_invalid_token(self):
+        """Test unknown and expired tokens are rejected."""
+        self.assertEqual(self.get('unknown').status_code, 401)
+        Token.objects.filter(id=self.token.id).update(
+            expires_at=now() - datetime.timedelta(seconds=1)
+        )
+        response = self.get('secret')
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('invalid_token', response['WWW-Authenticate'])
+
+    def test_refresh_evicts(self):
+        """Test refreshing a token invalidates its cached lookup."""
+        self.assertEqual(self.get('secret').status_code, 200)
+        self.token.refresh()
+        self.assertEqual(self.get('secret').status_code, 401)
+        self.assertEqual(self.get(self.token.access_token).status_code, 200)
+
+    def test_purge_tokens(self):
+        """Test purge_tokens deletes expired tokens in chunks."""
+        expired = now() - datetime.timedelta(hours=1)
+        for index in range(5):
+            Token.objects.create(
+                user=self.user, access_token=f'old-{index}', expires_at=expired
+            )
+        out = io.StringIO()
+        call_command('purge_tokens', chunk_size=2, stdout=out)
+        self.assertIn('Purged 5 expired tokens.', out.getvalue())
+        self.assertEqual(
+            list(Token.objects.values_list('access_token', flat=True)), ['secret']
+        )
@@ -0,0 +1,159 @@
+"""Test RemoteActorResolver class."""
+
+from socialize.resolvers import RemoteActorResolver, is_public_host
+from socialize.middlewares import ActivityPubSigningMiddleware
+from socialize.models import RemoteActor
+from socialize.services import ActorService
+from socialize import httpsig
+from cryptography.hazmat.primitives import serialization
+from django.http import JsonResponse
+from django.test import TestCase, RequestFactory, override_settings
+from django.utils.timezone import now
+from unittest.mock import patch
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import datetime
+import json
+import threading
+import django
+
+django.setup()
+
+
+class StubActorHandler(BaseHTTPRequestHandler):
+    """Serves the actor documents of a stand-in remote server."""
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Answers with the document stored for the path, or 404."""
+        self.server.requests.append(self.path)
+        document = self.server.documents.get(self.path)
+        body = json.dumps(document).encode() if document else b''
+        self.send_response(200 if document else 404)
+        self.send_header('Content-Type', 'application/activity+json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_):
+        """Silences the request log."""
+
+
+class StubActorServer(ThreadingHTTPServer):
+    """Local stand-in for a remote ActivityPub server."""
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), StubActorHandler)
+        self.documents = {}
+        self.requests = []
+        self.url = f'http://127.0.0.1:{self.server_address[1]}'
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    def add_actor(self, path, public_pem=''):
+        """Publishes an actor document at the given path, returning its IRI."""
+        iri = f'{self.url}{path}'
+        self.documents[path] = {
+            'id': iri,
+            'type': 'Person',
+            'publicKey': {'id': f'{iri}#main-key', 'publicKeyPem': public_pem},
+        }
+        return iri
+
+
+class InlineExecutor:
+    """Runs background refreshes immediately, within the test transaction."""
+
+    def submit(self, fn, *args):
+        """Calls the function right away."""
+        fn(*args)
+
+
+@override_settings(SOCIALIZE_REMOTE_ACTOR_INSECURE=True)
+class RemoteActorResolverTest(TestCase):
+    """Test RemoteActorResolver class."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.server = StubActorServer()
+        self.resolver = RemoteActorResolver(executor=InlineExecutor())
+
+    def tearDown(self):
+        """Stop the stub server."""
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_resolve(self):
+        """Test actors are fetched once, then served from the cache."""
+        iri = self.server.add_actor('/users/alice')
+        remote = self.resolver.resolve(f'{iri}#main-key')
+        self.assertEqual(remote.key_id, f'{iri}#main-key')
+        self.resolver.resolve(iri)
+        self.resolver.memory.clear()
+        self.resolver.resolve(iri)
+        self.assertEqual(len(self.server.requests), 1)
+
+    async def test_aresolve(self):
+        """Test actors resolve from async code, sharing the cache of resolve."""
+        iri = self.server.add_actor('/users/alice')
+        remote = await self.resolver.aresolve(f'{iri}#main-key')
+        self.assertEqual(remote.iri, iri)
+        self.assertEqual((await self.resolver.aresolve(iri)).iri, iri)
+        self.assertIsNone(await self.resolver.aresolve('file:///etc/passwd'))
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_stale_while_revalidate(self):
+        """Test stale documents are served while they are refetched."""
+        iri = self.server.add_actor('/users/alice')
+        self.resolver.resolve(iri)
+        stale = now() - datetime.timedelta(seconds=self.resolver.ttl + 1)
+        RemoteActor.objects.filter(iri=iri).update(fetched_at=stale, checked_at=stale)
+        self.resolver.memory.clear()
+
+        del self.server.documents['/users/alice']
+        self.assertIsNotNone(self.resolver.resolve(iri))
+        self.assertEqual(len(self.server.requests), 2)
+        # The failed refresh is not retried before the retry delay.
+        self.assertIsNotNone(self.resolver.resolve(iri))
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_negative_cache(self):
+        """Test unreachable actors are not refetched on every call."""
+        iri = f'{self.server.url}/users/nobody'
+        self.assertIsNone(self.resolver.resolve(iri))
+        self.assertIsNone(self.resolver.resolve(iri))
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertFalse(RemoteActor.objects.exists())
+        self.assertIsNone(self.resolver.resolve('file:///etc/passwd'))
+
+    def test_internal_addresses(self):
+        """Test only https IRIs of public hosts are fetched by default."""
+        with override_settings(SOCIALIZE_REMOTE_ACTOR_INSECURE=False):
+            resolver = RemoteActorResolver(executor=InlineExecutor())
+        iri = self.server.add_actor('/users/alice')
+        self.assertIsNone(resolver.resolve(iri))
+        self.assertIsNone(resolver.resolve(iri.replace('http:', 'https:')))
+        self.assertEqual(self.server.requests, [])
+        self.assertFalse(RemoteActor.objects.exists())
+        for host in ('127.0.0.1', '10.0.0.1', '169.254.169.254', '::1'):
+            self.assertFalse(is_public_host(host))
+        self.assertTrue(is_public_host('93.184.216.34'))
+
+    def test_verify_remote_signature(self):
+        """Test requests signed by remote actors are verified with their key."""
+        private_pem, public_pem = ActorService().generate_keys()
+        iri = self.server.add_actor('/users/alice', public_pem)
+        private_key = serialization.load_pem_private_key(
+            private_pem.encode(), password=None
+        )
+        body = json.dumps({'type': 'Follow'}).encode()
+        headers = httpsig.signed_headers(
+            private_key,
+            f'{iri}#main-key',
+            'POST',
+            'http://testserver/inbox',
+            httpsig.digest(body),
+        )
+        request = RequestFactory().post(
+            '/inbox', data=body, content_type='application/json', headers=headers
+        )
+        middleware = ActivityPubSigningMiddleware(lambda r: JsonResponse({}))
+        with patch('socialize.keys.resolver', self.resolver):
+            self.assertTrue(middleware.verify_request(request))
@@ -0,0 +1,70 @@
+"""Test JSON renderers and responses."""
+
+from socialize.renderers import OrjsonRenderer, StdlibJSONRenderer, orjson
+from socialize.responses import JsonResponse, StreamingJsonResponse
+from decimal import Decimal
+from django.test import SimpleTestCase
+from unittest import skipUnless
+import datetime
+import json
+import uuid
+import django
+
+django.setup()
+
+
+class RendererTest(SimpleTestCase):
+    """Test StdlibJSONRenderer and OrjsonRenderer classes."""
+
+    @skipUnless(orjson, 'orjson is not installed.')
+    def test_renderers_agree(self):
+        """Test every renderer encodes the same data to the same JSON."""
+        data = {
+            'id': uuid.uuid4(),
+            'n': 1,
+            'price': Decimal('1.5'),
+            'tags': ['a'],
+            'at': datetime.datetime(
+                2025, 1, 1, 10, 0, 0, 123456, tzinfo=datetime.timezone.utc
+            ),
+            'day': datetime.date(2025, 1, 1),
+            'time': datetime.time(10, 0, 0, 123456),
+        }
+        expected = json.loads(StdlibJSONRenderer().dumps(data))
+        self.assertEqual(json.loads(OrjsonRenderer().dumps(data)), expected)
+        self.assertEqual(expected['at'], '2025-01-01T10:00:00.123Z')
+
+    def test_json_response(self):
+        """Test JsonResponse renders dicts and rejects other values by default."""
+        now = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+        response = JsonResponse({'at': now}, status=201)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(json.loads(response.content)['at'], '2025-01-01T00:00:00Z')
+        with self.assertRaises(TypeError):
+            JsonResponse([1, 2])
+
+
+class StreamingJsonResponseTest(SimpleTestCase):
+    """Test StreamingJsonResponse class."""
+
+    def test_stream(self):
+        """Test items are encoded incrementally into valid JSON."""
+        response = StreamingJsonResponse(
+            {'type': 'OrderedCollection'},
+            'orderedItems',
+            ({'n': n} for n in range(1000)),
+            buffer_size=1024,
+        )
+        chunks = list(response.streaming_content)
+        self.assertGreater(len(chunks), 1)
+        document = json.loads(b''.join(chunks))
+        self.assertEqual(document['type'], 'OrderedCollection')
+        self.assertEqual(len(document['orderedItems']), 1000)
+
+    def test_empty_stream(self):
+        """Test an empty collection streams as an empty list."""
+        response = StreamingJsonResponse({}, 'items', iter(()))
+        self.assertEqual(
+            json.loads(b''.join(response.streaming_content)), {'items': []}
+        )
@@ -0,0 +1,59 @@
+"""Test projection-based serializers."""
+
+from socialize.serializers import (
+    ActorSerializer,
+    ObjectSerializer,
+    ProjectionSerializer,
+)
+from socialize.models import Actor, Object
+from django.contrib.auth.models import User
+from django.test import TestCase
+import django
+
+django.setup()
+
+
+class SerializerTest(TestCase):
+    """Test ActorSerializer and ObjectSerializer classes."""
+
+    def setUp(self):
+        """Set up test data."""
+        for index in range(20):
+            user = User.objects.create_user(
+                username=f'user{index}', first_name='Test' if index % 2 else ''
+            )
+            actor = Actor.objects.create(user=user, bio=f'Bio {index}')
+            Object.objects.create(actor=actor, content=f'Content {index}')
+
+    def test_actors(self):
+        """Test actors serialize in one query, like their models do."""
+        with self.assertNumQueries(1):
+            documents = list(ActorSerializer().iterator(Actor.objects.order_by('id')))
+        expected = [
+            actor.as_activitypub()
+            for actor in Actor.objects.select_related('user').order_by('id')
+        ]
+        self.assertEqual(documents, expected)
+
+    def test_objects(self):
+        """Test objects serialize in one query, like their models do."""
+        with self.assertNumQueries(1):
+            documents = list(ObjectSerializer().iterator(Object.objects.order_by('id')))
+        with self.assertNumQueries(1):
+            expected = [obj.as_activitypub() for obj in Object.objects.order_by('id')]
+        self.assertEqual(documents, expected)
+
+    def test_first(self):
+        """Test single documents are read from projected rows or instances."""
+        actor = Actor.objects.select_related('user').order_by('id').first()
+        serializer = ActorSerializer()
+        with self.assertNumQueries(1):
+            document = serializer.first(Actor.objects.filter(id=actor.id))
+        self.assertEqual(document, actor.as_activitypub())
+        self.assertEqual(serializer.serialize(serializer.row(actor)), document)
+        self.assertIsNone(serializer.first(Actor.objects.none()))
+
+    def test_abstract(self):
+        """Test the base serializer cannot be used without serialize."""
+        with self.assertRaises(TypeError):
+            ProjectionSerializer()
@@ -6,17 +6,82 @@ from socialize.services import (
     ObjectService,
     VaultService,
     AuthenticationService,
+    KeyPoolService,
+    InboxService,
+    DeliveryService,
+    ArchiveService,
+    TimelineService,
+    FollowService,
+    OutboxService,
 )
-from socialize.models import Actor, Activity, Object, Vault
-from django.contrib.auth.models import User
-from django.test import TestCase, RequestFactory
-from unittest.mock import patch, MagicMock
+from socialize.models import (
+    Actor,
+    Activity,
+    Object,
+    Vault,
+    KeyPair,
+    InboxItem,
+    OutboxItem,
+    Delivery,
+    TimelineEntry,
+    FollowEdge,
+    PendingRecipient,
+    RemoteActor,
+)
+from socialize import httpsig, keys
+from socialize.sessions import AsyncClientPool
+from socialize.counters import counters
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.exceptions import PermissionDenied
+from django.db import DatabaseError
+from django.test import TestCase, RequestFactory, override_settings
+from django.utils.timezone import now
+from unittest.mock import patch, AsyncMock, MagicMock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from urllib.parse import urldefrag, urlsplit
+from datetime import timedelta
+import asyncio
+import gzip
 import json
+import threading
+import time
 import django
 
 django.setup()
 
 
+class StubInboxHandler(BaseHTTPRequestHandler):
+    """Records the deliveries posted to a stand-in remote server."""
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """Stores the request and answers with the configured status."""
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        self.server.received.append((self.path, dict(self.headers), body))
+        self.send_response(self.server.status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *_):
+        """Silences the request log."""
+
+
+class StubServer(ThreadingHTTPServer):
+    """Local stand-in for a remote ActivityPub server."""
+
+    def __init__(self, status=202):
+        super().__init__(('127.0.0.1', 0), StubInboxHandler)
+        self.status = status
+        self.received = []
+        self.url = f'http://127.0.0.1:{self.server_address[1]}'
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    def stop(self):
+        """Stops serving and releases the socket."""
+        self.shutdown()
+        self.server_close()
+
+
 class ActorServiceTest(TestCase):
     """Test ActorService class."""
 
@@ -33,6 +98,53 @@ class ActorServiceTest(TestCase):
         response = self.actor_service.get_actor(request, 'testuser')
         self.assertEqual(response.status_code, 200)
 
+    def test_get_actor_by_id(self):
+        """Test actor documents are served at their absolute id and key id."""
+        key_id = httpsig.get_key_id(self.actor.id)
+        self.assertTrue(key_id.startswith('https://localhost/actors/'))
+        response = self.client.get(urlsplit(key_id).path)
+        document = json.loads(response.content)
+        self.assertEqual(document['id'], urldefrag(key_id).url)
+        self.assertEqual(document['publicKey']['id'], key_id)
+        self.assertEqual(document['publicKey']['owner'], document['id'])
+
+    def test_get_actor_not_modified(self):
+        """Test get_actor answers conditional requests without a body."""
+        response = self.actor_service.get_actor(
+            self.factory.get('/actor/testuser'), 'testuser'
+        )
+        request = self.factory.get(
+            '/actor/testuser', HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        with self.assertNumQueries(1):
+            not_modified = self.actor_service.get_actor(request, 'testuser')
+        self.assertEqual(not_modified.status_code, 304)
+
+        self.user.first_name = 'Test'
+        self.user.save()
+        response = self.actor_service.get_actor(request, 'testuser')
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(SITE_DOMAIN='example.com')
+    def test_get_webfinger(self):
+        """Test get_webfinger honours If-Modified-Since."""
+        request = self.factory.get(
+            '/.well-known/webfinger', {'resource': 'acct:testuser@example.com'}
+        )
+        response = self.actor_service.get_webfinger(request)
+        self.assertEqual(
+            json.loads(response.content)['subject'], request.GET['resource']
+        )
+        request.META['HTTP_IF_MODIFIED_SINCE'] = response['Last-Modified']
+        self.assertEqual(self.actor_service.get_webfinger(request).status_code, 304)
+
+    async def test_aget_actor(self):
+        """Test aget_actor method."""
+        request = self.factory.get('/actor/testuser')
+        response = await self.actor_service.aget_actor(request, 'testuser')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)['name'], 'testuser')
+
     def test_create_actor(self):
         """Test create_actor method."""
         data = {'username': 'newuser'}
@@ -56,16 +168,87 @@ class ActivityServiceTest(TestCase):
         self.activity_service = ActivityService()
         self.user = User.objects.create_user(username='testuser', password='password')
         self.actor = Actor.objects.create(user=self.user)
+        InboxService.recent.clear()
 
-    def test_create_activity(self):
-        """Test create_activity method."""
+    def delivery(self, data, signer=None):
+        """Builds an inbox POST as verified by the signing middleware."""
+        signer = signer or self.actor
         request = self.factory.post(
             '/inbox/testuser',
-            data=json.dumps({'type': 'Create', 'object': 'TestObject'}),
+            data=json.dumps({'actor': self.actor.get_actor_url(), **data}),
             content_type='application/json',
         )
+        request.signature_key_id = httpsig.get_key_id(signer.id)
+        return request
+
+    def test_create_activity(self):
+        """Test create_activity method."""
+        request = self.delivery({'type': 'Create', 'object': 'TestObject'})
+        response = self.activity_service.create_activity(request, 'testuser')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(InboxItem.objects.count(), 1)
+        self.assertFalse(Activity.objects.exists())
+
+    def test_create_activity_replay(self):
+        """Test replayed deliveries are acknowledged without being queued."""
+        for _ in range(3):
+            request = self.delivery(
+                {'id': 'https://localhost/activities/1', 'type': 'Create'}
+            )
+            response = self.activity_service.create_activity(request, 'testuser')
+            self.assertEqual(response.status_code, 202)
+        self.assertEqual(InboxItem.objects.count(), 1)
+
+    def test_create_activity_foreign_iri(self):
+        """Test IRIs of other hosts than the signer's are not used for replays."""
+        for _ in range(2):
+            request = self.delivery(
+                {'id': 'https://remote.example/activities/1', 'type': 'Create'}
+            )
+            self.activity_service.create_activity(request, 'testuser')
+        self.assertEqual(InboxItem.objects.filter(iri__isnull=True).count(), 2)
+
+    def test_create_activity_retry_after_error(self):
+        """Test a delivery failing to be queued is queued by its retry."""
+        data = {'id': 'https://localhost/activities/1', 'type': 'Create'}
+        failing = patch.object(InboxService, 'enqueue', side_effect=DatabaseError)
+        with failing, self.assertRaises(DatabaseError):
+            self.activity_service.create_activity(self.delivery(data), 'testuser')
+        response = self.activity_service.create_activity(
+            self.delivery(data), 'testuser'
+        )
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(InboxItem.objects.count(), 1)
+
+    def test_create_activity_signer(self):
+        """Test deliveries signed by another actor than theirs are refused."""
+        other = Actor.objects.create(user=User.objects.create_user(username='other'))
+        request = self.delivery({'type': 'Delete', 'object': '/o/1'}, signer=other)
+        response = self.activity_service.create_activity(request, 'testuser')
+        self.assertEqual(response.status_code, 403)
+        request = self.delivery({'type': 'Delete', 'object': '/o/1'})
+        del request.signature_key_id
         response = self.activity_service.create_activity(request, 'testuser')
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(InboxItem.objects.exists())
+
+    async def test_acreate_activity(self):
+        """Test acreate_activity method."""
+        request = self.delivery({'type': 'Create', 'object': 'TestObject'})
+        response = await self.activity_service.acreate_activity(request, 'testuser')
         self.assertEqual(response.status_code, 202)
+        self.assertEqual(await InboxItem.objects.acount(), 1)
+
+    async def test_aget_activity(self):
+        """Test aget_activity method."""
+        await Activity.objects.acreate(
+            actor=self.actor, object_data={'type': 'Test'}, activity_type='Create'
+        )
+        request = self.factory.get('/outbox/testuser', {'page': 'true'})
+        response = await self.activity_service.aget_activity(request, 'testuser')
+        self.assertEqual(
+            json.loads(response.content)['orderedItems'], [{'type': 'Test'}]
+        )
 
     def test_get_activity(self):
         """Test get_activity method."""
@@ -76,6 +259,612 @@ class ActivityServiceTest(TestCase):
         response = self.activity_service.get_activity(request, 'testuser')
         self.assertEqual(response.status_code, 200)
 
+    @override_settings(SOCIALIZE_PAGE_SIZE=2)
+    def test_get_activity_pages(self):
+        """Test get_activity walks the outbox through keyset cursors."""
+        for index in range(5):
+            Activity.objects.create(
+                actor=self.actor, object_data={'n': index}, activity_type='Create'
+            )
+        request = self.factory.get('/outbox/testuser')
+        collection = json.loads(
+            self.activity_service.get_activity(request, 'testuser').content
+        )
+        self.assertEqual(collection['totalItems'], 5)
+        self.assertNotIn('orderedItems', collection)
+
+        seen, url, pages = [], collection['first'], []
+        while url:
+            page = json.loads(
+                self.activity_service.get_activity(
+                    self.factory.get(url), 'testuser'
+                ).content
+            )
+            pages.append(page)
+            seen.extend(item['n'] for item in page['orderedItems'])
+            url = page.get('next')
+        self.assertEqual(seen, [4, 3, 2, 1, 0])
+        self.assertNotIn('prev', pages[0])
+
+        previous = json.loads(
+            self.activity_service.get_activity(
+                self.factory.get(pages[-1]['prev']), 'testuser'
+            ).content
+        )
+        self.assertEqual([item['n'] for item in previous['orderedItems']], [2, 1])
+
+    def test_get_activity_stream(self):
+        """Test get_activity streams the whole outbox when asked to."""
+        for index in range(3):
+            Activity.objects.create(
+                actor=self.actor, object_data={'n': index}, activity_type='Create'
+            )
+        request = self.factory.get('/outbox/testuser', {'stream': 'true'})
+        request.user = self.user
+        response = self.activity_service.get_activity(request, 'testuser')
+        self.assertTrue(response.streaming)
+        collection = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(collection['totalItems'], 3)
+        self.assertEqual([item['n'] for item in collection['orderedItems']], [2, 1, 0])
+
+    def test_get_activity_stream_owner_only(self):
+        """Test only the outbox owner may stream the whole outbox."""
+        other = User.objects.create_user(username='other', password='password')
+        for user in (AnonymousUser(), other):
+            request = self.factory.get('/outbox/testuser', {'stream': 'true'})
+            request.user = user
+            with self.assertRaises(PermissionDenied):
+                self.activity_service.get_activity(request, 'testuser')
+
+    def test_get_activity_invalid_cursor(self):
+        """Test get_activity rejects cursors it did not issue."""
+        request = self.factory.get('/outbox/testuser', {'page': 'true', 'max_id': '!'})
+        response = self.activity_service.get_activity(request, 'testuser')
+        self.assertEqual(response.status_code, 400)
+
+
+class InboxServiceTest(TestCase):
+    """Test InboxService class."""
+
+    def setUp(self):
+        self.inbox_service = InboxService()
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.actor = Actor.objects.create(user=self.user)
+
+    def test_drain(self):
+        """Test drain stores queued activities in batches."""
+        for index in range(3):
+            InboxService.enqueue('testuser', {'id': f'/a/{index}', 'type': 'Create'})
+        InboxService.enqueue('nobody', {'id': '/a/x', 'type': 'Create'})
+        self.assertEqual(self.inbox_service.drain(batch_size=2), 2)
+        self.assertEqual(self.inbox_service.drain(batch_size=2), 2)
+        self.assertEqual(self.inbox_service.drain(batch_size=2), 0)
+        self.assertEqual(Activity.objects.filter(actor=self.actor).count(), 3)
+        self.assertFalse(InboxItem.objects.exists())
+
+    def test_drain_duplicates(self):
+        """Test drain stores each activity IRI once per inbox."""
+        for _ in range(2):
+            InboxService.enqueue('testuser', {'id': '/a/1', 'type': 'Create'})
+        self.inbox_service.drain()
+        InboxService.enqueue('testuser', {'id': '/a/1', 'type': 'Create'})
+        InboxService.enqueue('testuser', {'type': 'Create'})
+        self.inbox_service.drain()
+        self.assertEqual(Activity.objects.filter(iri='/a/1').count(), 1)
+        self.assertEqual(Activity.objects.count(), 2)
+        self.assertEqual(TimelineEntry.objects.filter(owner=self.actor).count(), 2)
+
+    def test_drain_handlers(self):
+        """Test drain counts likes, boosts and replies, and reverts Undo."""
+        remote = 'https://remote.example/users/alice'
+        obj = Object.objects.create(actor=self.actor, content='Hello')
+        iri = obj.get_object_url()
+        like = {'id': '/likes/1', 'type': 'Like', 'actor': remote, 'object': iri}
+        reply = {'type': 'Note', 'inReplyTo': iri}
+        InboxService.enqueue('testuser', like)
+        InboxService.enqueue('testuser', {'type': 'Announce', 'object': iri})
+        InboxService.enqueue('testuser', {'type': 'Create', 'object': reply})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.inbox_service.drain()
+        counters.flush()
+        self.actor.refresh_from_db()
+        obj.refresh_from_db()
+        self.assertEqual(self.actor.score, 1)
+        self.assertEqual(
+            (obj.likes_count, obj.shares_count, obj.replies_count), (1, 1, 1)
+        )
+
+        InboxService.enqueue(
+            'testuser', {'type': 'Undo', 'actor': remote, 'object': like}
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.inbox_service.drain()
+        counters.flush()
+        self.assertFalse(Activity.objects.filter(activity_type='Like').exists())
+        self.actor.refresh_from_db()
+        obj.refresh_from_db()
+        self.assertEqual(self.actor.score, 0)
+        self.assertEqual(obj.likes_count, 0)
+
+    def test_drain_concurrent_duplicate(self):
+        """Test activities skipped as conflicts do not run their handlers."""
+        obj = Object.objects.create(actor=self.actor, content='Hello')
+        like = {'id': '/likes/1', 'type': 'Like', 'object': obj.get_object_url()}
+        Activity.objects.create(
+            actor=self.actor, activity_type='Like', object_data=like, iri='/likes/1'
+        )
+        InboxService.enqueue('testuser', like)
+        # As if a concurrent worker stored the row after the lookup.
+        raced = patch.object(InboxService, 'stored_iris', return_value=set())
+        with raced, self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.inbox_service.drain(), 1)
+        counters.flush()
+        obj.refresh_from_db()
+        self.assertEqual(obj.likes_count, 0)
+        self.assertEqual(Activity.objects.count(), 1)
+
+    def test_drain_handlers_absolute_iris(self):
+        """Test absolute local IRIs are counted, IRIs of other hosts are not."""
+        obj = Object.objects.create(actor=self.actor, content='Hello')
+        for host in ('localhost', 'remote.example'):
+            InboxService.enqueue(
+                'testuser',
+                {'type': 'Like', 'object': f'https://{host}/objects/{obj.id}'},
+            )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.inbox_service.drain()
+        counters.flush()
+        obj.refresh_from_db()
+        self.assertEqual(obj.likes_count, 1)
+
+    def test_dispatch_table(self):
+        """Test each service dispatches through its own read-only table."""
+        handled = []
+        service = InboxService(handlers=[('Like', handled.extend)])
+        with self.assertRaises(TypeError):
+            service.handlers['Like'] = ()
+        self.assertNotIn(handled.extend, self.inbox_service.handlers['Like'])
+        InboxService.enqueue('testuser', {'id': '/likes/1', 'type': 'Like'})
+        InboxService.enqueue('testuser', {'id': '/a/1', 'type': 'Create'})
+        service.drain()
+        self.assertEqual([activity.iri for activity in handled], ['/likes/1'])
+        self.assertFalse(TimelineEntry.objects.exists())
+
+    def test_drain_batched_lookups(self):
+        """Test handlers look up the targets of a whole batch at once."""
+        remote = 'https://remote.example/users/alice'
+        for index in range(5):
+            document = {'id': f'/notes/{index}', 'actor': remote}
+            InboxService.enqueue(
+                'testuser',
+                {
+                    'id': f'/c/{index}',
+                    'type': 'Create',
+                    'actor': remote,
+                    'object': document,
+                },
+            )
+        self.inbox_service.drain()
+        for index in range(5):
+            InboxService.enqueue(
+                'testuser',
+                {
+                    'id': f'/d/{index}',
+                    'type': 'Delete',
+                    'actor': remote,
+                    'object': f'/notes/{index}',
+                },
+            )
+        with self.assertNumQueries(16):
+            self.inbox_service.drain()
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(Activity.objects.filter(activity_type='Create').count(), 0)
+
+
+class FollowServiceTest(TestCase):
+    """Test FollowService class."""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.follow_service = FollowService()
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.actor = Actor.objects.create(user=self.user)
+        self.remote = 'https://remote.example/users/alice'
+
+    def test_follow_and_undo(self):
+        """Test Follow and Undo activities maintain the edges and counts."""
+        follow = {'id': '/follows/1', 'type': 'Follow', 'actor': self.remote}
+        InboxService.enqueue('testuser', follow)
+        InboxService.enqueue('testuser', follow)
+        InboxService().drain()
+        self.actor.refresh_from_db()
+        self.assertEqual(self.actor.followers_count, 1)
+        self.assertTrue(
+            FollowEdge.objects.filter(
+                follower=self.remote, followed=self.actor.get_actor_url()
+            ).exists()
+        )
+
+        InboxService.enqueue(
+            'testuser', {'type': 'Undo', 'actor': self.remote, 'object': '/follows/1'}
+        )
+        InboxService().drain()
+        self.actor.refresh_from_db()
+        self.assertEqual(self.actor.followers_count, 0)
+        self.assertFalse(FollowEdge.objects.exists())
+
+    def test_follow_is_accepted(self):
+        """Test new followers are sent an Accept of their Follow, once."""
+        RemoteActor.objects.create(
+            iri=self.remote,
+            document={'id': self.remote, 'inbox': f'{self.remote}/inbox'},
+            fetched_at=now(),
+        )
+        for index in (1, 2):
+            follow = {'id': f'/follows/{index}', 'type': 'Follow', 'actor': self.remote}
+            InboxService.enqueue('testuser', follow)
+            InboxService().drain()
+        delivery = Delivery.objects.select_related('activity').get()
+        self.assertEqual(delivery.inbox, f'{self.remote}/inbox')
+        self.assertEqual(delivery.activity.activity_type, 'Accept')
+        self.assertEqual(delivery.activity.object_data['object']['id'], '/follows/1')
+        self.assertEqual(
+            delivery.activity.object_data['actor'], self.actor.get_actor_url()
+        )
+
+    def test_accept(self):
+        """Test an Accept of the inbox owner's Follow adds to its following."""
+        follow = {'type': 'Follow', 'actor': self.actor.get_actor_url()}
+        InboxService.enqueue(
+            'testuser', {'type': 'Accept', 'actor': self.remote, 'object': follow}
+        )
+        InboxService().drain()
+        self.actor.refresh_from_db()
+        self.assertEqual(self.actor.following_count, 1)
+
+    @override_settings(SOCIALIZE_PAGE_SIZE=2)
+    def test_get_collection(self):
+        """Test get_collection pages through the followers of an actor."""
+        for index in range(3):
+            self.follow_service.follow(
+                f'{self.remote}{index}', self.actor.get_actor_url()
+            )
+        self.actor.refresh_from_db()
+
+        request = self.factory.get('/users/testuser/followers/')
+        collection = json.loads(
+            self.follow_service.get_collection(request, 'testuser', 'followers').content
+        )
+        self.assertEqual(collection['totalItems'], 3)
+
+        request = self.factory.get(collection['first'])
+        page = json.loads(
+            self.follow_service.get_collection(request, 'testuser', 'followers').content
+        )
+        self.assertEqual(page['orderedItems'], [f'{self.remote}2', f'{self.remote}1'])
+
+    def test_local_followers_timeline(self):
+        """Test objects created locally reach local followers through the outbox."""
+        follower = Actor.objects.create(
+            user=User.objects.create_user(username='follower', password='password')
+        )
+        self.follow_service.follow(follower.get_actor_url(), self.actor.get_actor_url())
+        ObjectService().create_object(
+            self.factory.post(
+                '/',
+                json.dumps({'type': 'Note', 'content': 'Hello'}),
+                content_type='application/json',
+            ),
+            'testuser',
+        )
+        self.assertEqual(TimelineEntry.objects.filter(owner=self.actor).count(), 1)
+        self.assertFalse(TimelineEntry.objects.filter(owner=follower).exists())
+
+        self.assertEqual(OutboxService().drain(), 1)
+        self.assertEqual(TimelineEntry.objects.filter(owner=follower).count(), 1)
+        self.assertFalse(OutboxItem.objects.exists())
+
+    def test_remote_followers_delivery(self):
+        """Test objects created locally are queued for delivery to remote followers."""
+        for name in ('alice', 'bob'):
+            iri = f'https://remote.example/users/{name}'
+            RemoteActor.objects.create(
+                iri=iri,
+                document={
+                    'id': iri,
+                    'inbox': f'{iri}/inbox',
+                    'endpoints': {'sharedInbox': 'https://remote.example/inbox'},
+                },
+                fetched_at=now(),
+            )
+            self.follow_service.follow(iri, self.actor.get_actor_url())
+        ObjectService().create_object(
+            self.factory.post(
+                '/',
+                json.dumps({'type': 'Note', 'content': 'Hello'}),
+                content_type='application/json',
+            ),
+            'testuser',
+        )
+        create = Activity.objects.get(actor=self.actor, activity_type='Create')
+        self.assertEqual(create.object_data['object']['content'], 'Hello')
+
+        carol = 'https://other.example/users/carol'
+        self.follow_service.follow(carol, self.actor.get_actor_url())
+        with patch('socialize.services.resolver') as mock_resolver:
+            OutboxService().drain()
+        mock_resolver.aresolve.assert_not_called()
+        self.assertEqual(
+            list(Delivery.objects.values_list('activity_id', 'inbox')),
+            [(create.id, 'https://remote.example/inbox')],
+        )
+        self.assertEqual(
+            list(PendingRecipient.objects.values_list('activity_id', 'iri')),
+            [(create.id, carol)],
+        )
+
+        remote = MagicMock(document={'id': carol, 'inbox': f'{carol}/inbox'})
+        with patch('socialize.services.resolver') as mock_resolver:
+            mock_resolver.aresolve = AsyncMock(return_value=remote)
+            self.assertEqual(DeliveryService().resolve_pending(), 1)
+        self.assertFalse(PendingRecipient.objects.exists())
+        self.assertTrue(Delivery.objects.filter(inbox=f'{carol}/inbox').exists())
+
+
+class TimelineServiceTest(TestCase):
+    """Test TimelineService class."""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.timeline_service = TimelineService()
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.actor = Actor.objects.create(user=self.user)
+
+    @override_settings(SOCIALIZE_TIMELINE_LENGTH=3)
+    def test_drain_pushes_and_trims(self):
+        """Test received posts are materialized and the timeline is capped."""
+        remote = 'https://remote.example/users/alice'
+        for index in range(5):
+            InboxService.enqueue(
+                'testuser',
+                {'id': f'/a/{index}', 'type': 'Create', 'actor': remote},
+            )
+            InboxService().drain()
+        entries = TimelineEntry.objects.filter(owner=self.actor)
+        self.assertEqual(
+            sorted(entry.object_data['id'] for entry in entries),
+            ['/a/2', '/a/3', '/a/4'],
+        )
+
+        InboxService.enqueue(
+            'testuser', {'type': 'Undo', 'actor': remote, 'object': '/a/4'}
+        )
+        InboxService().drain()
+        self.assertEqual(TimelineEntry.objects.filter(owner=self.actor).count(), 2)
+
+    @override_settings(SOCIALIZE_TIMELINE_LENGTH=2)
+    def test_push_trims_in_bulk(self):
+        """Test the timelines of all the owners are trimmed in one statement."""
+        owners = [self.actor.id]
+        for index in range(3):
+            user = User.objects.create_user(username=f'user{index}', password='pw')
+            owners.append(Actor.objects.create(user=user).id)
+        for index in range(3):
+            self.timeline_service.push(
+                (owner_id, {'id': f'/a/{index}'}, now() + timedelta(seconds=index))
+                for owner_id in owners
+            )
+        with self.assertNumQueries(2):
+            self.timeline_service.push(
+                (owner_id, {'id': '/a/3'}, now() + timedelta(seconds=3))
+                for owner_id in owners
+            )
+        for owner_id in owners:
+            entries = TimelineEntry.objects.filter(owner_id=owner_id)
+            self.assertEqual(
+                sorted(entry.object_data['id'] for entry in entries), ['/a/2', '/a/3']
+            )
+
+    @override_settings(SOCIALIZE_PAGE_SIZE=2)
+    def test_get_timeline(self):
+        """Test get_timeline pages through the owner's timeline."""
+        for index in range(3):
+            ObjectService().create_object(
+                self.factory.post(
+                    '/',
+                    json.dumps({'type': 'Note', 'content': f'post {index}'}),
+                    content_type='application/json',
+                ),
+                'testuser',
+            )
+        request = self.factory.get('/users/testuser/timeline/?page=true')
+        request.user = self.user
+        page = json.loads(
+            self.timeline_service.get_timeline(request, 'testuser').content
+        )
+        self.assertEqual(len(page['orderedItems']), 2)
+        self.assertEqual(page['orderedItems'][0]['type'], 'Create')
+        self.assertEqual(page['orderedItems'][0]['object']['content'], 'post 2')
+
+        request = self.factory.get(page['next'])
+        request.user = self.user
+        page = json.loads(
+            self.timeline_service.get_timeline(request, 'testuser').content
+        )
+        self.assertEqual(page['orderedItems'][0]['object']['content'], 'post 0')
+        self.assertNotIn('next', page)
+
+    def test_get_timeline_owner_only(self):
+        """Test get_timeline denies access to anyone but the owner."""
+        request = self.factory.get('/users/testuser/timeline/')
+        request.user = AnonymousUser()
+        with self.assertRaises(PermissionDenied):
+            self.timeline_service.get_timeline(request, 'testuser')
+
+
+class DeliveryServiceTest(TestCase):
+    """Test DeliveryService class."""
+
+    def setUp(self):
+        keys.private_keys.clear()
+        self.server = StubServer()
+        self.addCleanup(self.server.stop)
+        self.delivery_service = DeliveryService()
+        private_key, public_key = ActorService().generate_keys()
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.actor = Actor.objects.create(user=self.user, public_key=public_key)
+        Vault.objects.create(actor=self.actor, private_key=private_key)
+        self.activity = Activity.objects.create(
+            actor=self.actor,
+            object_data={'id': '/activities/1', 'type': 'Create'},
+            activity_type='Create',
+        )
+
+    def test_fan_out(self):
+        """Test fan_out collapses recipients into shared inboxes."""
+        shared = {'sharedInbox': f'{self.server.url}/inbox'}
+        recipients = [
+            {'inbox': f'{self.server.url}/users/{name}/inbox', 'endpoints': shared}
+            for name in ('alice', 'bob', 'carol')
+        ] + [f'{self.server.url}/users/dave/inbox']
+        self.assertEqual(self.delivery_service.fan_out(self.activity, recipients), 2)
+        self.assertEqual(self.delivery_service.fan_out(self.activity, recipients), 2)
+        self.assertEqual(Delivery.objects.count(), 2)
+
+    def test_deliver_pending(self):
+        """Test deliver_pending posts signed activities to remote inboxes."""
+        self.delivery_service.fan_out(self.activity, [f'{self.server.url}/inbox'])
+        self.assertEqual(self.delivery_service.deliver_pending(), 1)
+        path, headers, body = self.server.received[0]
+        self.assertEqual(path, '/inbox')
+        self.assertIn(
+            f'keyId="{httpsig.get_key_id(self.actor.id)}"', headers['Signature']
+        )
+        self.assertEqual(headers['Digest'], httpsig.digest(body))
+        self.assertEqual(json.loads(body), self.activity.object_data)
+        self.assertIsNotNone(Delivery.objects.get().delivered_at)
+        self.assertEqual(self.delivery_service.deliver_pending(), 0)
+
+    def test_deliver_pending_retry(self):
+        """Test failed deliveries are retried later with backoff."""
+        self.server.status = 500
+        self.delivery_service.fan_out(self.activity, [f'{self.server.url}/inbox'])
+        self.delivery_service.deliver_pending()
+        delivery = Delivery.objects.get()
+        self.assertIsNone(delivery.delivered_at)
+        self.assertEqual(delivery.attempts, 1)
+        self.assertEqual(delivery.last_error, 'HTTP 500')
+        self.assertEqual(self.delivery_service.deliver_pending(), 0)
+
+
+class ArchiveServiceTest(TestCase):
+    """Test ArchiveService class."""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.archive_service = ArchiveService()
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.actor = Actor.objects.create(user=self.user)
+        self.object = Object.objects.create(actor=self.actor, content='Hello')
+        Activity.objects.create(
+            actor=self.actor, object_data={'type': 'Like'}, activity_type='Like'
+        )
+
+    def export_request(self, user):
+        """Builds an export request authenticated as the given user."""
+        request = self.factory.get('/users/testuser/export/')
+        request.user = user
+
+        async def auser():
+            return user
+
+        request.auser = auser
+        return request
+
+    def test_export_activity(self):
+        """Test export_activity streams a gzip-compressed collection."""
+        request = self.export_request(self.user)
+        response = self.archive_service.export_activity(request, 'testuser')
+        archive = json.loads(gzip.decompress(b''.join(response.streaming_content)))
+        self.assertEqual(archive['type'], 'OrderedCollection')
+        self.assertEqual(
+            [item['type'] for item in archive['orderedItems']], ['Like', 'Create']
+        )
+        self.assertEqual(archive['orderedItems'][1]['object']['content'], 'Hello')
+
+    async def test_export_owner_only(self):
+        """Test archives are refused to anonymous clients and other users."""
+        other = await User.objects.acreate(username='other')
+        for user in (AnonymousUser(), other):
+            request = self.export_request(user)
+            with self.assertRaises(PermissionDenied):
+                self.archive_service.export_activity(request, 'testuser')
+            with self.assertRaises(PermissionDenied):
+                await self.archive_service.aexport_activity(request, 'testuser')
+
+    def test_export_local_creates_once(self):
+        """Test objects created through the service are exported once."""
+        ObjectService().create_object(
+            self.factory.post(
+                '/',
+                json.dumps({'type': 'Note', 'content': 'Again'}),
+                content_type='application/json',
+            ),
+            'testuser',
+        )
+        archive = json.loads(
+            gzip.decompress(b''.join(self.archive_service.export_chunks(self.actor)))
+        )
+        contents = [
+            item['object']['content']
+            for item in archive['orderedItems']
+            if item['type'] == 'Create'
+        ]
+        self.assertEqual(sorted(contents), ['Again', 'Hello'])
+
+    async def test_aexport_activity(self):
+        """Test aexport_activity streams the archive from async iterators."""
+        request = self.export_request(self.user)
+        response = await self.archive_service.aexport_activity(request, 'testuser')
+        self.assertTrue(response.is_async)
+        content = b''.join([chunk async for chunk in response.streaming_content])
+        archive = json.loads(gzip.decompress(content))
+        self.assertEqual(
+            [item['type'] for item in archive['orderedItems']], ['Like', 'Create']
+        )
+
+    def test_import_items(self):
+        """Test an exported archive loads back in batches."""
+        archive = gzip.decompress(
+            b''.join(self.archive_service.export_chunks(self.actor))
+        )
+        user = User.objects.create_user(username='newuser', password='password')
+        actor = Actor.objects.create(user=user)
+        Object.objects.all().delete()
+
+        items = self.archive_service.iter_items(BytesIO(archive))
+        self.assertEqual(
+            self.archive_service.import_items(actor, items, batch_size=1), 2
+        )
+        self.assertEqual(Activity.objects.filter(actor=actor).count(), 2)
+        restored = Object.objects.get(actor=actor)
+        self.assertEqual((restored.id, restored.content), (self.object.id, 'Hello'))
+
+    def test_import_foreign_objects_twice(self):
+        """Test re-importing objects from another server does not duplicate them."""
+        item = {
+            'type': 'Create',
+            'id': 'https://remote.example/activities/1',
+            'object': {
+                'id': 'https://remote.example/notes/1',
+                'type': 'Note',
+                'content': 'Elsewhere',
+            },
+        }
+        for _ in range(2):
+            self.archive_service.import_items(self.actor, iter([dict(item)]))
+        self.assertEqual(Object.objects.filter(content='Elsewhere').count(), 1)
+
 
 class ObjectServiceTest(TestCase):
     """Test ObjectService class."""
@@ -95,6 +884,15 @@ class ObjectServiceTest(TestCase):
         response = self.object_service.get_object(request, obj.id)
         self.assertEqual(response.status_code, 200)
 
+    async def test_aget_object(self):
+        """Test aget_object method."""
+        obj = await Object.objects.acreate(
+            actor=self.actor, object_type='Note', content='Test content'
+        )
+        request = self.factory.get(f'/object/{obj.id}')
+        response = await self.object_service.aget_object(request, obj.id)
+        self.assertEqual(json.loads(response.content)['content'], 'Test content')
+
     def test_create_object(self):
         """Test create_object method."""
         request = self.factory.post(
@@ -105,6 +903,38 @@ class ObjectServiceTest(TestCase):
         response = self.object_service.create_object(request, 'testuser')
         self.assertEqual(response.status_code, 200)
 
+    def test_create_object_atomic(self):
+        """Test a failed creation leaves no rows and flushes no counters."""
+        request = self.factory.post(
+            '/object/testuser',
+            data=json.dumps({'type': 'Note', 'content': 'Test content'}),
+            content_type='application/json',
+        )
+
+        def enqueue(activity):
+            counters.add_on_commit(Actor, activity.actor_id, 'score')
+            raise DatabaseError('outbox unavailable')
+
+        failing = patch.object(OutboxService, 'enqueue', side_effect=enqueue)
+        captured = self.captureOnCommitCallbacks(execute=True)
+        with failing, captured as callbacks, self.assertRaises(DatabaseError):
+            self.object_service.create_object(request, 'testuser')
+        self.assertEqual(callbacks, [])
+        self.assertFalse(Object.objects.exists())
+        self.assertFalse(Activity.objects.exists())
+        self.assertFalse(TimelineEntry.objects.exists())
+
+    async def test_acreate_object(self):
+        """Test acreate_object stores the object, its activity and outbox item."""
+        request = self.factory.post(
+            '/object/testuser',
+            data=json.dumps({'type': 'Note', 'content': 'Test content'}),
+            content_type='application/json',
+        )
+        response = await self.object_service.acreate_object(request, 'testuser')
+        self.assertEqual(json.loads(response.content)['content'], 'Test content')
+        self.assertEqual(await OutboxItem.objects.acount(), 1)
+
 
 class VaultServiceTest(TestCase):
     """Test VaultService class."""
@@ -127,6 +957,42 @@ class VaultServiceTest(TestCase):
         self.assertEqual(response.status_code, 200)
 
 
+class KeyPoolServiceTest(TestCase):
+    """Test KeyPoolService class."""
+
+    @patch('socialize.services.ActorService.generate_keys')
+    def test_refill(self, mock_generate_keys):
+        """Test refill only generates the missing key pairs."""
+        mock_generate_keys.return_value = ('private_key', 'public_key')
+        self.assertEqual(KeyPoolService.refill(3), 3)
+        self.assertEqual(KeyPoolService.refill(3), 0)
+        self.assertEqual(KeyPair.objects.count(), 3)
+
+    def test_acquire(self):
+        """Test acquire takes a key pair out of the pool."""
+        KeyPair.objects.create(private_key='private_key', public_key='public_key')
+        self.assertEqual(KeyPoolService.acquire(), ('private_key', 'public_key'))
+        self.assertIsNone(KeyPoolService.acquire())
+
+    @override_settings(SOCIALIZE_KEY_ALGORITHM='ed25519')
+    def test_acquire_algorithm(self):
+        """Test acquire only hands out pairs of the configured algorithm."""
+        KeyPair.objects.create(private_key='rsa', public_key='rsa')
+        self.assertIsNone(KeyPoolService.acquire())
+        self.assertEqual(KeyPoolService.refill(1), 1)
+        private_pem, _ = KeyPoolService.acquire()
+        self.assertIn('BEGIN PRIVATE KEY', private_pem)
+
+    def test_create_actor_uses_pool(self):
+        """Test create_actor prefers pooled key pairs to inline generation."""
+        KeyPair.objects.create(private_key='private_key', public_key='public_key')
+        with patch('socialize.services.ActorService.generate_keys') as generate:
+            actor = ActorService().create_actor({'username': 'pooled'})
+            generate.assert_not_called()
+        self.assertEqual(actor.public_key, 'public_key')
+        self.assertEqual(Vault.objects.get(actor=actor).private_key, 'private_key')
+
+
 class AuthenticationServiceTest(TestCase):
     """Test AuthenticationService class."""
 
@@ -134,9 +1000,24 @@ class AuthenticationServiceTest(TestCase):
         """Set up test data."""
         self.factory = RequestFactory()
         self.auth_service = AuthenticationService()
+        AuthenticationService.verifications.clear()
         self.user = User.objects.create_user(username='testuser', password='password')
         self.actor = Actor.objects.create(user=self.user)
 
+    @patch('socialize.sessions.httpx')
+    def test_async_clients_per_loop(self, mock_httpx):
+        """Test one pooled httpx client is kept per event loop."""
+        mock_httpx.AsyncClient.side_effect = lambda **options: MagicMock()
+        pool = AsyncClientPool(timeout=10)
+
+        async def get_twice():
+            return pool.get(), pool.get()
+
+        first, again = asyncio.run(get_twice())
+        self.assertIs(first, again)
+        self.assertIsNot(asyncio.run(get_twice())[0], first)
+        mock_httpx.AsyncClient.assert_called_with(timeout=10)
+
     @patch('socialize.services.authenticate')
     @patch('socialize.services.login')
     def test_authenticate(self, _, mock_authenticate):
@@ -148,7 +1029,7 @@ class AuthenticationServiceTest(TestCase):
         )
         self.assertEqual(response.status_code, 200)
 
-    @patch('requests.get')
+    @patch('requests.Session.get')
     def test_verify_access_token(self, mock_get):
         """Test verify_access_token method."""
         mock_get.return_value = MagicMock(
@@ -156,3 +1037,47 @@ class AuthenticationServiceTest(TestCase):
         )
         response = self.auth_service.verify_access_token('google', 'valid_token')
         self.assertIsNotNone(response)
+
+    @patch('requests.Session.get')
+    def test_verify_access_token_cache(self, mock_get):
+        """Test verifications are cached, bounded by the provider expiry."""
+        mock_get.return_value = MagicMock(
+            status_code=200, json=lambda: {'email': 'a@example.com', 'expires_in': 0}
+        )
+        self.auth_service.verify_access_token('google', 'expiring_token')
+        self.auth_service.verify_access_token('google', 'expiring_token')
+        self.assertEqual(mock_get.call_count, 2)
+
+        mock_get.reset_mock()
+        mock_get.return_value = MagicMock(status_code=401)
+        self.assertIsNone(self.auth_service.verify_access_token('google', 'bad'))
+        self.assertIsNone(self.auth_service.verify_access_token('google', 'bad'))
+        self.assertEqual(mock_get.call_count, 1)
+
+    @patch('requests.Session.get')
+    def test_verify_access_token_coalescing(self, mock_get):
+        """Test concurrent verifications of a token make one upstream call."""
+        release = threading.Event()
+
+        def slow_get(*_, **__):
+            release.wait(5)
+            return MagicMock(status_code=200, json=lambda: {'email': 'a@example.com'})
+
+        mock_get.side_effect = slow_get
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(
+                    self.auth_service.verify_access_token('facebook', 'shared_token')
+                )
+            )
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.1)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual(results, [{'email': 'a@example.com'}] * 5)
@@ -1,6 +1,7 @@
 SECRET_KEY = 'test-secret-key'
 DEBUG = True
 ALLOWED_HOSTS = ['*']
+SITE_DOMAIN = 'localhost'
 INSTALLED_APPS = [
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -0,0 +1,96 @@
+"""Test SignatureVerifier class."""
+
+from socialize import httpsig
+from socialize.metrics import registry
+from socialize.services import ActorService
+from socialize.verification import SignatureVerifier
+from cryptography.hazmat.primitives import serialization
+from django.test import SimpleTestCase
+from unittest.mock import patch
+import django
+
+django.setup()
+
+
+class SignatureVerifierTest(SimpleTestCase):
+    """Test SignatureVerifier class."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Generate the keys signing the test strings."""
+        super().setUpClass()
+        cls.keys = []
+        for algorithm in ('rsa', 'ed25519'):
+            private_pem, public_pem = ActorService().generate_keys(algorithm)
+            cls.keys.append(
+                (
+                    serialization.load_pem_private_key(
+                        private_pem.encode(), password=None
+                    ),
+                    serialization.load_pem_public_key(public_pem.encode()),
+                )
+            )
+
+    def setUp(self):
+        """Set up test data."""
+        httpsig.verified_signatures.clear()
+        registry.clear()
+        self.verifier = SignatureVerifier(max_workers=2)
+
+    def tearDown(self):
+        """Stop the worker pool."""
+        self.verifier.shutdown()
+
+    def jobs(self, count):
+        """Returns count jobs, alternating key algorithms, every third one forged."""
+        jobs = []
+        for n in range(count):
+            private_key, public_key = self.keys[n % 2]
+            string = f'date: job {n}'
+            params = httpsig.parse_signature(
+                httpsig.sign(private_key, f'/actors/{n}#main-key', string, ['date'])
+            )
+            if n % 3 == 2:
+                string += ' forged'
+            jobs.append((public_key, params, string))
+        return jobs
+
+    def test_verify_many(self):
+        """Test results keep the job order and successes are remembered."""
+        jobs = self.jobs(6)
+        expected = [n % 3 != 2 for n in range(6)]
+        self.assertEqual(self.verifier.verify_many(jobs), expected)
+        for (_, params, string), valid in zip(jobs, expected):
+            self.assertEqual(httpsig.is_verified(params, string), valid)
+
+        with patch.object(
+            self.verifier, 'submit', wraps=self.verifier.submit
+        ) as submit:
+            self.assertEqual(self.verifier.verify_many(jobs), expected)
+        self.assertEqual(submit.call_count, 2)
+
+    def test_process_pool(self):
+        """Test keys are sent to worker processes in DER."""
+        verifier = SignatureVerifier(max_workers=1, processes=True)
+        try:
+            self.assertEqual(verifier.verify_many(self.jobs(3)), [True, True, False])
+        finally:
+            verifier.shutdown()
+
+    async def test_averify_many(self):
+        """Test async batches are verified on the pool."""
+        self.assertEqual(
+            await self.verifier.averify_many(self.jobs(3)), [True, True, False]
+        )
+        public_key, params, string = self.jobs(1)[0]
+        self.assertTrue(await self.verifier.averify(public_key, params, string))
+
+    def test_batch_metrics(self):
+        """Test the duration and size of each batch are recorded."""
+        self.verifier.verify_many(self.jobs(4))
+        self.verifier.verify_many(self.jobs(2))
+        self.assertEqual(registry.batches['verify'].count, 2)
+        self.assertEqual(registry.batch_items['verify'], 6)
+        self.assertIn(
+            'socialize_batch_items_total{batch="verify"} 6', registry.render()
+        )
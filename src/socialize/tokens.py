@@ -0,0 +1,97 @@
+"""Bearer token validation for the socialize app."""
+#!/usr/bin/python
+# pylint: disable=E1101
+#
+# This file is part of django-socialize project.
+#
+# Copyright (C) 2010-2025 William Oliveira de Lagos <william.lagos@icloud.com>
+#
+# Socialize is free software: you can redistribute it and/or modify
+# it under the terms of the Lesser GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Socialize is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Socialize. If not, see <http://www.gnu.org/licenses/>.
+#
+
+import hashlib
+
+from django.conf import settings
+from django.utils.timezone import now
+
+from .cache import LRUCache, MISSING
+from .models import Token
+
+tokens = LRUCache(
+    maxsize=getattr(settings, 'SOCIALIZE_TOKEN_CACHE_SIZE', 4096),
+    ttl=getattr(settings, 'SOCIALIZE_TOKEN_CACHE_TTL', 30),
+)
+
+
+def hash_token(token):
+    """Returns the SHA-256 digest of a token, used as its cache key."""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def get_token_user(token):
+    """
+    Returns the active user owning the given unexpired token, or None.
+
+    Lookups are cached under the hash of the token, so the token itself is
+    never kept in memory. Valid entries live no longer than the token, and
+    unknown tokens are cached as well, for SOCIALIZE_TOKEN_NEGATIVE_TTL
+    seconds, so replaying a bad token does not reach the database.
+    """
+    key = hash_token(token)
+    entry = tokens.get(key, MISSING)
+    if entry is MISSING:
+        row = (
+            Token.objects.select_related('user')
+            .filter(access_token=token, expires_at__gt=now())
+            .first()
+        )
+        entry = store(key, row)
+    return check(entry)
+
+
+async def aget_token_user(token):
+    """Returns the user owning the given unexpired token, using the async ORM."""
+    key = hash_token(token)
+    entry = tokens.get(key, MISSING)
+    if entry is MISSING:
+        row = await (
+            Token.objects.select_related('user')
+            .filter(access_token=token, expires_at__gt=now())
+            .afirst()
+        )
+        entry = store(key, row)
+    return check(entry)
+
+
+def store(key, row):
+    """Caches the (user, expires_at) entry of a token row, or its absence."""
+    if row is None or not row.user.is_active:
+        tokens.set(key, None, ttl=getattr(settings, 'SOCIALIZE_TOKEN_NEGATIVE_TTL', 5))
+        return None
+    entry = (row.user, row.expires_at)
+    remaining = (row.expires_at - now()).total_seconds()
+    tokens.set(key, entry, ttl=min(tokens.ttl, remaining))
+    return entry
+
+
+def check(entry):
+    """Returns the user of a cached entry unless the token expired since."""
+    if entry is None or entry[1] <= now():
+        return None
+    return entry[0]
+
+
+def evict_user(user_id):
+    """Drops every cached token belonging to the given user."""
+    tokens.discard(lambda _, entry: entry is not None and entry[0].pk == user_id)
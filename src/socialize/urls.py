@@ -18,11 +18,37 @@
 # along with Socialize. If not, see <http://www.gnu.org/licenses/>.
 #
 
-from .views import ActorView, ActivityView, ObjectView, AuthenticationView
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
 
-urlpatterns = (
-    ActorView.get_urlpatterns()
-    + ActivityView.get_urlpatterns()
-    + ObjectView.get_urlpatterns()
-    + AuthenticationView.get_urlpatterns()
+from .compat import ASYNC_SUPPORTED
+from .views import (
+    ActorView,
+    ActivityView,
+    ObjectView,
+    AuthenticationView,
+    AsyncActorView,
+    AsyncActivityView,
+    AsyncObjectView,
+    AsyncAuthenticationView,
+    MetricsView,
 )
+
+if getattr(settings, 'SOCIALIZE_ASYNC_VIEWS', False):
+    if not ASYNC_SUPPORTED:
+        raise ImproperlyConfigured(
+            'SOCIALIZE_ASYNC_VIEWS requires Django 4.2 or later.'
+        )
+    views = (
+        AsyncActorView,
+        AsyncActivityView,
+        AsyncObjectView,
+        AsyncAuthenticationView,
+    )
+else:
+    views = (ActorView, ActivityView, ObjectView, AuthenticationView)
+
+urlpatterns = [pattern for view in views for pattern in view.get_urlpatterns()]
+
+if getattr(settings, 'SOCIALIZE_METRICS', False):
+    urlpatterns += MetricsView.get_urlpatterns()
@@ -0,0 +1,157 @@
+"""Parallel HTTP Signature verification for the socialize app."""
+#!/usr/bin/python
+#
+# This file is part of django-socialize project.
+#
+# Copyright (C) 2010-2025 William Oliveira de Lagos <william.lagos@icloud.com>
+#
+# Socialize is free software: you can redistribute it and/or modify
+# it under the terms of the Lesser GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Socialize is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with Socialize. If not, see <http://www.gnu.org/licenses/>.
+#
+
+import asyncio
+import logging
+import threading
+import time
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import django
+
+from cryptography.hazmat.primitives import serialization
+from django.conf import settings
+
+from . import httpsig
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+
+def check_der(key_der, params, string):
+    """Checks a signature against a DER encoded public key, in a worker process."""
+    public_key = serialization.load_der_public_key(key_der)
+    return httpsig.check(public_key, params, string)
+
+
+class SignatureVerifier:
+    """
+    Verifies HTTP Signatures on a pool of workers.
+
+    The ``cryptography`` library releases the GIL while it runs the key
+    operation, so a thread pool lets verification throughput scale with the
+    cores; the process pool option sidesteps the GIL altogether, at the cost
+    of sending the keys to the workers in DER. Batch ingestion and async
+    views submit (public key, parsed signature, signing string) jobs, and
+    the duration and size of each batch are recorded in the metrics.
+    """
+
+    def __init__(self, max_workers=None, processes=False, name='verify'):
+        self.max_workers = max_workers
+        self.processes = processes
+        self.name = name
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+        """Returns the worker pool, starting it on first use."""
+        with self._lock:
+            if self._executor is None:
+                if self.processes:
+                    self._executor = ProcessPoolExecutor(
+                        self.max_workers, initializer=django.setup
+                    )
+                else:
+                    self._executor = ThreadPoolExecutor(
+                        self.max_workers, thread_name_prefix='socialize-verify'
+                    )
+            return self._executor
+
+    def submit(self, public_key, params, string):
+        """Schedules the check of one signature, returning its future."""
+        if self.processes:
+            key_der = public_key.public_bytes(
+                serialization.Encoding.DER,
+                serialization.PublicFormat.SubjectPublicKeyInfo,
+            )
+            return self.executor.submit(check_der, key_der, params, string)
+        return self.executor.submit(httpsig.check, public_key, params, string)
+
+    def schedule(self, jobs):
+        """Submits the jobs whose signature is not cached, None for the others."""
+        return [
+            None
+            if httpsig.is_verified(params, string)
+            else self.submit(public_key, params, string)
+            for public_key, params, string in jobs
+        ]
+
+    def verify_many(self, jobs):
+        """
+        Verifies (public key, params, string) jobs in parallel, in order.
+
+        Signatures already verified over the same string are accepted from
+        the cache without being submitted, and successes are remembered.
+        """
+        jobs = list(jobs)
+        started = time.perf_counter()
+        futures = self.schedule(jobs)
+        results = [True if future is None else future.result() for future in futures]
+        self.record(jobs, results, time.perf_counter() - started)
+        return results
+
+    async def averify_many(self, jobs):
+        """Verifies (public key, params, string) jobs without blocking the loop."""
+        jobs = list(jobs)
+        started = time.perf_counter()
+        futures = self.schedule(jobs)
+        results = [
+            True if future is None else await asyncio.wrap_future(future)
+            for future in futures
+        ]
+        self.record(jobs, results, time.perf_counter() - started)
+        return results
+
+    async def averify(self, public_key, params, string):
+        """Verifies a single signature on the pool, remembering a success."""
+        valid = await asyncio.wrap_future(self.submit(public_key, params, string))
+        if valid:
+            httpsig.remember(params, string)
+        return valid
+
+    def record(self, jobs, results, seconds):
+        """Remembers the verified signatures and records the batch metrics."""
+        for (_, params, string), valid in zip(jobs, results):
+            if valid:
+                httpsig.remember(params, string)
+        registry.observe_batch(self.name, len(jobs), seconds)
+        if jobs:
+            logger.debug(
+                'Verified %d signatures in %.3fs (%.0f/s)',
+                len(jobs),
+                seconds,
+                len(jobs) / seconds if seconds else 0,
+            )
+
+    def shutdown(self, wait=True):
+        """Stops the worker pool; it is started again on the next submission."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
+
+
+verifier = SignatureVerifier(
+    max_workers=getattr(settings, 'SOCIALIZE_VERIFICATION_WORKERS', None),
+    processes=getattr(settings, 'SOCIALIZE_VERIFICATION_PROCESSES', False),
+)
@@ -22,20 +22,31 @@
 
 import json
 
+from asgiref.sync import sync_to_async
 from django.views import View
 from django.views.decorators.csrf import csrf_exempt
-from django.http import JsonResponse, HttpResponseNotAllowed
+from django.http import HttpResponse, HttpResponseNotAllowed
 from django.utils.decorators import method_decorator
 from django.urls import path
 
+from .metrics import registry
+from .responses import JsonResponse
 from .services import (
     ActorService,
     ActivityService,
+    ArchiveService,
+    FollowService,
     ObjectService,
+    TimelineService,
     AuthenticationService,
 )
 
 
+# Signing policy of the ActivityPubSigningMiddleware, declared in URL kwargs:
+# deliveries to inboxes must be signed, and their responses are signed.
+FEDERATION_INBOX = {'verify_signature': True, 'sign_response': True}
+
+
 class ActorView(View):
     """Handles ActivityPub Actor endpoints."""
 
@@ -51,6 +62,8 @@ class ActorView(View):
                 kwargs.get('username'),
                 as_activitypub='activity_pub' in request.GET,
             )
+        elif route == 'actor_id':
+            return self.service.get_actor_by_id(request, kwargs.get('actor_id'))
         elif route == 'webfinger':
             return self.service.get_webfinger(request)
 
@@ -68,19 +81,26 @@ class ActorView(View):
         actor = self.service.create_actor(data)
         return JsonResponse({'id': actor.get_actor_url()}, status=201)
 
-    @staticmethod
-    def get_urlpatterns():
+    @classmethod
+    def get_urlpatterns(cls):
         """Returns the URL patterns for the ActorService."""
         return [
             path(
                 'users/<str:username>/',
-                ActorView.as_view(),
+                cls.as_view(),
                 {'route': 'actor'},
                 name='actor',
             ),
+            # Actor ids and key ids: no trailing slash, as they are published.
+            path(
+                'actors/<uuid:actor_id>',
+                cls.as_view(),
+                {'route': 'actor_id'},
+                name='actor_id',
+            ),
             path(
                 '.well-known/webfinger',
-                ActorView.as_view(),
+                cls.as_view(),
                 {'route': 'webfinger'},
                 name='webfinger',
             ),
@@ -91,6 +111,9 @@ class ActivityView(View):
     """Handles ActivityPub Activity endpoints for inbox and outbox."""
 
     service = ActivityService()
+    archive_service = ArchiveService()
+    timeline_service = TimelineService()
+    follow_service = FollowService()
 
     def get(self, request, *_, **kwargs):
         """Handles GET requests for activity-related actions."""
@@ -98,6 +121,14 @@ class ActivityView(View):
 
         if route == 'outbox':
             return self.service.get_activity(request, kwargs.get('username'))
+        elif route == 'export':
+            return self.archive_service.export_activity(request, kwargs.get('username'))
+        elif route == 'timeline':
+            return self.timeline_service.get_timeline(request, kwargs.get('username'))
+        elif route in ('followers', 'following'):
+            return self.follow_service.get_collection(
+                request, kwargs.get('username'), route
+            )
 
         return JsonResponse({'error': 'Invalid endpoint'}, status=404)
 
@@ -111,22 +142,46 @@ class ActivityView(View):
 
         return HttpResponseNotAllowed(['POST'])
 
-    @staticmethod
-    def get_urlpatterns():
+    @classmethod
+    def get_urlpatterns(cls):
         """Returns the URL patterns for the ActivityService."""
         return [
             path(
                 'users/<str:username>/outbox/',
-                ActivityView.as_view(),
+                cls.as_view(),
                 {'route': 'outbox'},
                 name='outbox',
             ),
             path(
                 'users/<str:username>/inbox/',
-                ActivityView.as_view(),
-                {'route': 'inbox'},
+                cls.as_view(),
+                {'route': 'inbox', **FEDERATION_INBOX},
                 name='inbox',
             ),
+            path(
+                'users/<str:username>/export/',
+                cls.as_view(),
+                {'route': 'export'},
+                name='export',
+            ),
+            path(
+                'users/<str:username>/timeline/',
+                cls.as_view(),
+                {'route': 'timeline'},
+                name='timeline',
+            ),
+            path(
+                'users/<str:username>/followers/',
+                cls.as_view(),
+                {'route': 'followers'},
+                name='followers',
+            ),
+            path(
+                'users/<str:username>/following/',
+                cls.as_view(),
+                {'route': 'following'},
+                name='following',
+            ),
         ]
 
 
@@ -157,14 +212,14 @@ class ObjectView(View):
 
         return HttpResponseNotAllowed(['POST'])
 
-    @staticmethod
-    def get_urlpatterns():
+    @classmethod
+    def get_urlpatterns(cls):
         """Returns the URL patterns for the ObjectService."""
         return [
-            path('objects/', ObjectView.as_view(), {'route': 'object'}, name='object'),
+            path('objects/', cls.as_view(), {'route': 'object'}, name='object'),
             path(
                 'objects/<uuid:object_id>/',
-                ObjectView.as_view(),
+                cls.as_view(),
                 {'route': 'object'},
                 name='object',
             ),
@@ -202,9 +257,144 @@ class AuthenticationView(View):
 
         return self.service.authenticate(request, user_data, access_token)
 
-    @staticmethod
-    def get_urlpatterns():
+    @classmethod
+    def get_urlpatterns(cls):
         """Returns the URL patterns for the authentication service."""
         return [
-            path('auth/', AuthenticationView.as_view(), name='auth'),
+            path('auth/', cls.as_view(), name='auth'),
+        ]
+
+
+class AsyncActorView(ActorView):
+    """Handles ActivityPub Actor endpoints natively under ASGI."""
+
+    async def get(self, request, *_, **kwargs):
+        """Handles GET requests for actor-related actions."""
+        route = kwargs.get('route')
+
+        if route == 'actor':
+            return await self.service.aget_actor(
+                request,
+                kwargs.get('username'),
+                as_activitypub='activity_pub' in request.GET,
+            )
+        elif route == 'actor_id':
+            return await self.service.aget_actor_by_id(request, kwargs.get('actor_id'))
+        elif route == 'webfinger':
+            return await self.service.aget_webfinger(request)
+
+        return JsonResponse({'error': 'Invalid endpoint'}, status=404)
+
+    @method_decorator(csrf_exempt, name='dispatch')
+    async def post(self, request, *_, **kwargs):
+        """Handles POST requests for actor-related actions."""
+        data = json.loads(request.body)
+        username = data.get('username')
+
+        if not username:
+            return JsonResponse({'error': 'Username is required'}, status=400)
+
+        # Key provisioning needs a transaction, which the async ORM lacks.
+        actor = await sync_to_async(self.service.create_actor)(data)
+        return JsonResponse({'id': actor.get_actor_url()}, status=201)
+
+
+class AsyncActivityView(ActivityView):
+    """Handles ActivityPub Activity endpoints natively under ASGI."""
+
+    async def get(self, request, *_, **kwargs):
+        """Handles GET requests for activity-related actions."""
+        route = kwargs.get('route')
+
+        if route == 'outbox':
+            return await self.service.aget_activity(request, kwargs.get('username'))
+        elif route == 'export':
+            return await self.archive_service.aexport_activity(
+                request, kwargs.get('username')
+            )
+        elif route == 'timeline':
+            return await self.timeline_service.aget_timeline(
+                request, kwargs.get('username')
+            )
+        elif route in ('followers', 'following'):
+            return await self.follow_service.aget_collection(
+                request, kwargs.get('username'), route
+            )
+
+        return JsonResponse({'error': 'Invalid endpoint'}, status=404)
+
+    @method_decorator(csrf_exempt)
+    async def post(self, request, *_, **kwargs):
+        """Handles POST requests for activity-related actions on inbox."""
+        route = kwargs.get('route')
+
+        if route == 'inbox':
+            return await self.service.acreate_activity(request, kwargs.get('username'))
+
+        return HttpResponseNotAllowed(['POST'])
+
+
+class AsyncObjectView(ObjectView):
+    """Handles ActivityPub Object endpoints natively under ASGI."""
+
+    async def get(self, request, *_, **kwargs):
+        """Handles GET requests for object-related actions."""
+        route = kwargs.get('route')
+
+        if route == 'object':
+            return await self.service.aget_object(
+                request,
+                kwargs.get('object_id'),
+                as_activitypub='activity_pub' in request.GET,
+            )
+
+        return JsonResponse({'error': 'Invalid endpoint'}, status=404)
+
+    async def post(self, request, *_, **kwargs):
+        """Handles POST requests for object-related actions."""
+        route = kwargs.get('route')
+
+        if route == 'object':
+            return await self.service.acreate_object(request, kwargs.get('object_id'))
+
+        return HttpResponseNotAllowed(['POST'])
+
+
+class AsyncAuthenticationView(AuthenticationView):
+    """OAuth authenticator verifying provider tokens natively under ASGI."""
+
+    async def post(self, request, *_, **kwargs):
+        """Verify 2-legged oauth request without blocking the event loop."""
+        provider = request.POST.get('provider')
+        access_token = request.POST.get('access_token')
+
+        if not provider or not access_token:
+            return JsonResponse(
+                {'error': 'Missing provider or access_token'}, status=400
+            )
+
+        user_data = await self.service.averify_access_token(provider, access_token)
+        if not user_data:
+            return JsonResponse({'error': 'Invalid access_token'}, status=401)
+
+        # Session login and actor provisioning remain synchronous.
+        return await sync_to_async(self.service.authenticate)(
+            request, user_data, access_token
+        )
+
+
+class MetricsView(View):
+    """Serves the aggregated request metrics in the Prometheus text format."""
+
+    def get(self, request, *_, **kwargs):
+        """Handles GET requests for the metrics endpoint."""
+        return HttpResponse(
+            registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8'
+        )
+
+    @classmethod
+    def get_urlpatterns(cls):
+        """Returns the URL patterns for the metrics endpoint."""
+        return [
+            path('metrics/', cls.as_view(), name='metrics'),
         ]